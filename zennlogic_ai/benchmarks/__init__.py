@@ -0,0 +1 @@
+"""Benchmark harness for the RAG hot paths (run with ``python -m benchmarks.run``)."""
@@ -0,0 +1,146 @@
+"""Timing, memory and baseline-comparison helpers for the benchmark suite."""
+
+from collections.abc import Awaitable, Callable
+import math
+import sys
+import time
+from typing import Any, TypedDict
+
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+class CaseResult(TypedDict, total=False):
+    """Summary statistics for a single benchmark case."""
+
+    iterations: int
+    min_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    qps: float
+    items_per_s: float
+    peak_rss_mb: float | None
+    # Accuracy against a reference implementation (e.g. ONNX vs PyTorch embeddings)
+    max_abs_diff: float
+    min_cosine: float
+    # Per-operation cost of a micro-benchmark and its budget
+    ns_per_op: float
+    target_ns: float
+    # False fails the run (accuracy or per-operation budget not met)
+    within_tolerance: bool
+
+
+def peak_rss_mb() -> float | None:
+    """Return the peak resident set size of this process in MiB.
+
+    ``ru_maxrss`` is reported in KiB on Linux and bytes on macOS. Returns None
+    where the ``resource`` module is unavailable.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rss / divisor, 1)
+
+
+def _percentile(sorted_ms: list[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted sample."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_ms)))
+    return sorted_ms[rank - 1]
+
+
+def summarize(samples_ns: list[int], wall_ns: int, items: int = 0) -> CaseResult:
+    """Build a ``CaseResult`` from per-call latencies and total wall time.
+
+    Args:
+        samples_ns: Per-iteration latencies in nanoseconds.
+        wall_ns: Wall-clock time for all iterations in nanoseconds.
+        items: Number of items processed across all iterations; when set,
+            ``items_per_s`` is reported (e.g. vectors added per second).
+    """
+    ms = sorted(s / 1e6 for s in samples_ns)
+    wall_s = wall_ns / 1e9 or 1e-9
+    result: CaseResult = {
+        "iterations": len(ms),
+        "min_ms": round(ms[0], 4),
+        "p50_ms": round(_percentile(ms, 50), 4),
+        "p95_ms": round(_percentile(ms, 95), 4),
+        "p99_ms": round(_percentile(ms, 99), 4),
+        "mean_ms": round(sum(ms) / len(ms), 4),
+        "qps": round(len(ms) / wall_s, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if items:
+        result["items_per_s"] = round(items / wall_s, 2)
+    return result
+
+
+def measure(
+    fn: Callable[[int], Any], iterations: int, warmup: int = 0, items: int = 0
+) -> CaseResult:
+    """Time ``fn(i)`` for ``iterations`` calls after ``warmup`` untimed calls."""
+    for i in range(warmup):
+        fn(i)
+    samples: list[int] = []
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        samples.append(time.perf_counter_ns() - t0)
+    return summarize(samples, time.perf_counter_ns() - start, items)
+
+
+async def ameasure(
+    fn: Callable[[int], Awaitable[Any]], iterations: int, warmup: int = 0
+) -> CaseResult:
+    """Async variant of :func:`measure` for awaitables (e.g. ASGI requests)."""
+    for i in range(warmup):
+        await fn(i)
+    samples: list[int] = []
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        await fn(i)
+        samples.append(time.perf_counter_ns() - t0)
+    return summarize(samples, time.perf_counter_ns() - start)
+
+
+def compare(
+    current: dict[str, CaseResult],
+    baseline: dict[str, CaseResult],
+    tolerance: float = 0.2,
+    rss_tolerance: float = 0.25,
+) -> list[dict[str, Any]]:
+    """Compare results against a baseline and return detected regressions.
+
+    A case regresses when its p95 latency grows, or its QPS drops, by more
+    than ``tolerance`` (fractional), or its peak RSS grows by more than
+    ``rss_tolerance``. Baseline cases missing from ``current`` are reported so
+    a silently skipped suite cannot hide a regression.
+    """
+    regressions: list[dict[str, Any]] = []
+    for name, base in baseline.items():
+        cur = current.get(name)
+        if cur is None:
+            regressions.append({"case": name, "metric": "missing"})
+            continue
+        checks = (
+            ("p95_ms", 1 + tolerance, True),
+            ("qps", 1 / (1 + tolerance), False),
+            ("peak_rss_mb", 1 + rss_tolerance, True),
+        )
+        for metric, factor, higher_is_worse in checks:
+            value, ref = cur.get(metric), base.get(metric)
+            if not isinstance(value, int | float) or not isinstance(ref, int | float):
+                continue
+            limit = ref * factor
+            if (value > limit) if higher_is_worse else (value < limit):
+                regressions.append(
+                    {"case": name, "metric": metric, "baseline": ref, "current": value}
+                )
+    return regressions
@@ -0,0 +1,392 @@
+"""Run the RAG hot-path benchmarks and compare against a stored baseline.
+
+Usage::
+
+    python -m benchmarks.run --suite vector --sizes 10000,100000
+    python -m benchmarks.run --save-baseline  # record benchmarks/baseline.json
+
+Results are emitted as JSON (p50/p95/p99, QPS, peak RSS per case). When a
+baseline file exists the run is compared against it and the process exits
+non-zero if any case regressed beyond ``--tolerance``. Cases with an absolute
+budget (embedding accuracy, per-operation overhead) fail the run whenever the
+budget is missed.
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+import structlog
+from structlog import get_logger
+
+from benchmarks.harness import CaseResult, ameasure, compare, measure
+
+
+logger = get_logger()
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+DIM = 384
+_WORDS = (
+    "vector index query latency cache token model search answer document chunk "
+    "embedding throughput region bucket snapshot provider retrieval context"
+).split()
+
+Results = dict[str, CaseResult]
+
+
+def synthetic_vectors(n: int, dim: int = DIM, seed: int = 0) -> np.ndarray:
+    """Return ``n`` L2-normalised float32 vectors from a seeded RNG."""
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim), dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs
+
+
+def synthetic_texts(n: int, words: int = 48, seed: int = 0) -> list[str]:
+    """Return ``n`` pseudo-sentences of roughly ``words`` tokens each."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(_WORDS), size=(n, words))
+    return [" ".join(_WORDS[j] for j in row) for row in picks]
+
+
+def bench_embed(args: argparse.Namespace, results: Results) -> None:
+    """Benchmark ``Embeddings.embed`` at several batch sizes."""
+    from service.rag.embeddings import Embeddings
+
+    loaded: list[Embeddings] = []
+    results["embed.startup"] = measure(lambda _: loaded.append(Embeddings()), 1)
+    emb = loaded[0]
+    for batch in (1, 32, 256):
+        texts = synthetic_texts(batch)
+        iters = max(3, args.queries // batch)
+
+        def run(_: int, texts: list[str] = texts) -> None:
+            emb.embed(texts)
+
+        results[f"embed.batch{batch}"] = measure(run, iters, warmup=1, items=batch * iters)
+
+
+# name -> (EMBED_RUNTIME, EMBED_QUANTIZE); the first entry is the accuracy reference.
+EMBED_RUNTIMES = {"torch": ("torch", False), "onnx": ("onnx", False), "onnx_int8": ("onnx", True)}
+_COLD_START = "from service.rag.embeddings import Embeddings; Embeddings().embed(['warm up'])"
+
+
+def _runtime_env(runtime: str, quantize: bool) -> dict[str, str]:
+    return {
+        **os.environ,
+        "EMBED_PROVIDER": "local",
+        "EMBED_RUNTIME": runtime,
+        "EMBED_QUANTIZE": str(quantize).lower(),
+    }
+
+
+def _accuracy(vectors: np.ndarray, reference: np.ndarray, quantized: bool) -> CaseResult:
+    from service.rag.onnx_embeddings import FP32_TOLERANCE, INT8_MIN_COSINE
+
+    max_abs_diff = float(np.abs(vectors - reference).max())
+    cosines = (vectors * reference).sum(axis=1) / (
+        np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+    min_cosine = float(cosines.min())
+    ok = min_cosine >= INT8_MIN_COSINE if quantized else max_abs_diff <= FP32_TOLERANCE
+    return {
+        "max_abs_diff": round(max_abs_diff, 6),
+        "min_cosine": round(min_cosine, 6),
+        "within_tolerance": ok,
+    }
+
+
+def _bench_runtime(
+    name: str, runtime: str, quantize: bool, args: argparse.Namespace, results: Results
+) -> np.ndarray:
+    """Time one embedding runtime and return its vectors for the shared texts."""
+    from service.config import settings
+    from service.rag.embeddings import Embeddings
+
+    settings.embed_quantize = quantize
+    emb = Embeddings(provider="local", runtime=runtime)  # exports ONNX on first use
+    env = _runtime_env(runtime, quantize)
+
+    def cold_start(_: int) -> None:
+        cmd = [sys.executable, "-c", _COLD_START]
+        subprocess.run(cmd, env=env, check=True, capture_output=True)
+
+    results[f"embed_runtime.{name}.startup"] = measure(cold_start, 3)
+    texts = synthetic_texts(256)
+    for batch in (1, 32, 256):
+        iters = max(3, args.queries // batch)
+
+        def run(_: int, texts: list[str] = texts[:batch]) -> None:
+            emb.embed(texts)
+
+        results[f"embed_runtime.{name}.batch{batch}"] = measure(
+            run, iters, warmup=1, items=batch * iters
+        )
+    vectors: np.ndarray = emb.embed(texts)
+    return vectors
+
+
+def bench_embed_runtime(args: argparse.Namespace, results: Results) -> None:
+    """Compare PyTorch, ONNX and ONNX int8 embeddings side by side.
+
+    Reports cold-start time (a fresh interpreter importing and loading the
+    model, after the ONNX export has been done once), throughput per batch
+    size, and accuracy against the PyTorch vectors.
+    """
+    from service.config import settings
+
+    quantize_setting = settings.embed_quantize
+    reference: np.ndarray | None = None
+    try:
+        for name, (runtime, quantize) in EMBED_RUNTIMES.items():
+            vectors = _bench_runtime(name, runtime, quantize, args, results)
+            if reference is None:
+                reference = vectors
+            else:
+                results[f"embed_runtime.{name}.accuracy"] = _accuracy(vectors, reference, quantize)
+            logger.info("bench.embed_runtime.done", runtime=name)
+    finally:
+        settings.embed_quantize = quantize_setting
+
+
+def _bench_backend(
+    name: str, factory: Callable[[], Any], size: int, args: argparse.Namespace, results: Results
+) -> None:
+    vecs = synthetic_vectors(size)
+    texts = [f"doc-{i}" for i in range(size)]
+    metas: list[dict[str, object]] = [{"id": i} for i in range(size)]
+    chunk = 10_000
+    chunks = range(0, size, chunk)
+    backend = factory()
+
+    def add(i: int) -> None:
+        lo = chunks[i]
+        backend.add(texts[lo : lo + chunk], metas[lo : lo + chunk], vecs[lo : lo + chunk])
+
+    results[f"vector.{name}.add.n{size}"] = measure(add, len(chunks), items=size)
+    # Annoy serves its last built index until the ingest worker swaps in a new
+    # one (FAISS is a no-op); time that step as the pipeline runs it.
+    results[f"vector.{name}.build.n{size}"] = measure(
+        lambda _: backend.swap_index(backend.build_index()), 1
+    )
+    queries = synthetic_vectors(args.queries, seed=1)
+    results[f"vector.{name}.search.n{size}"] = measure(
+        lambda i: backend.search(queries[i], args.k), args.queries, warmup=5
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index")
+        results[f"vector.{name}.persist.n{size}"] = measure(lambda _: backend.persist(path), 1)
+        fresh = factory()
+        results[f"vector.{name}.load.n{size}"] = measure(lambda _: fresh.load(path), 1)
+
+
+def bench_vector(args: argparse.Namespace, results: Results) -> None:
+    """Benchmark FAISS and Annoy add/search/persist/load, and MMR reranking."""
+    from service.rag.mmr import mmr_select
+    from service.rag.vector_backends.annoy_backend import AnnoyBackend
+    from service.rag.vector_backends.faiss_backend import FaissBackend
+
+    for size in args.sizes:
+        _bench_backend("faiss", lambda: FaissBackend(DIM), size, args, results)
+        _bench_backend("annoy", lambda: AnnoyBackend(DIM), size, args, results)
+        logger.info("bench.vector.done", size=size)
+    candidates = synthetic_vectors(100, seed=2)
+    queries = synthetic_vectors(args.queries, seed=3)
+    results[f"vector.mmr.c100.k{args.k}"] = measure(
+        lambda i: mmr_select(queries[i], candidates, args.k), args.queries, warmup=5
+    )
+
+
+# Overhead budget for one ``with HISTOGRAM.time():`` block.
+TIMER_TARGET_NS = 1000.0
+
+
+def bench_metrics(args: argparse.Namespace, results: Results) -> None:
+    """Benchmark the overhead a histogram timer adds around a block."""
+    from service.telemetry.metrics import Histogram, Registry
+
+    timer = Histogram("bench_seconds", "benchmark", ("stage",), registry=Registry()).labels("x")
+    blocks = 100_000
+
+    def timed(_: int) -> None:
+        for _ in range(blocks):
+            with timer.time():
+                pass
+
+    def empty(_: int) -> None:
+        for _ in range(blocks):
+            pass
+
+    result = measure(timed, 9, warmup=1, items=blocks * 9)
+    loop = measure(empty, 9, warmup=1)
+    # Best of the runs, as timeit does: scheduler noise only ever adds time.
+    ns_per_op = (result["min_ms"] - loop["min_ms"]) * 1e6 / blocks
+    result["ns_per_op"] = round(ns_per_op, 1)
+    result["target_ns"] = TIMER_TARGET_NS
+    result["within_tolerance"] = ns_per_op <= TIMER_TARGET_NS
+    results["metrics.timer"] = result
+
+
+def bench_pipeline(args: argparse.Namespace, results: Results) -> None:
+    """Benchmark ``RAGPipeline`` ingest/search/answer end to end."""
+    from service.rag.models import Document
+    from service.rag.pipeline import RAGPipeline
+
+    pipeline = RAGPipeline(DIM)
+    texts = synthetic_texts(args.docs)
+    batch = 100
+    batches = [
+        [Document(text=t, metadata={"id": lo + j}) for j, t in enumerate(texts[lo : lo + batch])]
+        for lo in range(0, args.docs, batch)
+    ]
+    results[f"pipeline.ingest.n{args.docs}"] = measure(
+        lambda i: pipeline.ingest_documents(batches[i]), len(batches), items=args.docs
+    )
+    queries = synthetic_texts(args.queries, words=8, seed=1)
+    results["pipeline.search"] = measure(
+        lambda i: pipeline.search(queries[i], args.k), args.queries, warmup=3
+    )
+    results["pipeline.answer"] = measure(
+        lambda i: pipeline.answer(queries[i]), args.queries, warmup=3
+    )
+
+
+def bench_rest(args: argparse.Namespace, results: Results) -> None:
+    """Benchmark REST endpoints in-process through an ASGI transport."""
+    import httpx
+
+    from service.config import settings
+    from service.rest import admission
+
+    # Time the endpoints, not 429/503 rejections: admission control is off for
+    # the benchmark (in-flight caps are read when the app builds its routers).
+    settings.inflight_limits = {}
+    admission.rate_limiter = None
+    from service.rest.app import app
+
+    headers = {"x-api-key": "test-api-key"}
+    queries = synthetic_texts(args.queries, words=8, seed=2)
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"{method} {url} returned {response.status_code}: {response.text[:200]}"
+                    )
+                return response
+
+            results["rest.healthz"] = await ameasure(
+                lambda _: request("GET", "/healthz"), args.queries, warmup=5
+            )
+            results["rest.rag.search"] = await ameasure(
+                lambda i: request(
+                    "GET", "/rag/search", params={"q": queries[i], "k": args.k}, headers=headers
+                ),
+                args.queries,
+                warmup=3,
+            )
+            results["rest.rag.answer"] = await ameasure(
+                lambda i: request("POST", "/rag/answer", json=queries[i], headers=headers),
+                args.queries,
+                warmup=3,
+            )
+
+    asyncio.run(run())
+
+
+SUITES: dict[str, Callable[[argparse.Namespace, Results], None]] = {
+    "embed": bench_embed,
+    "embed_runtime": bench_embed_runtime,
+    "vector": bench_vector,
+    "metrics": bench_metrics,
+    "pipeline": bench_pipeline,
+    "rest": bench_rest,
+}
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", default=",".join(SUITES), help="Comma-separated suites.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Vector corpus sizes.")
+    parser.add_argument("--queries", type=int, default=200, help="Timed queries per case.")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per search.")
+    parser.add_argument("--docs", type=int, default=1000, help="Documents for pipeline ingest.")
+    parser.add_argument("--output", type=Path, help="Write JSON results here (default stdout).")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/QPS drift.")
+    args = parser.parse_args(argv)
+    args.suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the selected suites, emit JSON and return a process exit code."""
+    args = _parse_args(argv)
+    # Keep stdout clean for the JSON report.
+    structlog.configure(logger_factory=structlog.PrintLoggerFactory(sys.stderr))
+    results: Results = {}
+    skipped: dict[str, str] = {}
+    for name in args.suites:
+        logger.info("bench.suite.start", suite=name)
+        try:
+            SUITES[name](args, results)
+        except Exception as exc:  # missing optional deps, model downloads, ...
+            logger.warning("bench.suite.skipped", suite=name, error=str(exc))
+            skipped[name] = str(exc)
+
+    report: dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "suites": args.suites,
+            "sizes": args.sizes,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    exit_code = 0
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        logger.info("bench.baseline.saved", path=str(args.baseline))
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())["results"]
+        # Only compare suites that were requested in this run.
+        scoped = {k: v for k, v in baseline.items() if k.split(".", 1)[0] in args.suites}
+        report["regressions"] = compare(results, scoped, args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+    # Accuracy and per-operation budgets are absolute, baseline or not.
+    failed = [name for name, r in results.items() if r.get("within_tolerance") is False]
+    if failed:
+        report["failed_checks"] = failed
+        exit_code = 1
+
+    payload = json.dumps(report, indent=2) + "\n"
+    if args.output:
+        args.output.write_text(payload)
+    else:
+        sys.stdout.write(payload)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
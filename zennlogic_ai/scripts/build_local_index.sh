@@ -1,2 +1,3 @@
 #!/usr/bin/env bash
-uv run python src/service/rag/pipeline.py --build-local
+# Usage: scripts/build_local_index.sh [--source DIR_OR_S3_PREFIX] [--batch-size N] [--output PATH]
+uv run python src/service/rag/pipeline.py --build-local "$@"
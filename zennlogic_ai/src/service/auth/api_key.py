@@ -1,25 +1,128 @@
-"""API key auth dependency for FastAPI."""
+"""API key auth dependency for FastAPI.
+
+Active keys are held in memory by :class:`APIKeyCache` and refreshed in the
+background once their TTL lapses (stale-while-revalidate), so a request only
+pays for an in-memory constant-time comparison, never a parameter store
+round trip. Several keys may be active at once to allow rotation.
+"""
+
+import asyncio
+from collections.abc import Callable, Iterable
+import hmac
+import threading
+import time
 
 from fastapi import Header, HTTPException, status
+from structlog import get_logger
 
-from service.aws.ssm import get_api_key
+from service.aws.ssm import get_api_keys
 from service.config import settings
+from service.singleflight import AsyncSingleFlight
+from service.telemetry.metrics import CACHE_LOOKUPS
+
+
+logger = get_logger()
+
+_HIT = CACHE_LOOKUPS.labels("api_keys", "hit")
+_STALE = CACHE_LOOKUPS.labels("api_keys", "stale")
+_MISS = CACHE_LOOKUPS.labels("api_keys", "miss")
+
+
+class APIKeyCache:
+    """In-memory set of active API keys with TTL and background refresh."""
+
+    def __init__(
+        self, loader: Callable[[], Iterable[str]], ttl_s: float = 300.0, retry_s: float = 5.0
+    ) -> None:
+        """Create an empty cache.
+
+        Args:
+            loader: Blocking callable returning the currently active keys.
+            ttl_s: How long loaded keys are served before a refresh starts.
+            retry_s: Delay before retrying after a failed refresh; the last
+                good keys keep being served meanwhile.
+        """
+        self._loader = loader
+        self.ttl_s = ttl_s
+        self.retry_s = retry_s
+        self._keys: tuple[bytes, ...] | None = None
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        # Concurrent requests before the first successful load share one load.
+        self._cold_load = AsyncSingleFlight("auth.keys")
+
+    def refresh(self) -> bool:
+        """Reload keys now (blocking); return whether the load succeeded."""
+        try:
+            keys = tuple(key.encode() for key in self._loader() if key)
+        except Exception as exc:
+            logger.warning("auth.keys.refresh_failed", error=str(exc))
+            with self._lock:
+                self._expires_at = time.monotonic() + self.retry_s
+                self._refreshing = False
+            return False
+        with self._lock:
+            self._keys = keys
+            self._expires_at = time.monotonic() + self.ttl_s
+            self._refreshing = False
+        logger.debug("auth.keys.refreshed", count=len(keys))
+        return True
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="api-key-refresh", daemon=True).start()
 
+    async def keys(self) -> tuple[bytes, ...]:
+        """Return the active keys, loading them on first use.
 
-def api_key_auth(x_api_key: str | None = Header(None)) -> str:
+        Until a load succeeds, concurrent callers share one load, and for
+        ``retry_s`` after a failed one callers get no keys without retrying.
+        """
+        keys = self._keys
+        if keys is None:
+            _MISS.inc()
+            if time.monotonic() < self._expires_at:
+                return ()  # the last load failed; do not hammer the parameter store
+            await self._cold_load.do(None, lambda: asyncio.to_thread(self.refresh))
+            return self._keys or ()
+        if time.monotonic() >= self._expires_at:
+            _STALE.inc()
+            self._refresh_in_background()
+        else:
+            _HIT.inc()
+        return keys
+
+    async def verify(self, candidate: str) -> bool:
+        """Check ``candidate`` against every active key in constant time."""
+        given = candidate.encode()
+        matched = False
+        # No early exit: timing must not reveal which (or whether a) key matched.
+        for key in await self.keys():
+            matched |= hmac.compare_digest(given, key)
+        return matched
+
+
+def _load_keys() -> list[str]:
+    # In local development, use a fixed test key; in other environments, read SSM.
+    if settings.env == "local":
+        return ["test-api-key"]
+    return get_api_keys()
+
+
+key_cache = APIKeyCache(_load_keys, ttl_s=settings.api_key_cache_ttl_s)
+
+
+async def api_key_auth(x_api_key: str | None = Header(None)) -> str:
     """Authenticate using API key from header.
 
     Returns the provided API key on success.
     """
     if not x_api_key:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="API key required")
-
-    # In local development, use a test key; in other environments, fetch from SSM
-    if settings.env == "local":
-        expected: str | None = "test-api-key"  # Use a fixed test key for local development
-    else:
-        expected = get_api_key()
-
-    if x_api_key != expected:
+    if not await key_cache.verify(x_api_key):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
     return x_api_key
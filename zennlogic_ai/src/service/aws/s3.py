@@ -1,16 +1,124 @@
-"""S3 helpers for snapshot sync."""
+"""S3 helpers for snapshot sync and bulk object access."""
 
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
 from typing import Any
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 from service.config import settings
 
 
+_client: Any = None
+_client_lock = threading.Lock()
+
+
 def get_s3_client() -> Any:
-    """Get configured S3 client.
+    """Get the shared, configured S3 client.
 
     Returns a boto3 S3 client. The concrete type is dynamic, so we annotate
-    as Any to avoid heavy boto typing dependencies.
+    as Any to avoid heavy boto typing dependencies. The client is created once
+    (boto3 clients are thread-safe, their creation is not) with a connection
+    pool sized for concurrent transfers and adaptive retries.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                config = Config(
+                    max_pool_connections=settings.s3_max_pool_connections,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                    tcp_keepalive=True,
+                )
+                session = boto3.session.Session()
+                _client = session.client("s3", region_name=settings.aws_region, config=config)
+    return _client
+
+
+def reset_s3_client() -> None:
+    """Drop the shared client (e.g. after credential changes or in tests)."""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def _transfer_config() -> TransferConfig:
+    part_size = settings.s3_part_size_mb * 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=settings.s3_transfer_concurrency,
+        use_threads=True,
+    )
+
+
+def iter_objects(
+    prefix: str, bucket: str | None = None, page_size: int = 1000
+) -> Iterator[dict[str, Any]]:
+    """Stream object summaries under ``prefix`` page by page.
+
+    Only one page of results is held in memory at a time, and there is no
+    1,000-key truncation.
     """
-    return boto3.client("s3", region_name=settings.aws_region)
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=bucket or settings.s3_bucket,
+        Prefix=prefix,
+        PaginationConfig={"PageSize": page_size},
+    )
+    for page in pages:
+        yield from page.get("Contents", [])
+
+
+def list_objects_page(
+    prefix: str, cursor: str | None = None, limit: int = 1000, bucket: str | None = None
+) -> tuple[list[str], str | None]:
+    """Return one page of keys and the cursor for the next page (None when done)."""
+    kwargs: dict[str, Any] = {
+        "Bucket": bucket or settings.s3_bucket,
+        "Prefix": prefix,
+        "MaxKeys": limit,
+    }
+    if cursor:
+        kwargs["ContinuationToken"] = cursor
+    resp: dict[str, Any] = get_s3_client().list_objects_v2(**kwargs)
+    keys = [obj["Key"] for obj in resp.get("Contents", [])]
+    return keys, resp.get("NextContinuationToken") if resp.get("IsTruncated") else None
+
+
+def get_object_bytes(key: str, bucket: str | None = None) -> bytes:
+    """Download one object; large objects are fetched as concurrent ranged GETs."""
+    buf = io.BytesIO()
+    get_s3_client().download_fileobj(
+        bucket or settings.s3_bucket, key, buf, Config=_transfer_config()
+    )
+    return buf.getvalue()
+
+
+def put_object_bytes(key: str, data: bytes, bucket: str | None = None) -> None:
+    """Upload one object; large payloads are sent as concurrent multipart parts."""
+    get_s3_client().upload_fileobj(
+        io.BytesIO(data), bucket or settings.s3_bucket, key, Config=_transfer_config()
+    )
+
+
+def get_objects(
+    keys: list[str], bucket: str | None = None, max_workers: int = 8
+) -> dict[str, bytes]:
+    """Download several objects concurrently, returning ``{key: bytes}``."""
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="s3-get") as pool:
+        blobs = pool.map(lambda k: get_object_bytes(k, bucket), keys)
+        return dict(zip(keys, blobs, strict=True))
+
+
+def put_objects(
+    items: Mapping[str, bytes], bucket: str | None = None, max_workers: int = 8
+) -> None:
+    """Upload several objects concurrently."""
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="s3-put") as pool:
+        # list() drains the iterator so upload errors propagate here.
+        list(pool.map(lambda kv: put_object_bytes(kv[0], kv[1], bucket), items.items()))
@@ -2,19 +2,38 @@
 
 from typing import Any
 
+import boto3
+
+from service.config import settings
+
 
 def get_ssm_client() -> Any:
     """Get configured SSM client.
 
-    This is a placeholder used in tests and local development. Implement a
-    real boto3.client('ssm') creation when wiring AWS credentials.
+    The concrete type is dynamic, so we annotate as Any to avoid heavy boto
+    typing dependencies. Keys are cached by ``service.auth.api_key``, so this
+    is only called on (background) refresh.
+    """
+    return boto3.client("ssm", region_name=settings.aws_region)
+
+
+def get_api_keys() -> list[str]:
+    """Get the active API keys from SSM parameter store.
+
+    The parameter (``settings.ssm_api_key_param``) holds one key or, during
+    rotation, a comma-separated list of keys that are all accepted.
     """
-    return None  # TODO: Implement actual client
+    resp: dict[str, Any] = get_ssm_client().get_parameter(
+        Name=settings.ssm_api_key_param, WithDecryption=True
+    )
+    value: str = resp["Parameter"]["Value"]
+    return [key.strip() for key in value.split(",") if key.strip()]
 
 
 def get_api_key() -> str | None:
     """Get API key from SSM parameter store.
 
-    Returns the API key string when configured, otherwise None.
+    Returns the first active key when configured, otherwise None.
     """
-    return None  # TODO: Implement actual key retrieval
+    keys = get_api_keys()
+    return keys[0] if keys else None
@@ -21,6 +21,51 @@ def _get_env_int(key: str, default: str) -> int:
     return int(os.getenv(key, default))
 
 
+def _get_env_float(key: str, default: str) -> float:
+    return float(os.getenv(key, default))
+
+
+def _get_env_optional_float(key: str) -> float | None:
+    value = os.getenv(key, "").strip()
+    return float(value) if value else None
+
+
+def _get_env_optional_int(key: str) -> int | None:
+    value = os.getenv(key, "").strip()
+    return int(value) if value else None
+
+
+def _get_env_limits(key: str, default: str) -> dict[str, int]:
+    """Parse ``name=int`` pairs separated by commas (e.g. ``rag.search=8,s3.list=2``)."""
+    limits: dict[str, int] = {}
+    for item in os.getenv(key, default).split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+def _get_rate_limit_backend() -> Literal["memory", "redis"]:
+    value = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    if value in ("memory", "redis"):
+        return value  # type: ignore
+    return "memory"
+
+
+def _get_trace_exporter() -> Literal["none", "file", "otlp"]:
+    value = os.getenv("TRACE_EXPORTER", "none")
+    if value in ("none", "file", "otlp"):
+        return value  # type: ignore
+    return "none"
+
+
+def _get_mcp_transport() -> Literal["stdio", "tcp", "unix"]:
+    value = os.getenv("MCP_TRANSPORT", "stdio")
+    if value in ("stdio", "tcp", "unix"):
+        return value  # type: ignore
+    return "stdio"
+
+
 def _get_vector_backend() -> Literal["faiss", "annoy", "auto"]:
     value = os.getenv("VECTOR_BACKEND", "auto")
     if value in ("faiss", "annoy", "auto"):
@@ -28,18 +73,36 @@ def _get_vector_backend() -> Literal["faiss", "annoy", "auto"]:
     return "auto"
 
 
-def _get_provider() -> Literal["openai", "bedrock"]:
+def _get_provider() -> Literal["openai", "anthropic", "local", "bedrock"]:
     value = os.getenv("LLM_PROVIDER", "openai")
-    if value in ("openai", "bedrock"):
+    if value in ("openai", "anthropic", "local", "bedrock"):
         return value  # type: ignore
     return "openai"
 
 
-def _get_embed_provider() -> Literal["openai", "bedrock"]:
-    value = os.getenv("EMBED_PROVIDER", "openai")
-    if value in ("openai", "bedrock"):
+def _get_embed_runtime() -> Literal["torch", "onnx"]:
+    value = os.getenv("EMBED_RUNTIME", "torch")
+    if value in ("torch", "onnx"):
         return value  # type: ignore
-    return "openai"
+    return "torch"
+
+
+def _get_embed_provider() -> Literal["local", "openai", "bedrock"]:
+    value = os.getenv("EMBED_PROVIDER", "local")
+    if value in ("local", "openai", "bedrock"):
+        return value  # type: ignore
+    return "local"
+
+
+_DEFAULT_EMBED_MODELS = {
+    "local": "sentence-transformers/all-MiniLM-L6-v2",
+    "openai": "text-embedding-3-small",
+    "bedrock": "amazon.titan-embed-text-v2:0",
+}
+
+
+def _get_embed_model() -> str:
+    return os.getenv("EMBED_MODEL") or _DEFAULT_EMBED_MODELS[_get_embed_provider()]
 
 
 class Settings(BaseModel):
@@ -53,35 +116,191 @@ class Settings(BaseModel):
 
     # API Keys
     openai_api_key: str | None = Field(default_factory=lambda: os.getenv("OPENAI_API_KEY"))
+    anthropic_api_key: str | None = Field(default_factory=lambda: os.getenv("ANTHROPIC_API_KEY"))
 
     # AWS Services
     bedrock_region: str | None = Field(default_factory=lambda: os.getenv("BEDROCK_REGION"))
     ssm_api_key_param: str = Field(
         default_factory=lambda: f"/zennlogic/{os.getenv('ENV', 'local')}/api-key"
     )
+    api_key_cache_ttl_s: float = Field(
+        default_factory=lambda: _get_env_float("API_KEY_CACHE_TTL_S", "300")
+    )
     s3_bucket: str = Field(
         default_factory=lambda: f"zennlogic-{os.getenv('ENV', 'local')}-data-bucket"
     )
     s3_prefix: str = Field(default_factory=lambda: _get_env_str("S3_PREFIX", "faiss/"))
+    s3_max_pool_connections: int = Field(
+        default_factory=lambda: _get_env_int("S3_MAX_POOL_CONNECTIONS", "50")
+    )
+    s3_transfer_concurrency: int = Field(
+        default_factory=lambda: _get_env_int("S3_TRANSFER_CONCURRENCY", "10")
+    )
+    s3_part_size_mb: int = Field(default_factory=lambda: _get_env_int("S3_PART_SIZE_MB", "8"))
 
     # AI/ML Configuration
     vector_backend: Literal["faiss", "annoy", "auto"] = Field(default_factory=_get_vector_backend)
-    embed_model: str = Field(
-        default_factory=lambda: _get_env_str(
-            "EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
-        )
+    embed_model: str = Field(default_factory=_get_embed_model)
+    llm_provider: Literal["openai", "anthropic", "local", "bedrock"] = Field(
+        default_factory=_get_provider
+    )
+    embed_provider: Literal["local", "openai", "bedrock"] = Field(
+        default_factory=_get_embed_provider
+    )
+    # Remote embeddings: requested vector size (unset: the model's native size),
+    # inputs per request, requests in flight, and retries of throttled (429) or
+    # failed batches
+    embed_dim: int | None = Field(default_factory=lambda: _get_env_optional_int("EMBED_DIM"))
+    embed_batch_size: int = Field(default_factory=lambda: _get_env_int("EMBED_BATCH_SIZE", "256"))
+    embed_concurrency: int = Field(default_factory=lambda: _get_env_int("EMBED_CONCURRENCY", "4"))
+    embed_max_retries: int = Field(default_factory=lambda: _get_env_int("EMBED_MAX_RETRIES", "5"))
+    # Local embeddings: PyTorch or ONNX Runtime (optionally int8), intra-op
+    # threads (0 = physical cores) and where exported ONNX models are kept
+    embed_runtime: Literal["torch", "onnx"] = Field(default_factory=_get_embed_runtime)
+    embed_quantize: bool = Field(default_factory=lambda: _get_env_bool("EMBED_QUANTIZE", "false"))
+    embed_threads: int = Field(default_factory=lambda: _get_env_int("EMBED_THREADS", "0"))
+    embed_onnx_dir: str = Field(
+        default_factory=lambda: _get_env_str("EMBED_ONNX_DIR", ".data/onnx")
     )
-    llm_provider: Literal["openai", "bedrock"] = Field(default_factory=_get_provider)
-    embed_provider: Literal["openai", "bedrock"] = Field(default_factory=_get_embed_provider)
 
     # Tracing & Monitoring
     langsmith_tracing: bool = Field(
         default_factory=lambda: _get_env_bool("LANGSMITH_TRACING", "false")
     )
+    # Distributed tracing (service.telemetry.tracing); TRACE_EXPORTER=none disables it
+    trace_exporter: Literal["none", "file", "otlp"] = Field(default_factory=_get_trace_exporter)
+    trace_file: str = Field(
+        default_factory=lambda: _get_env_str("TRACE_FILE", ".data/traces.jsonl")
+    )
+    trace_otlp_endpoint: str = Field(
+        default_factory=lambda: _get_env_str(
+            "TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"
+        )
+    )
+    trace_service_name: str = Field(
+        default_factory=lambda: _get_env_str("TRACE_SERVICE_NAME", "zennlogic_ai")
+    )
+    trace_sample_rate: float = Field(
+        default_factory=lambda: _get_env_float("TRACE_SAMPLE_RATE", "0.1")
+    )
+    trace_slow_ms: int = Field(default_factory=lambda: _get_env_int("TRACE_SLOW_MS", "0"))
+    trace_keep_errors: bool = Field(
+        default_factory=lambda: _get_env_bool("TRACE_KEEP_ERRORS", "false")
+    )
+
+    # MCP tool dispatch
+    mcp_tool_timeout_s: float = Field(
+        default_factory=lambda: _get_env_float("MCP_TOOL_TIMEOUT_S", "30")
+    )
+    mcp_max_workers: int = Field(default_factory=lambda: _get_env_int("MCP_MAX_WORKERS", "16"))
+    mcp_tool_concurrency: int = Field(
+        default_factory=lambda: _get_env_int("MCP_TOOL_CONCURRENCY", "4")
+    )
+    mcp_tool_limits: dict[str, int] = Field(
+        default_factory=lambda: _get_env_limits("MCP_TOOL_LIMITS", "")
+    )
+    mcp_batch_max_calls: int = Field(
+        default_factory=lambda: _get_env_int("MCP_BATCH_MAX_CALLS", "32")
+    )
+    # mcp-server JSON-RPC transport (stdio, tcp or unix) and per-connection pipelining limit
+    mcp_transport: Literal["stdio", "tcp", "unix"] = Field(default_factory=_get_mcp_transport)
+    mcp_host: str = Field(default_factory=lambda: _get_env_str("MCP_HOST", "127.0.0.1"))
+    mcp_port: int = Field(default_factory=lambda: _get_env_int("MCP_PORT", "8765"))
+    mcp_socket_path: str = Field(
+        default_factory=lambda: _get_env_str("MCP_SOCKET_PATH", ".data/mcp.sock")
+    )
+    mcp_max_in_flight: int = Field(default_factory=lambda: _get_env_int("MCP_MAX_IN_FLIGHT", "64"))
+
+    # LLM provider routing: per-attempt timeout, hedging and circuit breaking
+    openai_base_url: str = Field(
+        default_factory=lambda: _get_env_str("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    )
+    anthropic_base_url: str = Field(
+        default_factory=lambda: _get_env_str("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+    )
+    llm_timeout_s: float = Field(default_factory=lambda: _get_env_float("LLM_TIMEOUT_S", "30"))
+    llm_fallbacks: list[str] = Field(
+        default_factory=lambda: _get_env_str("LLM_FALLBACKS", "openai,anthropic").split(",")
+    )
+    llm_hedging: bool = Field(default_factory=lambda: _get_env_bool("LLM_HEDGING", "true"))
+    llm_hedge_after_s: float = Field(
+        default_factory=lambda: _get_env_float("LLM_HEDGE_AFTER_S", "2")
+    )
+    llm_breaker_failures: int = Field(
+        default_factory=lambda: _get_env_int("LLM_BREAKER_FAILURES", "5")
+    )
+    llm_breaker_cooldown_s: float = Field(
+        default_factory=lambda: _get_env_float("LLM_BREAKER_COOLDOWN_S", "30")
+    )
+
+    # LLM response cache (LLM_CACHE_TTL_S=0 disables; empty path keeps it in memory only)
+    llm_cache_ttl_s: float = Field(
+        default_factory=lambda: _get_env_float("LLM_CACHE_TTL_S", "3600")
+    )
+    llm_cache_max_entries: int = Field(
+        default_factory=lambda: _get_env_int("LLM_CACHE_MAX_ENTRIES", "1024")
+    )
+    llm_cache_path: str = Field(default_factory=lambda: _get_env_str("LLM_CACHE_PATH", ""))
+
+    # Admission control for the REST API (RATE_LIMIT_RPS=0 disables rate limiting)
+    rate_limit_rps: float = Field(default_factory=lambda: _get_env_float("RATE_LIMIT_RPS", "0"))
+    rate_limit_burst: int = Field(default_factory=lambda: _get_env_int("RATE_LIMIT_BURST", "20"))
+    rate_limit_backend: Literal["memory", "redis"] = Field(default_factory=_get_rate_limit_backend)
+    redis_url: str = Field(
+        default_factory=lambda: _get_env_str("REDIS_URL", "redis://localhost:6379/0")
+    )
+    inflight_limits: dict[str, int] = Field(
+        default_factory=lambda: _get_env_limits("INFLIGHT_LIMITS", "chat=32,rag=64")
+    )
+    inflight_retry_after_s: int = Field(
+        default_factory=lambda: _get_env_int("INFLIGHT_RETRY_AFTER_S", "1")
+    )
+
+    # Request profiling (disabled unless a sample rate or slow threshold is set)
+    profile_sample_rate: float = Field(
+        default_factory=lambda: _get_env_float("PROFILE_SAMPLE_RATE", "0")
+    )
+    profile_slow_ms: int = Field(default_factory=lambda: _get_env_int("PROFILE_SLOW_MS", "0"))
+    profile_interval_ms: float = Field(
+        default_factory=lambda: _get_env_float("PROFILE_INTERVAL_MS", "5")
+    )
+    profile_dir: str = Field(default_factory=lambda: _get_env_str("PROFILE_DIR", ".data/profiles"))
+    profile_max_files: int = Field(default_factory=lambda: _get_env_int("PROFILE_MAX_FILES", "200"))
+
+    # Responses: gzip JSON bodies of at least this many bytes (0 disables)
+    gzip_min_bytes: int = Field(default_factory=lambda: _get_env_int("GZIP_MIN_BYTES", "0"))
 
     # Model Parameters
     max_tokens: int = Field(default_factory=lambda: _get_env_int("MAX_TOKENS", "256"))
+    ingest_batch_size: int = Field(default_factory=lambda: _get_env_int("INGEST_BATCH_SIZE", "64"))
+    ingest_cpu_share: float = Field(
+        default_factory=lambda: _get_env_float("INGEST_CPU_SHARE", "0.5")
+    )
+    ingest_nice: int = Field(default_factory=lambda: _get_env_int("INGEST_NICE", "10"))
+    ingest_max_jobs: int = Field(default_factory=lambda: _get_env_int("INGEST_MAX_JOBS", "100"))
+    ingest_max_queued: int = Field(default_factory=lambda: _get_env_int("INGEST_MAX_QUEUED", "16"))
+    context_window_tokens: int = Field(
+        default_factory=lambda: _get_env_int("CONTEXT_WINDOW_TOKENS", "4096")
+    )
+    context_budget_tokens: int = Field(
+        default_factory=lambda: _get_env_int("CONTEXT_BUDGET_TOKENS", "1500")
+    )
     top_k: int = Field(default_factory=lambda: _get_env_int("TOP_K", "5"))
+    # MMR diversification: default lambda for searches and answers (unset = off)
+    # and how many nearest candidates it chooses from
+    mmr_lambda: float | None = Field(default_factory=lambda: _get_env_optional_float("MMR_LAMBDA"))
+    mmr_fetch_k: int = Field(default_factory=lambda: _get_env_int("MMR_FETCH_K", "100"))
+    # Multi-query answer graph (service.llm.graph): sub-queries and per-node timeouts
+    graph_subqueries: int = Field(default_factory=lambda: _get_env_int("GRAPH_SUBQUERIES", "3"))
+    graph_rewrite_timeout_s: float = Field(
+        default_factory=lambda: _get_env_float("GRAPH_REWRITE_TIMEOUT_S", "5")
+    )
+    graph_retrieve_timeout_s: float = Field(
+        default_factory=lambda: _get_env_float("GRAPH_RETRIEVE_TIMEOUT_S", "2")
+    )
+    graph_generate_timeout_s: float = Field(
+        default_factory=lambda: _get_env_float("GRAPH_GENERATE_TIMEOUT_S", "60")
+    )
 
 
 settings = Settings()
@@ -0,0 +1,204 @@
+"""Exact-match LLM response cache.
+
+Responses are keyed by a SHA-256 of the canonical JSON of everything that
+determines the output (provider, model, messages, max_tokens and any sampling
+parameters). Lookups check an in-process LRU first, then an optional SQLite
+file shared by workers on the same host; disk hits are promoted to memory.
+Entries expire after a TTL in both tiers.
+
+Streams are cached by recording every chunk of one complete pass and
+replaying the chunks later; a stream that is abandoned or fails midway is
+never stored.
+"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Literal
+
+from structlog import get_logger
+
+from service.telemetry.metrics import CACHE_LOOKUPS
+
+
+logger = get_logger()
+
+CacheMode = Literal["default", "no-cache", "no-store"]
+
+_HIT = CACHE_LOOKUPS.labels("llm_response", "hit")
+_MISS = CACHE_LOOKUPS.labels("llm_response", "miss")
+
+
+def cache_key(
+    provider: str,
+    model: str | None,
+    messages: list[dict[str, Any]],
+    max_tokens: int | None,
+    **params: Any,
+) -> str:
+    """Return the canonical hash identifying a request's output."""
+    payload = [provider, model, messages, max_tokens, params]
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def parse_cache_control(header: str | None) -> CacheMode:
+    """Map a request ``Cache-Control`` header to a cache mode.
+
+    ``no-store`` skips the cache entirely; ``no-cache`` (or ``max-age=0``)
+    skips the lookup but stores the fresh response.
+    """
+    directives = {d.strip().lower() for d in (header or "").split(",")}
+    if "no-store" in directives:
+        return "no-store"
+    if "no-cache" in directives or "max-age=0" in directives:
+        return "no-cache"
+    return "default"
+
+
+class MemoryLRU:
+    """Bounded LRU of ``key -> (expires_at, value)``."""
+
+    def __init__(self, max_entries: int) -> None:
+        """Hold at most ``max_entries`` entries."""
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        """Return the live value for ``key`` or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Store ``value`` until ``expires_at`` (epoch seconds)."""
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class SQLiteStore:
+    """On-disk tier: one SQLite table of JSON values with expiry times.
+
+    Expired rows are never served; they are deleted in one indexed sweep
+    every ``purge_every`` writes rather than on each write.
+    """
+
+    def __init__(self, path: str, purge_every: int = 256) -> None:
+        """Open (creating if needed) the database at ``path``."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at)"
+        )
+        self.purge_every = max(1, purge_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[float, Any] | None:
+        """Return ``(expires_at, value)`` for a live entry or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return None if row is None else (row[1], json.loads(row[0]))
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Upsert ``value``; every ``purge_every`` writes also drops expired rows."""
+        data = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, data, expires_at),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+
+class ResponseCache:
+    """Two-tier (memory, optional SQLite) TTL cache for LLM responses."""
+
+    def __init__(self, ttl_s: float, max_entries: int = 1024, path: str | None = None) -> None:
+        """Create the cache; ``path`` enables the on-disk tier."""
+        self.ttl_s = ttl_s
+        self.memory = MemoryLRU(max_entries)
+        self.disk = SQLiteStore(path) if path else None
+
+    async def get(self, key: str) -> Any | None:
+        """Return a cached response or None."""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                expires_at, value = entry
+                self.memory.set(key, value, expires_at)
+        (_MISS if value is None else _HIT).inc()
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serialisable response in both tiers."""
+        expires_at = time.time() + self.ttl_s
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, expires_at)
+            except (sqlite3.Error, TypeError, ValueError) as exc:
+                logger.warning("llm.cache.store_failed", error=str(exc))
+
+    async def fetch(
+        self, key: str, compute: Callable[[], Awaitable[Any]], mode: CacheMode = "default"
+    ) -> Any:
+        """Return the cached response for ``key`` or await ``compute()`` and store it."""
+        if mode == "default":
+            cached = await self.get(key)
+            if cached is not None:
+                return cached
+        result = await compute()
+        if mode != "no-store" and result is not None:
+            await self.set(key, result)
+        return result
+
+    async def stream(
+        self,
+        key: str,
+        produce: Callable[[], AsyncIterator[str]],
+        mode: CacheMode = "default",
+    ) -> AsyncIterator[str]:
+        """Replay a recorded stream or record ``produce()`` while passing it through."""
+        if mode == "default":
+            cached = await self.get(key)
+            if cached is not None:
+                for chunk in cached:
+                    yield chunk
+                return
+        chunks: list[str] = []
+        async for chunk in produce():
+            chunks.append(chunk)
+            yield chunk
+        # Only reached when the stream ran to completion.
+        if mode != "no-store":
+            await self.set(key, chunks)
@@ -1,7 +1,12 @@
 """LLM chains for chat and RAG answer."""
 
+from collections.abc import AsyncIterator
 from typing import Any
 
+from service.llm.cache import CacheMode, ResponseCache, cache_key
+from service.llm.router import ProviderRouter
+from service.singleflight import AsyncSingleFlight
+
 
 class LLMChain:
     """LLM chain for chat and embedding operations."""
@@ -17,30 +22,108 @@ class LLMChain:
 
         self.settings = settings
         self.providers = {
-            "openai": OpenAIProvider(api_key=settings.openai_api_key),
-            "anthropic": AnthropicProvider(api_key=getattr(settings, "anthropic_api_key", None)),
+            "openai": OpenAIProvider(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                timeout_s=settings.llm_timeout_s,
+            ),
+            "anthropic": AnthropicProvider(
+                api_key=settings.anthropic_api_key,
+                base_url=settings.anthropic_base_url,
+                timeout_s=settings.llm_timeout_s,
+            ),
             "local": LocalHFProvider(),
         }
+        # Only remote providers with credentials are used as hedge/failover targets.
+        keyed = {"openai": settings.openai_api_key, "anthropic": settings.anthropic_api_key}
+        self.router = ProviderRouter(
+            self.providers,
+            fallbacks=[name.strip() for name in settings.llm_fallbacks if keyed.get(name.strip())],
+            timeout_s=settings.llm_timeout_s,
+            hedge=settings.llm_hedging,
+            hedge_after_s=settings.llm_hedge_after_s,
+            failure_threshold=settings.llm_breaker_failures,
+            cooldown_s=settings.llm_breaker_cooldown_s,
+        )
+        self._chat_flight = AsyncSingleFlight("llm.chat")
+        self.cache = (
+            ResponseCache(
+                settings.llm_cache_ttl_s,
+                settings.llm_cache_max_entries,
+                settings.llm_cache_path or None,
+            )
+            if settings.llm_cache_ttl_s > 0
+            else None
+        )
 
-    def chat(
+    async def chat(
         self,
         messages: list[dict[str, Any]],
         model: str | None = None,
         max_tokens: int | None = None,
+        cache_mode: CacheMode = "default",
     ) -> Any:
         """Chat with LLM.
 
+        Responses are served from the exact-match response cache when
+        possible (see ``service.llm.cache``). On a miss, identical concurrent
+        requests (same provider, model, messages and max_tokens) are
+        coalesced onto a single routed call, which may be hedged or failed
+        over to another provider (see ``service.llm.router``). A response is
+        cached under the provider (and model) that actually produced it, so
+        an alternate's answer is never replayed for the preferred provider.
+
         Args:
             messages: List of chat messages.
             model: Model/provider name (str).
             max_tokens: Max tokens for response.
+            cache_mode: ``no-cache`` forces a fresh response (still stored),
+                ``no-store`` bypasses the cache entirely.
 
         Returns:
             str: Model response.
         """
         provider_key = self._select_provider(model)
+        key = cache_key(provider_key, model, messages, max_tokens)
+        if self.cache is not None and cache_mode == "default":
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+        answered, result = await self._chat_flight.do(
+            key,
+            lambda: self.router.route(
+                messages, preferred=provider_key, model=model, max_tokens=max_tokens
+            ),
+        )
+        if self.cache is not None and cache_mode != "no-store" and result is not None:
+            if answered != provider_key:
+                # Alternates are called with their default model (see the router).
+                key = cache_key(answered, None, messages, max_tokens)
+            await self.cache.set(key, result)
+        return result
+
+    def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        model: str | None = None,
+        max_tokens: int | None = None,
+        cache_mode: CacheMode = "default",
+    ) -> AsyncIterator[str]:
+        """Stream a chat response from the selected provider as text chunks.
+
+        A completed stream is recorded and later replayed from the response
+        cache. Streams are not hedged or coalesced.
+        """
+        provider_key = self._select_provider(model)
         provider = self.providers[provider_key]
-        return provider.chat(messages, model=model, max_tokens=max_tokens)
+
+        def produce() -> AsyncIterator[str]:
+            return provider.chat_stream(messages, model=model, max_tokens=max_tokens)
+
+        if self.cache is None:
+            return produce()
+        key = cache_key(provider_key, model, messages, max_tokens, stream=True)
+        return self.cache.stream(key, produce, cache_mode)
 
     def embed(
         self,
@@ -0,0 +1,293 @@
+"""Remote embedding clients (OpenAI-compatible HTTP API and AWS Bedrock).
+
+Inputs are split into API-sized batches that are sent concurrently, at most
+``concurrency`` at a time, over one pooled client. Throttled (429) and
+transient 5xx responses are retried with exponential backoff and full
+jitter, honouring ``Retry-After`` when the server sends one. Results are
+float32 arrays of shape ``(len(texts), dim)`` in input order.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import json
+import random
+import time
+from typing import Any
+
+import httpx
+import numpy as np
+from structlog import get_logger
+
+from service.telemetry.metrics import LLM_SECONDS
+from service.telemetry.tracing import HTTPX_HOOKS, span
+
+
+logger = get_logger()
+
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Native output size and the ``dimensions`` values each known model accepts
+# (None: any size up to the native one; empty: the native size only).
+_MODEL_DIMS: dict[str, tuple[int, frozenset[int] | None]] = {
+    "text-embedding-3-small": (1536, None),
+    "text-embedding-3-large": (3072, None),
+    "text-embedding-ada-002": (1536, frozenset()),
+    "amazon.titan-embed-text-v2:0": (1024, frozenset({256, 512, 1024})),
+    "amazon.titan-embed-text-v1": (1536, frozenset()),
+    "cohere.embed-english-v3": (1024, frozenset()),
+    "cohere.embed-multilingual-v3": (1024, frozenset()),
+}
+
+
+def resolve_dimensions(model: str, dimensions: int | None) -> tuple[int | None, int | None]:
+    """Check a requested output size against ``model``.
+
+    Returns:
+        The ``dimensions`` value to send (None: omit it) and the expected
+        vector size (None for unknown models: taken from the first response).
+
+    Raises:
+        ValueError: If ``model`` is known not to produce ``dimensions``-sized vectors.
+    """
+    known = _MODEL_DIMS.get(model)
+    if known is None:
+        return dimensions, dimensions
+    native, accepted = known
+    if dimensions is None or dimensions == native:
+        return None, native
+    if accepted is None:
+        if 0 < dimensions < native:
+            return dimensions, dimensions
+        raise ValueError(f"{model} supports dimensions 1 to {native}, not {dimensions}")
+    if dimensions in accepted:
+        return dimensions, dimensions
+    if accepted:
+        sizes = ", ".join(str(size) for size in sorted(accepted))
+        raise ValueError(f"{model} supports dimensions {sizes}, not {dimensions}")
+    raise ValueError(f"{model} only produces {native}-dimensional vectors, not {dimensions}")
+
+
+class RemoteEmbedder:
+    """Batching, concurrency and retry shared by the remote embedders."""
+
+    name = "remote"
+    # Output size: known from the model, else set by the first response.
+    dim: int | None = None
+
+    def __init__(
+        self,
+        batch_size: int,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        backoff_s: float = 0.5,
+        max_backoff_s: float = 20.0,
+    ) -> None:
+        """Configure batching and retries.
+
+        Args:
+            batch_size: Texts per API request.
+            concurrency: Requests in flight at once (also the pool size).
+            max_retries: Retries per batch for 429/5xx and transport errors.
+            backoff_s: First backoff; doubles per retry, with full jitter.
+            max_backoff_s: Upper bound for a single backoff.
+        """
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="embed")
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts``, returning a float32 array in input order."""
+        batches = [texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        if len(batches) == 1:
+            return self._embed_with_retry(batches[0])
+        if self.dim is None:
+            # Learn the output size from one batch before fanning out.
+            first = self._embed_with_retry(batches[0])
+            return np.concatenate([first, self.embed([t for b in batches[1:] for t in b])])
+        # Each batch runs in a copy of the caller's context so its span nests
+        # under the caller's; results are collected in submission order.
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, self._embed_with_retry, batch)
+            for batch in batches
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def _embed_with_retry(self, batch: list[str]) -> np.ndarray:
+        attributes = {"llm.provider": self.name, "embed.texts": len(batch)}
+        with span("llm.embed", attributes, "client") as current:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    vectors = self._embed_batch(batch)
+                except (httpx.HTTPStatusError, httpx.TransportError) as exc:
+                    response = getattr(exc, "response", None)
+                    status = response.status_code if response is not None else None
+                    if attempt >= self.max_retries or (
+                        status is not None and status not in _RETRY_STATUSES
+                    ):
+                        raise
+                    delay = self._backoff(attempt, response)
+                    logger.warning(
+                        "embed.retry",
+                        provider=self.name,
+                        status=status,
+                        attempt=attempt,
+                        delay=delay,
+                    )
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                finally:
+                    LLM_SECONDS.labels(self.name, "embed").observe(time.perf_counter() - start)
+                if vectors.shape[0] != len(batch):
+                    raise ValueError(
+                        f"{self.name} returned {vectors.shape[0]} of {len(batch)} vectors"
+                    )
+                if self.dim is None:
+                    self.dim = int(vectors.shape[1])
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(
+                        f"{self.name} returned {vectors.shape[1]}-dimensional vectors, "
+                        f"expected {self.dim}"
+                    )
+                current.set_attribute("embed.retries", attempt)
+                return vectors
+
+    def _backoff(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff_s)
+            except ValueError:
+                pass  # HTTP-date form: fall back to our own schedule
+        return random.uniform(0, min(self.max_backoff_s, self.backoff_s * 2**attempt))
+
+    def _embed_batch(self, batch: list[str]) -> np.ndarray:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """Release the worker threads."""
+        self._executor.shutdown(wait=False)
+
+
+class OpenAIEmbedder(RemoteEmbedder):
+    """``POST {base_url}/embeddings`` on the OpenAI API or a compatible server."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: str | None,
+        model: str = "text-embedding-3-small",
+        base_url: str = "https://api.openai.com/v1",
+        dimensions: int | None = None,
+        timeout_s: float = 30.0,
+        batch_size: int = 256,
+        **kwargs: Any,
+    ) -> None:
+        """Create the pooled client.
+
+        Args:
+            api_key: Bearer token.
+            model: Embedding model name.
+            base_url: API root (override for proxies or local stand-ins).
+            dimensions: Output size for models that support shortening (None:
+                the model's native size).
+            timeout_s: HTTP timeout per request.
+            batch_size: Inputs per request (the API accepts up to 2048).
+            **kwargs: Concurrency and retry options of :class:`RemoteEmbedder`.
+        """
+        super().__init__(batch_size, **kwargs)
+        self.model = model
+        self.dimensions, self.dim = resolve_dimensions(model, dimensions)
+        self.client = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout_s,
+            limits=httpx.Limits(
+                max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+            ),
+            event_hooks=HTTPX_HOOKS,
+        )
+
+    def _embed_batch(self, batch: list[str]) -> np.ndarray:
+        payload: dict[str, Any] = {"model": self.model, "input": batch, "encoding_format": "float"}
+        if self.dimensions:
+            payload["dimensions"] = self.dimensions
+        resp = self.client.post("/embeddings", json=payload)
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda item: item["index"])
+        return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+
+    def close(self) -> None:
+        """Close the HTTP pool and worker threads."""
+        super().close()
+        self.client.close()
+
+
+class BedrockEmbedder(RemoteEmbedder):
+    """Bedrock ``InvokeModel`` for Titan (one text per call) or Cohere (batched) models.
+
+    Throttling is retried by botocore's adaptive retry mode rather than by
+    :class:`RemoteEmbedder`.
+    """
+
+    name = "bedrock"
+
+    def __init__(
+        self,
+        model: str = "amazon.titan-embed-text-v2:0",
+        region: str | None = None,
+        dimensions: int | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Create the Bedrock runtime client.
+
+        Args:
+            model: Bedrock model id (``amazon.titan-embed-*`` or ``cohere.embed-*``).
+            region: AWS region of the Bedrock endpoint.
+            dimensions: Output size (Titan v2 accepts 256, 512 or 1024; other
+                models only produce their native size).
+            **kwargs: Concurrency and retry options of :class:`RemoteEmbedder`.
+        """
+        import boto3
+        from botocore.config import Config
+
+        self.cohere = model.startswith("cohere.")
+        kwargs.setdefault("batch_size", 96 if self.cohere else 1)
+        super().__init__(**kwargs)
+        self.model = model
+        self.dimensions, self.dim = resolve_dimensions(model, dimensions)
+        config = Config(
+            max_pool_connections=self.concurrency,
+            retries={"max_attempts": self.max_retries + 1, "mode": "adaptive"},
+        )
+        self.client: Any = boto3.client("bedrock-runtime", region_name=region, config=config)
+
+    def _embed_batch(self, batch: list[str]) -> np.ndarray:
+        if self.cohere:
+            body = self._invoke({"texts": batch, "input_type": "search_document"})
+            return np.asarray(body["embeddings"], dtype=np.float32)
+        vectors = []
+        for text in batch:
+            request: dict[str, Any] = {"inputText": text}
+            if self.dimensions:
+                request["dimensions"] = self.dimensions
+            vectors.append(self._invoke(request)["embedding"])
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _invoke(self, request: dict[str, Any]) -> dict[str, Any]:
+        resp = self.client.invoke_model(
+            modelId=self.model,
+            body=json.dumps(request),
+            contentType="application/json",
+            accept="application/json",
+        )
+        body: dict[str, Any] = json.loads(resp["body"].read())
+        return body
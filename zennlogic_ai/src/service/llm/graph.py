@@ -1,2 +1,351 @@
-"""LangGraph stub for advanced LLM flows."""
-# Placeholder for LangGraph integration
+"""Concurrent DAG execution for multi-step LLM flows.
+
+A :class:`Graph` is a set of async :class:`Node` functions with declared
+dependencies. Each node starts as soon as all of its dependencies have
+finished, so independent branches run concurrently and a run takes as long
+as its slowest path rather than the sum of its nodes. Every node has its own
+timeout; a node with a ``fallback`` recovers from a timeout or error with a
+default value instead of failing the run. Node start offsets, durations and
+outcomes are logged and recorded in ``zennlogic_graph_node_duration_seconds``,
+and every run logs its critical path (the chain of nodes that set its
+latency). Plain asyncio is used, so no LangGraph install is needed.
+
+:class:`RetrievalGraph` is the multi-query RAG answer flow::
+
+    rewrite ──────> retrieve_subqueries ──┐
+    retrieve_query ───────────────────────┴──> merge ──> context ──> generate
+
+The original query is retrieved while the LLM is still rewriting it into
+sub-queries, all sub-queries are retrieved in one batch search, and the hit
+lists are fused by reciprocal rank (deduplicated per document) before the
+prompt is packed and sent to the LLM.
+"""
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from dataclasses import dataclass
+import graphlib
+import re
+import time
+from typing import Any, Literal
+
+from structlog import get_logger
+
+from service.config import settings
+from service.llm.chains import LLMChain
+from service.rag.context import Prompt
+from service.rag.models import AnswerResponse
+from service.rag.pipeline import RAGPipeline
+from service.telemetry.metrics import GRAPH_NODE_SECONDS
+from service.telemetry.tracing import span
+
+
+logger = get_logger()
+
+NodeStatus = Literal["ok", "timeout", "error", "cancelled"]
+Hits = list[tuple[int, float]]
+
+_REWRITE_PROMPT = (
+    "Write up to {n} short search queries, one per line, that together cover what is "
+    "needed to answer the question below. Reply with the queries only.\n\n"
+    "Question: {query}"
+)
+
+
+@dataclass(frozen=True)
+class Node:
+    """One step of a :class:`Graph`.
+
+    ``run`` receives the run's values so far (the graph inputs plus the
+    outputs of finished nodes, keyed by node name) and must not modify them.
+    """
+
+    name: str
+    run: Callable[[Mapping[str, Any]], Awaitable[Any]]
+    deps: tuple[str, ...] = ()
+    timeout_s: float | None = None
+    fallback: Callable[[], Any] | None = None
+
+
+@dataclass(frozen=True)
+class NodeTiming:
+    """When a node ran, in seconds from the start of its graph run."""
+
+    start_s: float
+    end_s: float
+    status: NodeStatus
+
+    @property
+    def duration_s(self) -> float:
+        """Time the node itself took (excluding waiting for dependencies)."""
+        return self.end_s - self.start_s
+
+
+@dataclass
+class GraphRun:
+    """Outputs and timings of one graph run."""
+
+    values: dict[str, Any]
+    timings: dict[str, NodeTiming]
+    elapsed_s: float
+    critical_path: list[str]
+
+
+def critical_path(nodes: Sequence[Node], timings: Mapping[str, NodeTiming]) -> list[str]:
+    """Return the chain of nodes, first to last, that determined the run's latency.
+
+    Starting from the node that finished last, repeatedly step to the
+    dependency that finished last (the one it was waiting for).
+    """
+    by_name = {node.name: node for node in nodes if node.name in timings}
+    if not by_name:
+        return []
+    node = max(by_name.values(), key=lambda n: timings[n.name].end_s)
+    path = [node.name]
+    while node.deps:
+        node = by_name[max(node.deps, key=lambda dep: timings[dep].end_s)]
+        path.append(node.name)
+    return path[::-1]
+
+
+class Graph:
+    """A DAG of async nodes run with maximal concurrency."""
+
+    def __init__(self, name: str, nodes: Sequence[Node]) -> None:
+        """Validate ``nodes`` and order them by dependency.
+
+        Raises:
+            ValueError: On duplicate node names, unknown dependencies or a cycle.
+        """
+        by_name = {node.name: node for node in nodes}
+        if len(by_name) != len(nodes):
+            raise ValueError(f"Duplicate node names in graph {name!r}")
+        for node in nodes:
+            unknown = set(node.deps) - by_name.keys()
+            if unknown:
+                raise ValueError(f"Node {node.name!r} depends on unknown nodes {sorted(unknown)}")
+        try:
+            order = graphlib.TopologicalSorter({n.name: n.deps for n in nodes}).static_order()
+            self.nodes = [by_name[node_name] for node_name in order]
+        except graphlib.CycleError as exc:
+            raise ValueError(f"Graph {name!r} has a cycle: {exc.args[1]}") from exc
+        self.name = name
+
+    async def run(self, **inputs: Any) -> GraphRun:
+        """Run every node once and return their outputs and timings.
+
+        Raises:
+            Exception: The first error (or ``TimeoutError``) of a node without
+                a fallback; the nodes still running are cancelled.
+        """
+        clash = inputs.keys() & {node.name for node in self.nodes}
+        if clash:
+            raise ValueError(f"Graph inputs shadow nodes: {sorted(clash)}")
+        t0 = time.perf_counter()
+        values: dict[str, Any] = dict(inputs)
+        timings: dict[str, NodeTiming] = {}
+        tasks: dict[str, asyncio.Task[None]] = {}
+        # Topological order: every dependency's task exists before its dependents'.
+        for node in self.nodes:
+            deps = [tasks[dep] for dep in node.deps]
+            tasks[node.name] = asyncio.create_task(
+                self._run_node(node, deps, values, timings, t0), name=f"{self.name}.{node.name}"
+            )
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        elapsed = time.perf_counter() - t0
+        path = critical_path(self.nodes, timings)
+        logger.info(
+            "llm.graph.run",
+            graph=self.name,
+            elapsed_ms=round(elapsed * 1000, 2),
+            critical_path=path,
+        )
+        return GraphRun(values, timings, elapsed, path)
+
+    async def _run_node(
+        self,
+        node: Node,
+        deps: list["asyncio.Task[None]"],
+        values: dict[str, Any],
+        timings: dict[str, NodeTiming],
+        t0: float,
+    ) -> None:
+        if deps:
+            await asyncio.gather(*deps)
+        start = time.perf_counter()
+        status: NodeStatus = "ok"
+        try:
+            with span(f"{self.name}.{node.name}", {"graph.node": node.name}):
+                values[node.name] = await asyncio.wait_for(node.run(values), node.timeout_s)
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as exc:
+            status = "timeout" if isinstance(exc, TimeoutError) else "error"
+            if node.fallback is None:
+                raise
+            logger.warning("llm.graph.fallback", graph=self.name, node=node.name, error=repr(exc))
+            values[node.name] = node.fallback()
+        finally:
+            end = time.perf_counter()
+            timings[node.name] = NodeTiming(start - t0, end - t0, status)
+            GRAPH_NODE_SECONDS.labels(self.name, node.name, status).observe(end - start)
+            logger.info(
+                "llm.graph.node",
+                graph=self.name,
+                node=node.name,
+                status=status,
+                start_ms=round((start - t0) * 1000, 2),
+                duration_ms=round((end - start) * 1000, 2),
+            )
+
+
+_LIST_MARKER = re.compile(r"^\s*(?:[-*]|\d+[.)])\s+")
+
+
+def parse_subqueries(text: str, query: str, limit: int) -> list[str]:
+    """Parse an LLM rewrite into at most ``limit`` distinct queries other than ``query``."""
+    seen = {query.strip().casefold()}
+    subqueries: list[str] = []
+    for line in text.splitlines():
+        # Tolerate list markers ("1.", "2)", "-", "*") and quoting.
+        candidate = _LIST_MARKER.sub("", line).strip().strip("\"'")
+        if candidate and candidate.casefold() not in seen:
+            seen.add(candidate.casefold())
+            subqueries.append(candidate)
+    return subqueries[:limit]
+
+
+def fuse_hits(rankings: Sequence[Hits], k: int, rrf_k: int = 60) -> Hits:
+    """Merge ranked hit lists by reciprocal rank fusion, one entry per document.
+
+    Ranks rather than raw scores are combined because backends disagree on
+    score direction (FAISS similarity, Annoy distance). Each document keeps
+    the score of its best-ranked occurrence.
+    """
+    fused: defaultdict[int, float] = defaultdict(float)
+    best: dict[int, tuple[int, float]] = {}
+    for hits in rankings:
+        for rank, (doc_id, score) in enumerate(hits):
+            fused[doc_id] += 1.0 / (rrf_k + rank + 1)
+            if doc_id not in best or rank < best[doc_id][0]:
+                best[doc_id] = (rank, score)
+    top = sorted(fused, key=fused.__getitem__, reverse=True)[:k]
+    return [(doc_id, best[doc_id][1]) for doc_id in top]
+
+
+class RetrievalGraph:
+    """Multi-query RAG answer: rewrite, concurrent retrieval, fusion, generation."""
+
+    def __init__(
+        self,
+        pipeline: RAGPipeline,
+        chain: LLMChain,
+        subqueries: int | None = None,
+        rewrite_timeout_s: float | None = None,
+        retrieve_timeout_s: float | None = None,
+        generate_timeout_s: float | None = None,
+    ) -> None:
+        """Build the graph; unset limits come from the ``GRAPH_*`` settings.
+
+        Args:
+            pipeline: Retrieval and prompt packing.
+            chain: LLM used to rewrite the query and to answer.
+            subqueries: Sub-queries requested from the LLM (0 skips rewriting).
+            rewrite_timeout_s: Budget for the rewrite; on expiry only the
+                original query is used.
+            retrieve_timeout_s: Budget for each retrieval branch; on expiry
+                that branch contributes no hits.
+            generate_timeout_s: Budget for the final LLM call.
+        """
+        self.pipeline = pipeline
+        self.chain = chain
+        self.subqueries = settings.graph_subqueries if subqueries is None else subqueries
+        if rewrite_timeout_s is None:
+            rewrite_timeout_s = settings.graph_rewrite_timeout_s
+        if retrieve_timeout_s is None:
+            retrieve_timeout_s = settings.graph_retrieve_timeout_s
+        if generate_timeout_s is None:
+            generate_timeout_s = settings.graph_generate_timeout_s
+        self.graph = Graph(
+            "rag.answer",
+            [
+                Node(
+                    "rewrite",
+                    self._rewrite,
+                    timeout_s=rewrite_timeout_s,
+                    fallback=list,
+                ),
+                Node(
+                    "retrieve_query",
+                    self._retrieve_query,
+                    timeout_s=retrieve_timeout_s,
+                    fallback=list,
+                ),
+                Node(
+                    "retrieve_subqueries",
+                    self._retrieve_subqueries,
+                    deps=("rewrite",),
+                    timeout_s=retrieve_timeout_s,
+                    fallback=list,
+                ),
+                Node("merge", self._merge, deps=("retrieve_query", "retrieve_subqueries")),
+                Node("context", self._context, deps=("merge",)),
+                Node(
+                    "generate",
+                    self._generate,
+                    deps=("context",),
+                    timeout_s=generate_timeout_s,
+                ),
+            ],
+        )
+
+    async def run(self, query: str) -> GraphRun:
+        """Run the graph for ``query``; ``values["generate"]`` holds the answer."""
+        return await self.graph.run(query=query)
+
+    async def answer(self, query: str) -> AnswerResponse:
+        """Answer ``query`` from the fused results of it and its sub-queries."""
+        run = await self.run(query)
+        response: AnswerResponse = run.values["generate"]
+        return response
+
+    async def _rewrite(self, values: Mapping[str, Any]) -> list[str]:
+        if self.subqueries <= 0:
+            return []
+        query = values["query"]
+        prompt = _REWRITE_PROMPT.format(n=self.subqueries, query=query)
+        reply = await self.chain.chat([{"role": "user", "content": prompt}])
+        return parse_subqueries(str(reply), query, self.subqueries)
+
+    async def _retrieve_query(self, values: Mapping[str, Any]) -> list[Hits]:
+        return await self._retrieve([values["query"]])
+
+    async def _retrieve_subqueries(self, values: Mapping[str, Any]) -> list[Hits]:
+        return await self._retrieve(values["rewrite"])
+
+    async def _retrieve(self, queries: list[str]) -> list[Hits]:
+        if not queries:
+            return []
+        # A timed-out search thread finishes in the background; its result is dropped.
+        return await asyncio.to_thread(
+            self.pipeline.retrieve_batch, queries, settings.top_k, settings.mmr_lambda
+        )
+
+    async def _merge(self, values: Mapping[str, Any]) -> Hits:
+        return fuse_hits(
+            [*values["retrieve_query"], *values["retrieve_subqueries"]], settings.top_k
+        )
+
+    async def _context(self, values: Mapping[str, Any]) -> Prompt:
+        return await asyncio.to_thread(self.pipeline.build_prompt, values["query"], values["merge"])
+
+    async def _generate(self, values: Mapping[str, Any]) -> AnswerResponse:
+        prompt: Prompt = values["context"]
+        reply = await self.chain.chat(prompt.messages, max_tokens=settings.max_tokens)
+        return self.pipeline.answer_response(prompt, str(reply))
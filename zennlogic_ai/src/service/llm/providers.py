@@ -1,14 +1,56 @@
 """LLM provider abstraction: OpenAI, Anthropic, and local HuggingFace."""
 
+import asyncio
+from collections.abc import AsyncIterator
+import time
 from typing import Any
 
 import httpx
 from structlog import get_logger
 
+from service.llm.embedders import OpenAIEmbedder
+from service.telemetry.metrics import LLM_SECONDS, LLM_TOKENS
+from service.telemetry.tracing import ASYNC_HTTPX_HOOKS, span
+
 
 logger = get_logger()
 
 
+async def _post_timed(
+    provider: str,
+    url: str,
+    payload: dict[str, Any],
+    headers: dict[str, str],
+    timeout_s: float = 10.0,
+) -> dict[str, Any]:
+    """POST ``payload`` and return the JSON body, recording TTFT and total latency.
+
+    TTFT is measured when response headers arrive, i.e. time to first byte.
+    """
+    start = time.perf_counter()
+    attributes = {"llm.provider": provider, "llm.model": str(payload.get("model"))}
+    try:
+        with span("llm.chat", attributes, "client") as current:
+            async with httpx.AsyncClient(
+                timeout=timeout_s, event_hooks=ASYNC_HTTPX_HOOKS
+            ) as client:
+                async with client.stream("POST", url, json=payload, headers=headers) as resp:
+                    current.set_attribute("http.response.status_code", resp.status_code)
+                    LLM_SECONDS.labels(provider, "ttft").observe(time.perf_counter() - start)
+                    await resp.aread()
+                    resp.raise_for_status()
+                    data: dict[str, Any] = resp.json()
+                    return data
+    finally:
+        LLM_SECONDS.labels(provider, "total").observe(time.perf_counter() - start)
+
+
+def _record_usage(provider: str, usage: dict[str, Any], input_key: str, output_key: str) -> None:
+    """Add provider-reported token usage to the token counters."""
+    LLM_TOKENS.labels(provider, "input").inc(int(usage.get(input_key) or 0))
+    LLM_TOKENS.labels(provider, "output").inc(int(usage.get(output_key) or 0))
+
+
 class LLMProvider:
     """LLM provider abstraction base class."""
 
@@ -30,6 +72,19 @@ class LLMProvider:
         """
         raise NotImplementedError()
 
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        model: str | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream a chat response as text chunks.
+
+        Providers without native streaming yield the whole response as a
+        single chunk.
+        """
+        yield str(await self.chat(messages, model=model, max_tokens=max_tokens))
+
     async def embed(self, texts: list[str], model: str | None = None) -> Any:
         """Generate embeddings via provider.
 
@@ -48,14 +103,25 @@ class LLMProvider:
 class OpenAIProvider(LLMProvider):
     """OpenAI chat provider using lowest-cost model (gpt-3.5-turbo)."""
 
-    def __init__(self, api_key: str | None) -> None:
+    def __init__(
+        self,
+        api_key: str | None,
+        base_url: str = "https://api.openai.com/v1",
+        timeout_s: float = 10.0,
+    ) -> None:
         """Initialize OpenAIProvider.
 
         Args:
             api_key: OpenAI API key.
+            base_url: API root (override for proxies or local stand-ins).
+            timeout_s: HTTP timeout per request.
         """
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
         self.model = "gpt-3.5-turbo"
+        self.embed_model = "text-embedding-3-small"
+        self._embedders: dict[str, OpenAIEmbedder] = {}
 
     async def chat(
         self,
@@ -77,7 +143,7 @@ class OpenAIProvider(LLMProvider):
             httpx.HTTPStatusError: If request fails.
         """
         mdl = model or self.model
-        url = "https://api.openai.com/v1/chat/completions"
+        url = f"{self.base_url}/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -87,18 +153,34 @@ class OpenAIProvider(LLMProvider):
             "messages": messages,
             "max_tokens": max_tokens or 64,
         }
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(url, json=payload, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
-            logger.info("openai.chat.success", model=mdl, tokens=max_tokens)
-            # Ensure we return a string (avoid returning raw Any)
-            content = data.get("choices", [])[0].get("message", {}).get("content", "")
-            return str(content)
+        data = await _post_timed("openai", url, payload, headers, self.timeout_s)
+        _record_usage("openai", data.get("usage") or {}, "prompt_tokens", "completion_tokens")
+        logger.info("openai.chat.success", model=mdl, tokens=max_tokens)
+        # Ensure we return a string (avoid returning raw Any)
+        content = data.get("choices", [])[0].get("message", {}).get("content", "")
+        return str(content)
 
     async def embed(self, texts: list[str], model: str | None = None) -> Any:
-        """Not implemented: OpenAI embedding."""
-        raise NotImplementedError("OpenAI embedding not implemented.")
+        """Embed texts with an OpenAI embedding model.
+
+        Large inputs are split into batches sent concurrently over a pooled
+        client, with backoff on 429s (see ``service.llm.embedders``).
+
+        Args:
+            texts: List of texts.
+            model: Embedding model name.
+
+        Returns:
+            np.ndarray: float32 vectors, one row per text in input order.
+        """
+        mdl = model or self.embed_model
+        embedder = self._embedders.get(mdl)
+        if embedder is None:
+            embedder = OpenAIEmbedder(
+                self.api_key, model=mdl, base_url=self.base_url, timeout_s=self.timeout_s
+            )
+            self._embedders[mdl] = embedder
+        return await asyncio.to_thread(embedder.embed, texts)
 
     """Anthropic chat provider using lowest-cost model (claude-3-haiku)."""
 
@@ -106,13 +188,22 @@ class OpenAIProvider(LLMProvider):
 class AnthropicProvider(LLMProvider):
     """Anthropic chat provider using lowest-cost model (claude-3-haiku)."""
 
-    def __init__(self, api_key: str | None):
+    def __init__(
+        self,
+        api_key: str | None,
+        base_url: str = "https://api.anthropic.com/v1",
+        timeout_s: float = 10.0,
+    ) -> None:
         """Initialize AnthropicProvider.
 
         Args:
             api_key: Anthropic API key.
+            base_url: API root (override for proxies or local stand-ins).
+            timeout_s: HTTP timeout per request.
         """
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
         self.model = "claude-3-haiku-20240307"
 
     async def chat(
@@ -135,7 +226,7 @@ class AnthropicProvider(LLMProvider):
             httpx.HTTPStatusError: If request fails.
         """
         mdl = model or self.model
-        url = "https://api.anthropic.com/v1/messages"
+        url = f"{self.base_url}/messages"
         headers = {
             "x-api-key": self.api_key or "",
             "Content-Type": "application/json",
@@ -147,12 +238,10 @@ class AnthropicProvider(LLMProvider):
             "messages": messages,
             "prompt": prompt,
         }
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(url, json=payload, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
-            logger.info("anthropic.chat.success", model=mdl, tokens=max_tokens)
-            return str(data.get("content", ""))
+        data = await _post_timed("anthropic", url, payload, headers, self.timeout_s)
+        _record_usage("anthropic", data.get("usage") or {}, "input_tokens", "output_tokens")
+        logger.info("anthropic.chat.success", model=mdl, tokens=max_tokens)
+        return str(data.get("content", ""))
 
     def _format_prompt(self, messages: list[dict[str, Any]]) -> str:
         """Format prompt for Anthropic API.
@@ -166,8 +255,8 @@ class AnthropicProvider(LLMProvider):
         return "\n".join(m.get("content", "") for m in messages)
 
     async def embed(self, texts: list[str], model: str | None = None) -> Any:
-        """Not implemented: Anthropic embedding."""
-        raise NotImplementedError("Anthropic embedding not implemented.")
+        """Not supported: Anthropic has no embeddings API (use EMBED_PROVIDER)."""
+        raise NotImplementedError("Anthropic does not offer an embeddings API.")
 
     """Local HuggingFace provider (downloads/runs any model)."""
 
@@ -204,9 +293,11 @@ class LocalHFProvider(LLMProvider):
             str: Model response.
         """
         mdl = model or "gpt2"
-        pipe = self.pipeline("text-generation", model=mdl)
-        prompt = self._format_prompt(messages)
-        result = pipe(prompt, max_new_tokens=max_tokens or 64)
+        attributes = {"llm.provider": "local", "llm.model": mdl}
+        with span("llm.chat", attributes), LLM_SECONDS.labels("local", "total").time():
+            pipe = self.pipeline("text-generation", model=mdl)
+            prompt = self._format_prompt(messages)
+            result = pipe(prompt, max_new_tokens=max_tokens or 64)
         logger.info("localhf.chat.success", model=mdl, tokens=max_tokens)
         return str(result[0].get("generated_text", ""))
 
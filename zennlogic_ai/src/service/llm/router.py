@@ -0,0 +1,263 @@
+"""Latency- and health-aware routing across LLM providers.
+
+:class:`ProviderRouter` sends a chat request to the preferred provider and,
+if it has not answered within that provider's observed p95 latency, hedges a
+second request to the best alternate. Whichever succeeds first wins; the
+other attempt is cancelled. A failed or timed-out attempt fails over to the
+next candidate immediately. Each provider keeps an EWMA of latency and error
+rate (used to rank alternates) and a circuit breaker that takes it out of
+rotation after consecutive failures, letting a single probe through once the
+cooldown has passed.
+
+Alternate providers are called with their own default model, since model
+names are provider-specific.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import Mapping, Sequence
+import time
+from typing import Any
+
+from structlog import get_logger
+
+from service.llm.providers import LLMProvider
+from service.telemetry.metrics import LLM_ATTEMPTS, LLM_CIRCUIT_OPEN
+
+
+logger = get_logger()
+
+
+class AllProvidersFailedError(RuntimeError):
+    """Every candidate provider failed, timed out or was unavailable."""
+
+
+class ProviderHealth:
+    """Latency/error EWMAs, a latency window and a circuit breaker for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        alpha: float = 0.2,
+        window: int = 200,
+        failure_threshold: int = 5,
+        cooldown_s: float = 30.0,
+    ) -> None:
+        """Start with no observations and a closed breaker."""
+        self.name = name
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.latency_ewma: float | None = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._probing = False
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._open_gauge = LLM_CIRCUIT_OPEN.labels(name)
+
+    def p95(self, min_samples: int = 20) -> float | None:
+        """p95 of recent successful latencies, or None with too few samples."""
+        if len(self._latencies) < min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by the error rate."""
+        return (self.latency_ewma or 0.0) * (1 + 4 * self.error_ewma)
+
+    def allow(self, now: float) -> bool:
+        """Whether an attempt may be sent (claims the probe slot when half-open)."""
+        if self.consecutive_failures < self.failure_threshold:
+            return True
+        if now < self.open_until or self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self, latency_s: float) -> None:
+        """Fold a successful attempt into the stats and close the breaker."""
+        self._latencies.append(latency_s)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency_s
+        else:
+            self.latency_ewma += self.alpha * (latency_s - self.latency_ewma)
+        self.error_ewma *= 1 - self.alpha
+        self.consecutive_failures = 0
+        self._probing = False
+        self._open_gauge.set(0)
+
+    def record_failure(self, now: float) -> None:
+        """Fold a failed attempt into the stats; open the breaker at the threshold."""
+        self.error_ewma += self.alpha * (1 - self.error_ewma)
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = now + self.cooldown_s
+            self._open_gauge.set(1)
+            logger.warning("llm.circuit.open", provider=self.name, cooldown_s=self.cooldown_s)
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot after a cancelled attempt."""
+        self._probing = False
+
+
+class ProviderRouter:
+    """Routes chat calls across providers with hedging, timeouts and failover."""
+
+    def __init__(
+        self,
+        providers: Mapping[str, LLMProvider],
+        fallbacks: Sequence[str] = (),
+        timeout_s: float = 30.0,
+        hedge: bool = True,
+        hedge_after_s: float = 2.0,
+        min_samples: int = 20,
+        failure_threshold: int = 5,
+        cooldown_s: float = 30.0,
+    ) -> None:
+        """Create a router.
+
+        Args:
+            providers: Provider instances by name.
+            fallbacks: Names tried (in EWMA order) after the preferred provider.
+            timeout_s: Upper bound for a single attempt.
+            hedge: Whether to hedge slow primaries to an alternate.
+            hedge_after_s: Hedge delay used until a provider has ``min_samples``
+                successful latencies to derive its p95 from.
+            min_samples: Observations needed before the p95 is trusted.
+            failure_threshold: Consecutive failures that open a breaker.
+            cooldown_s: How long an open breaker rejects attempts.
+        """
+        self.providers = providers
+        self.fallbacks = tuple(name for name in fallbacks if name in providers)
+        self.timeout_s = timeout_s
+        self.hedge = hedge
+        self.hedge_after_s = hedge_after_s
+        self.min_samples = min_samples
+        self.health = {
+            name: ProviderHealth(name, failure_threshold=failure_threshold, cooldown_s=cooldown_s)
+            for name in providers
+        }
+
+    def candidates(self, preferred: str) -> list[str]:
+        """Preferred provider first, then fallbacks by health score."""
+        alternates = sorted(
+            (name for name in self.fallbacks if name != preferred),
+            key=lambda name: self.health[name].score(),
+        )
+        first = [preferred] if preferred in self.providers else []
+        return first + alternates
+
+    def hedge_delay(self, name: str) -> float:
+        """How long to wait on ``name`` before hedging."""
+        p95 = self.health[name].p95(self.min_samples)
+        return self.hedge_after_s if p95 is None else p95
+
+    async def _attempt(
+        self,
+        name: str,
+        role: str,
+        messages: list[dict[str, Any]],
+        model: str | None,
+        max_tokens: int | None,
+    ) -> Any:
+        health = self.health[name]
+        start = time.monotonic()
+        outcome = "cancelled"
+        try:
+            result = await asyncio.wait_for(
+                self.providers[name].chat(messages, model=model, max_tokens=max_tokens),
+                self.timeout_s,
+            )
+        except asyncio.CancelledError:
+            health.release_probe()
+            raise
+        except Exception as exc:
+            outcome = "timeout" if isinstance(exc, TimeoutError) else "error"
+            health.record_failure(time.monotonic())
+            logger.warning("llm.attempt.failed", provider=name, role=role, outcome=outcome)
+            raise
+        else:
+            outcome = "ok"
+            health.record_success(time.monotonic() - start)
+            return result
+        finally:
+            LLM_ATTEMPTS.labels(name, role, outcome).inc()
+
+    def _next_available(self, queue: list[str], errors: list[str]) -> str | None:
+        """Pop candidates until one whose breaker admits an attempt."""
+        now = time.monotonic()
+        while queue:
+            name = queue.pop(0)
+            if self.health[name].allow(now):
+                return name
+            errors.append(f"{name}: circuit open")
+        return None
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        preferred: str,
+        model: str | None = None,
+        max_tokens: int | None = None,
+    ) -> Any:
+        """Return the first successful response among the candidates.
+
+        Raises:
+            AllProvidersFailedError: If no candidate produced a response.
+        """
+        _, result = await self.route(messages, preferred, model, max_tokens)
+        return result
+
+    async def route(
+        self,
+        messages: list[dict[str, Any]],
+        preferred: str,
+        model: str | None = None,
+        max_tokens: int | None = None,
+    ) -> tuple[str, Any]:
+        """Like :meth:`chat`, but also return the name of the provider that answered.
+
+        Raises:
+            AllProvidersFailedError: If no candidate produced a response.
+        """
+        queue = list(self.candidates(preferred))
+        running: dict[asyncio.Task[Any], str] = {}
+        errors: list[str] = []
+        hedged = False
+
+        def launch(role: str) -> bool:
+            name = self._next_available(queue, errors)
+            if name is None:
+                return False
+            mdl = model if name == preferred else None
+            task = asyncio.create_task(self._attempt(name, role, messages, mdl, max_tokens))
+            running[task] = name
+            return True
+
+        launch("primary")
+        try:
+            while running:
+                timeout = None
+                if self.hedge and not hedged and queue and len(running) == 1:
+                    timeout = self.hedge_delay(next(iter(running.values())))
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = launch("hedge")
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        return name, task.result()
+                    errors.append(f"{name}: {type(exc).__name__}: {exc}")
+                if not running:
+                    launch("failover")
+        finally:
+            for task in running:
+                task.cancel()
+        raise AllProvidersFailedError("; ".join(errors) or "no provider available")
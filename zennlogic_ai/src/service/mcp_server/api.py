@@ -4,19 +4,30 @@ This module exposes a small FastAPI app that allows invoking registered MCP
 tools via HTTP. The MCPServer implementation remains available for in-process
 use; this wrapper is optional and designed for deployments where MCP is
 exposed over an internal HTTP endpoint.
+
+Tool calls are dispatched concurrently (see ``service.mcp_server.dispatch``)
+and ``POST /mcp/batch`` runs several calls in one round trip.
 """
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ConfigDict, Field
 
+from service.config import settings
+from service.mcp_server.dispatch import ToolDispatcher, ToolError
 from service.mcp_server.server import MCPServer
 from service.mcp_server.tools import health, s3
+from service.rest.responses import FastJSONResponse
+from service.rest.routers import metrics
+from service.telemetry.profiling import install_profiler
+from service.telemetry.tracing import install_tracing
 
 
-app = FastAPI(title="mcp-server")
-
 # Build a server instance and register known tool modules
 _server: MCPServer = MCPServer()
 _server.register_tool(health)
@@ -35,6 +46,28 @@ except Exception:
     pass
 _server.register_tool(s3)
 
+_dispatcher = ToolDispatcher(
+    _server.specs,
+    max_workers=settings.mcp_max_workers,
+    default_concurrency=settings.mcp_tool_concurrency,
+    limits=settings.mcp_tool_limits,
+    timeout_s=settings.mcp_tool_timeout_s,
+)
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    _dispatcher.shutdown()
+
+
+app = FastAPI(title="mcp-server", lifespan=_lifespan, default_response_class=FastJSONResponse)
+install_profiler(app)
+install_tracing(app)
+if settings.gzip_min_bytes > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_bytes)
+app.include_router(metrics.router)
+
 
 class CallBody(BaseModel):
     """Request body for calling an MCP tool function.
@@ -44,9 +77,24 @@ class CallBody(BaseModel):
       key "kwargs" (alias) to avoid collisions with internal names.
     """
 
+    model_config = ConfigDict(populate_by_name=True)
+
     args: list[Any] | None = None
     # Use an internal name that avoids any potential module-level name clashes.
-    kwargs_: dict[str, Any] | None = None
+    kwargs_: dict[str, Any] | None = Field(default=None, alias="kwargs")
+
+
+class BatchCall(CallBody):
+    """One call inside a batch request."""
+
+    tool: str
+    fn: str
+
+
+class BatchBody(BaseModel):
+    """Request body for ``POST /mcp/batch``."""
+
+    calls: list[BatchCall] = Field(max_length=settings.mcp_batch_max_calls)
 
 
 @app.get("/mcp/health")
@@ -56,27 +104,45 @@ def health_check() -> dict[str, str]:
 
 
 @app.get("/mcp/tools")
-def list_tools() -> dict[str, list[str]]:
-    """Return the list of registered MCP tool function names."""
-    return {"tools": sorted(_server.tools.keys())}
+def list_tools() -> Response:
+    """Return registered tools with their input JSON schemas.
+
+    The encoded listing is built once per registration change and served
+    from cache.
+    """
+    return Response(content=_server.tools_json(), media_type="application/json")
 
 
 @app.post("/mcp/tools/{tool}/{fn}")
-def call_tool(tool: str, fn: str, body: CallBody | None = None) -> dict[str, Any]:
+async def call_tool(tool: str, fn: str, body: CallBody | None = None) -> dict[str, Any]:
     """Invoke a registered tool function by name.
 
-    The path contains the tool module and function name; the body may
-    optionally provide positional `args` and keyword `kwargs`.
+    The path contains the tool namespace and function name (resolved as
+    ``tool.fn``); the body may optionally provide positional `args` and
+    keyword `kwargs`.
     """
-    key = fn
-    if key not in _server.tools:
-        raise HTTPException(status_code=404, detail=f"tool function not found: {key}")
-
-    func_callable = _server.tools[key]
-    args = body.args if body and body.args is not None else []
-    call_kwargs = body.kwargs_ if body and body.kwargs_ is not None else {}
+    body = body or CallBody()
     try:
-        result = func_callable(*args, **call_kwargs)
-    except Exception as exc:  # pragma: no cover - surface exceptions in tests
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+        result = await _dispatcher.call(f"{tool}.{fn}", body.args, body.kwargs_)
+    except ToolError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
     return {"result": result}
+
+
+async def _call_one(call: BatchCall) -> dict[str, Any]:
+    try:
+        name = f"{call.tool}.{call.fn}"
+        return {"result": await _dispatcher.call(name, call.args, call.kwargs_)}
+    except ToolError as exc:
+        return {"error": {"status": exc.status_code, "detail": exc.detail}}
+
+
+@app.post("/mcp/batch")
+async def call_batch(body: BatchBody) -> dict[str, list[dict[str, Any]]]:
+    """Invoke several tool functions concurrently in one round trip.
+
+    Results are returned in request order; a failing call yields an
+    ``error`` entry instead of failing the whole batch.
+    """
+    results = await asyncio.gather(*(_call_one(call) for call in body.calls))
+    return {"results": list(results)}
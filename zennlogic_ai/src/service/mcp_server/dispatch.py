@@ -0,0 +1,172 @@
+"""Concurrent MCP tool dispatch.
+
+Async tools are awaited on the event loop; sync tools run on a bounded thread
+pool so a slow call never occupies the server's request threadpool. Every
+tool has its own concurrency limit and each call is bounded by a timeout
+covering both the wait for a slot and the call itself. Arguments are
+validated against the tool's precompiled signature model first, so malformed
+calls are rejected before they take a slot or touch the pipeline.
+"""
+
+import asyncio
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import functools
+import time
+from typing import Any
+
+from structlog import get_logger
+
+from service.mcp_server.server import ToolArgumentError, ToolSpec
+from service.telemetry.metrics import MCP_TOOL_SECONDS
+from service.telemetry.tracing import span
+
+
+logger = get_logger()
+
+
+class ToolError(Exception):
+    """A tool call failed; ``status_code`` maps the failure to HTTP."""
+
+    status_code = 500
+
+    def __init__(self, detail: str) -> None:
+        """Store a client-safe error detail."""
+        super().__init__(detail)
+        self.detail = detail
+
+
+class ToolNotFoundError(ToolError):
+    """No tool is registered under the requested name."""
+
+    status_code = 404
+
+
+class ToolArgumentsInvalidError(ToolError):
+    """The call's arguments do not match the tool's signature."""
+
+    status_code = 422
+
+
+class ToolTimeoutError(ToolError):
+    """The tool did not finish within the dispatch timeout."""
+
+    status_code = 504
+
+
+class ToolDispatcher:
+    """Run registered tool callables with per-tool limits and timeouts."""
+
+    def __init__(
+        self,
+        tools: Mapping[str, ToolSpec],
+        max_workers: int = 16,
+        default_concurrency: int = 4,
+        limits: Mapping[str, int] | None = None,
+        timeout_s: float = 30.0,
+    ) -> None:
+        """Create a dispatcher over a (live) name -> tool spec mapping.
+
+        Args:
+            tools: Registered tools (e.g. ``MCPServer.specs``); looked up on
+                every call so later registrations are picked up.
+            max_workers: Size of the thread pool used for sync tools.
+            default_concurrency: Concurrent calls allowed per tool.
+            limits: Per-tool overrides of ``default_concurrency``.
+            timeout_s: Upper bound for a call, including queueing for a slot.
+        """
+        self.tools = tools
+        self.default_concurrency = default_concurrency
+        self.limits = dict(limits or {})
+        self.timeout_s = timeout_s
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="mcp-tool")
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(name)
+        if sem is None:
+            limit = self.limits.get(name, self.default_concurrency)
+            sem = self._semaphores[name] = asyncio.Semaphore(limit)
+        return sem
+
+    async def _run_async(
+        self,
+        sem: asyncio.Semaphore,
+        func: Callable[..., Any],
+        args: list[Any],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        async with sem:
+            return await func(*args, **kwargs)
+
+    async def _run_sync(
+        self,
+        sem: asyncio.Semaphore,
+        func: Callable[..., Any],
+        args: list[Any],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        await sem.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            # Run in a copy of the caller's context so the tool's spans nest under the call's.
+            call = functools.partial(func, *args, **kwargs)
+            future = self._executor.submit(contextvars.copy_context().run, call)
+        except BaseException:
+            sem.release()
+            raise
+
+        # A running thread cannot be cancelled: keep its slot taken until it
+        # actually returns, even if the caller has already timed out.
+        def release(_: Future[Any]) -> None:
+            try:
+                loop.call_soon_threadsafe(sem.release)
+            except RuntimeError:  # loop already closed
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def call(
+        self, name: str, args: list[Any] | None = None, kwargs: dict[str, Any] | None = None
+    ) -> Any:
+        """Invoke tool ``name`` and return its result.
+
+        Raises:
+            ToolNotFoundError: If no tool is registered as ``name``.
+            ToolArgumentsInvalidError: If the arguments fail validation.
+            ToolTimeoutError: If the call exceeds the dispatch timeout.
+            ToolError: If the tool raised.
+        """
+        spec = self.tools.get(name)
+        if spec is None:
+            raise ToolNotFoundError(f"tool function not found: {name}")
+        try:
+            bound = spec.bind(args or [], kwargs or {})
+        except ToolArgumentError as exc:
+            raise ToolArgumentsInvalidError(str(exc)) from exc
+        run = self._run_async if spec.is_async else self._run_sync
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with span("mcp.call_tool", {"mcp.tool": name}):
+                result = await asyncio.wait_for(
+                    run(self._semaphore(name), spec.func, [], bound), self.timeout_s
+                )
+            status = "ok"
+            return result
+        except TimeoutError as exc:
+            status = "timeout"
+            raise ToolTimeoutError(f"tool {name} timed out after {self.timeout_s}s") from exc
+        except ToolError:
+            raise
+        except Exception as exc:
+            logger.warning("mcp.tool.failed", tool=name, error=str(exc))
+            raise ToolError(str(exc)) from exc
+        finally:
+            MCP_TOOL_SECONDS.labels(name, status).observe(time.perf_counter() - start)
+
+    def shutdown(self) -> None:
+        """Stop accepting sync work and release the thread pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,49 +1,204 @@
-"""Simple MCP server stub implementation."""
+"""MCP tool registry and server entry point.
 
+``mcp-server`` serves the registered tools as a long-lived JSON-RPC process
+over stdio (the default), TCP or a Unix socket; see
+``service.mcp_server.transport``.
+"""
+
+import argparse
+import asyncio
 from collections.abc import Callable
+from dataclasses import dataclass
+import inspect
+import json
 import logging
 from types import ModuleType
-from typing import Any
+from typing import Any, Literal, get_type_hints
+
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
 
 
 logger = logging.getLogger(__name__)
 
 
+class ToolArgumentError(ValueError):
+    """Arguments for a tool call do not match its signature."""
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A registered tool: callable plus its precompiled argument validator."""
+
+    name: str
+    func: Callable[..., Any]
+    is_async: bool
+    arguments: type[BaseModel]
+    positional: tuple[str, ...]
+    schema: dict[str, Any]
+
+    @classmethod
+    def from_function(cls, name: str, func: Callable[..., Any]) -> "ToolSpec":
+        """Build a spec (validator model and JSON schema) from ``func``'s signature."""
+        sig = inspect.signature(func)
+        hints = get_type_hints(func)
+        fields: dict[str, Any] = {}
+        positional: list[str] = []
+        extra: Literal["allow", "forbid"] = "forbid"
+        for param in sig.parameters.values():
+            if param.kind is param.VAR_KEYWORD:
+                extra = "allow"
+                continue
+            if param.kind is param.VAR_POSITIONAL:
+                continue
+            if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+                positional.append(param.name)
+            default = ... if param.default is param.empty else param.default
+            fields[param.name] = (hints.get(param.name, Any), default)
+        model = create_model(
+            f"{name.replace('.', '_')}_arguments",
+            __config__=ConfigDict(extra=extra, arbitrary_types_allowed=True),
+            **fields,
+        )
+        doc = inspect.getdoc(func) or ""
+        schema = {
+            "name": name,
+            "description": doc.split("\n\n", 1)[0].replace("\n", " "),
+            "inputSchema": model.model_json_schema(),
+        }
+        return cls(
+            name=name,
+            func=func,
+            is_async=inspect.iscoroutinefunction(func),
+            arguments=model,
+            positional=tuple(positional),
+            schema=schema,
+        )
+
+    def bind(self, args: list[Any], kwargs: dict[str, Any]) -> dict[str, Any]:
+        """Map positional args onto parameter names and validate everything.
+
+        Returns:
+            Validated keyword arguments ready to call ``func(**kwargs)``.
+
+        Raises:
+            ToolArgumentError: On surplus/duplicate positionals or failed validation.
+        """
+        if len(args) > len(self.positional):
+            raise ToolArgumentError(
+                f"{self.name} takes at most {len(self.positional)} positional arguments"
+            )
+        values = dict(zip(self.positional, args, strict=False))
+        duplicate = values.keys() & kwargs.keys()
+        if duplicate:
+            raise ToolArgumentError(f"{self.name} got multiple values for {sorted(duplicate)}")
+        values.update(kwargs)
+        try:
+            validated = self.arguments.model_validate(values)
+        except ValidationError as exc:
+            problems = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc']) or 'arguments'}: {err['msg']}"
+                for err in exc.errors(include_url=False)
+            )
+            raise ToolArgumentError(f"invalid arguments for {self.name}: {problems}") from exc
+        bound = {name: getattr(validated, name) for name in type(validated).model_fields}
+        bound.update(validated.model_extra or {})
+        return bound
+
+
 class MCPServer:
-    """Stub MCP server for development.
+    """MCP tool registry.
 
-    This is a very small in-process tool registry used by the HTTP wrapper
-    and by local development. Tools are simple modules exposing callables.
+    This is a small in-process tool registry used by the JSON-RPC transports,
+    the HTTP wrapper and local development. Tools are simple modules exposing
+    callables, registered as ``<namespace>.<function>``.
     """
 
     def __init__(self) -> None:
         """Initialize MCP server."""
+        self.specs: dict[str, ToolSpec] = {}
         self.tools: dict[str, Callable[..., Any]] = {}
+        self._tools_json: bytes | None = None
+
+    def register_tool(self, tool_module: ModuleType, namespace: str | None = None) -> None:
+        """Register a tool module's functions under a namespace.
 
-    def register_tool(self, tool_module: ModuleType) -> None:
-        """Register a tool module by collecting its public callables.
+        Only functions listed in ``__all__`` or, without it, public functions
+        defined in the module itself are registered, so imported helpers,
+        classes and module-level objects never leak in as tools.
 
         Args:
             tool_module: A Python module exposing functions to register.
+            namespace: Prefix for the tool names; defaults to the module's
+                short name (``service.mcp_server.tools.rag`` -> ``rag``).
+        """
+        prefix = namespace or tool_module.__name__.rsplit(".", 1)[-1]
+        names = getattr(tool_module, "__all__", None)
+        if names is None:
+            names = [
+                name
+                for name, obj in vars(tool_module).items()
+                if not name.startswith("_")
+                and inspect.isfunction(obj)
+                and obj.__module__ == tool_module.__name__
+            ]
+        for name in names:
+            qualified = f"{prefix}.{name}"
+            spec = ToolSpec.from_function(qualified, getattr(tool_module, name))
+            self.specs[qualified] = spec
+            self.tools[qualified] = spec.func
+        self._tools_json = None
+
+    def list_tools(self) -> list[dict[str, Any]]:
+        """Return the tool schemas (name, description, inputSchema)."""
+        return [self.specs[name].schema for name in sorted(self.specs)]
+
+    def tools_json(self) -> bytes:
+        """Return the encoded ``{"tools": [...]}`` listing, cached until re-registration."""
+        if self._tools_json is None:
+            self._tools_json = json.dumps({"tools": self.list_tools()}).encode()
+        return self._tools_json
+
+    def run(
+        self,
+        transport: Literal["stdio", "tcp", "unix"] = "stdio",
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        path: str | None = None,
+    ) -> None:
+        """Serve the registered tools until stdin closes (stdio) or the process stops.
+
+        Args:
+            transport: ``stdio`` for a single client that spawned this
+                process, ``tcp`` or ``unix`` to accept many connections.
+            host: TCP bind address.
+            port: TCP port.
+            path: Unix socket path.
         """
-        # Extract tool functions from the module
-        for name in dir(tool_module):
-            if not name.startswith("_"):
-                func = getattr(tool_module, name)
-                if callable(func):
-                    self.tools[name] = func
+        from service.mcp_server.transport import serve
 
-    def run(self) -> None:
-        """Run the MCP server (stub)."""
-        logger.info("MCP Server running: %s", list(self.tools.keys()))
+        try:
+            asyncio.run(serve(self, transport, host, port, path))
+        except KeyboardInterrupt:
+            pass
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     """Run MCP server with registered tools."""
+    from service.config import settings
+
+    parser = argparse.ArgumentParser(description="Serve zennlogic_ai tools over MCP (JSON-RPC).")
+    parser.add_argument(
+        "--transport", choices=["stdio", "tcp", "unix"], default=settings.mcp_transport
+    )
+    parser.add_argument("--host", default=settings.mcp_host)
+    parser.add_argument("--port", type=int, default=settings.mcp_port)
+    parser.add_argument("--socket", default=settings.mcp_socket_path, help="Unix socket path")
+    args = parser.parse_args(argv)
+
     server = MCPServer()
     from service.mcp_server.tools import health, rag, s3  # imported for side-effects/registration
 
     server.register_tool(health)
     server.register_tool(rag)
     server.register_tool(s3)
-    server.run()
+    server.run(args.transport, args.host, args.port, args.socket)
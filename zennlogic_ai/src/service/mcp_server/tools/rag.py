@@ -6,7 +6,12 @@ HTTP wrapper runnable we return a clear stub response when the pipeline is
 unavailable.
 """
 
-from typing import Any
+from collections.abc import Sequence
+from typing import Annotated, Any, Literal
+
+from pydantic import Field
+
+from service.rag.models import SearchResponse
 
 
 # Pipeline may be unavailable when heavy RAG deps are not installed; keep
@@ -20,19 +25,43 @@ except Exception:
     _pipeline = None
 
 
-def search(query: str, k: int = 5) -> dict[str, Any]:
+HitField = Literal["id", "score", "text", "metadata"]
+SourceField = Literal["id", "score", "metadata"]
+
+
+def search(
+    query: str,
+    k: int = 5,
+    fields: list[HitField] | None = None,
+    mmr_lambda: Annotated[float, Field(ge=0.0, le=1.0)] | None = None,
+) -> dict[str, Any]:
     """Search vector store for query.
 
-    Returns a mapping with search results or an error message if the
-    pipeline isn't available.
+    Returns a mapping with search results (each trimmed to ``fields`` when
+    given) or an error message if the pipeline isn't available. ``mmr_lambda``
+    diversifies the results with maximal marginal relevance (1 = relevance
+    only, lower = more diverse).
     """
     if _pipeline is None:
         return {"error": "rag pipeline not available"}
-    return {"results": _pipeline.search(query, k)}
+    response = SearchResponse(results=_pipeline.search(query, k, mmr_lambda))
+    return response.model_dump(mode="json", include=_each("results", fields), exclude_none=True)
 
 
-def answer(query: str) -> dict[str, Any]:
-    """Answer query using RAG pipeline or return a stub when unavailable."""
+def answer(query: str, fields: list[SourceField] | None = None) -> dict[str, Any]:
+    """Answer query using RAG pipeline or return a stub when unavailable.
+
+    ``fields`` trims each source, e.g. ``["id", "score"]`` to drop metadata.
+    """
     if _pipeline is None:
         return {"error": "rag pipeline not available"}
-    return {"answer": _pipeline.answer(query)}
+    result = _pipeline.answer(query)
+    include = _each("sources", fields)
+    if include is not None:
+        include |= {"answer": True, "usage": True}
+    return {"answer": result.model_dump(mode="json", include=include, exclude_none=True)}
+
+
+def _each(key: str, fields: Sequence[str] | None) -> dict[str, Any] | None:
+    """Pydantic ``include`` keeping ``fields`` of every item in list ``key``."""
+    return {key: {"__all__": set(fields)}} if fields else None
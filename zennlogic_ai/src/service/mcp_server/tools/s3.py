@@ -1,16 +1,22 @@
 """MCP S3 tool: list objects."""
 
-from typing import Any
+from typing import Annotated
 
-from service.aws.s3 import get_s3_client
-from service.config import settings
+from pydantic import Field
 
+from service.aws.s3 import list_objects_page
 
-def list_objects(prefix: str) -> dict[str, list[str]]:
-    """List S3 objects with prefix.
 
-    Returns a mapping with the `objects` key containing the list of keys.
+def list_objects(
+    prefix: str,
+    cursor: str | None = None,
+    limit: Annotated[int, Field(ge=1, le=1000)] = 1000,
+) -> dict[str, list[str] | str | None]:
+    """List S3 objects with prefix, one page at a time.
+
+    Returns a mapping with the `objects` key containing up to `limit` keys and
+    `next_cursor`, to be passed back as `cursor` for the next page (None once
+    the listing is complete).
     """
-    s3 = get_s3_client()
-    resp: dict[str, Any] = s3.list_objects_v2(Bucket=settings.s3_bucket, Prefix=prefix)
-    return {"objects": [obj["Key"] for obj in resp.get("Contents", [])]}
+    keys, next_cursor = list_objects_page(prefix, cursor=cursor, limit=limit)
+    return {"objects": keys, "next_cursor": next_cursor}
@@ -0,0 +1,404 @@
+"""Long-lived JSON-RPC 2.0 transports for the MCP server (stdio and sockets).
+
+Messages are newline-delimited JSON, as in the MCP stdio transport: one
+request, notification or batch per line. Each request runs as its own task,
+so a client can pipeline many requests on one connection without waiting for
+answers. Responses are written as soon as each request finishes, possibly out
+of order, and clients match them to requests by ``id``. Tool calls go through a
+:class:`~service.mcp_server.dispatch.ToolDispatcher` (per-tool limits and
+timeouts). The process stays up between calls, so the RAG pipeline and its
+models are loaded once rather than per call.
+
+Supported methods are ``initialize``, ``ping``, ``tools/list`` and
+``tools/call``; a ``notifications/cancelled`` notification cancels an
+in-flight request. At most ``MCP_MAX_IN_FLIGHT`` requests per connection run
+at once; beyond that the connection is not read until one finishes.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Any, BinaryIO, Protocol
+
+from structlog import get_logger
+
+from service.config import settings
+from service.mcp_server.dispatch import (
+    ToolArgumentsInvalidError,
+    ToolDispatcher,
+    ToolError,
+    ToolNotFoundError,
+)
+from service.mcp_server.server import MCPServer
+from service.telemetry.tracing import parse_traceparent, span
+
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None  # type: ignore[assignment]
+
+
+logger = get_logger()
+
+PROTOCOL_VERSION = "2025-06-18"
+SERVER_INFO = {"name": "zennlogic_ai", "version": "0.1.0"}
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Longest accepted message line (large ingest-style arguments included).
+_LINE_LIMIT = 16 * 1024 * 1024
+# Stands in for a line over the limit once the rest of it is discarded.
+_OVERLONG_LINE = b"<message over line limit>\n"
+
+
+class LineReader(Protocol):
+    """Source of message lines (e.g. :class:`asyncio.StreamReader`)."""
+
+    async def readline(self) -> bytes:
+        """Return the next line, or ``b""`` at EOF."""
+        ...
+
+
+class LineWriter(Protocol):
+    """Sink for response lines (e.g. :class:`asyncio.StreamWriter`)."""
+
+    def write(self, data: bytes) -> None:
+        """Buffer ``data``."""
+        ...
+
+    async def drain(self) -> None:
+        """Wait until the buffered data has been handed off."""
+        ...
+
+    def close(self) -> None:
+        """Close the sink."""
+        ...
+
+
+class JSONRPCError(Exception):
+    """A request failed with a JSON-RPC error code."""
+
+    def __init__(self, code: int, message: str) -> None:
+        """Store the error code and client-facing message."""
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _dumps(message: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            message, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS, default=str
+        )
+    return json.dumps(message, separators=(",", ":"), default=str).encode()
+
+
+def _error(msg_id: Any, code: int, message: str) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": code, "message": message}}
+
+
+class MCPSession:
+    """One client connection: reads requests, runs them concurrently, writes responses."""
+
+    def __init__(
+        self, server: MCPServer, dispatcher: ToolDispatcher, max_in_flight: int = 64
+    ) -> None:
+        """Create a session serving ``server``'s tools through ``dispatcher``."""
+        self.server = server
+        self.dispatcher = dispatcher
+        self.max_in_flight = max(1, max_in_flight)
+        # In-flight requests by id, so notifications/cancelled can reach them
+        # (a list, since a client may reuse an id while it is still pending).
+        self.pending: dict[Any, list[asyncio.Task[Any]]] = {}
+        self._methods = {
+            "initialize": self._initialize,
+            "ping": self._ping,
+            "tools/list": self._list_tools,
+            "tools/call": self._call_tool,
+        }
+
+    async def serve(self, reader: LineReader, writer: LineWriter) -> None:
+        """Serve the connection until EOF; requests still running are answered first."""
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks: set[asyncio.Task[None]] = set()
+        write_lock = asyncio.Lock()
+
+        async def respond(line: bytes) -> None:
+            try:
+                response = await self.handle_line(line)
+                if response is not None:
+                    async with write_lock:
+                        writer.write(_dumps(response) + b"\n")
+                        await writer.drain()
+            finally:
+                slots.release()
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                await slots.acquire()
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError as exc:
+            logger.warning("mcp.session.closed", error=str(exc))
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def handle_line(self, line: bytes) -> Any | None:
+        """Decode one message line and return its response (None if nothing to send)."""
+        if line == _OVERLONG_LINE:
+            return _error(None, PARSE_ERROR, f"message exceeds {_LINE_LIMIT} bytes")
+        try:
+            message = json.loads(line)
+        except ValueError as exc:
+            return _error(None, PARSE_ERROR, f"parse error: {exc}")
+        if isinstance(message, list):
+            if not message:
+                return _error(None, INVALID_REQUEST, "empty batch")
+            responses = await asyncio.gather(*(self._handle_member(m) for m in message))
+            return [r for r in responses if r is not None] or None
+        return await self.handle(message)
+
+    async def _handle_member(self, message: Any) -> dict[str, Any] | None:
+        # Each batch member is its own task; a cancelled member gets no
+        # response without cancelling the gather, so the rest still answer.
+        try:
+            return await self.handle(message)
+        except asyncio.CancelledError:
+            return None
+
+    async def handle(self, message: Any) -> dict[str, Any] | None:
+        """Handle one decoded request or notification."""
+        if (
+            not isinstance(message, dict)
+            or message.get("jsonrpc") != "2.0"
+            or not isinstance(message.get("method"), str)
+            or not isinstance(message.get("id"), str | int | None)
+        ):
+            msg_id = message.get("id") if isinstance(message, dict) else None
+            if not isinstance(msg_id, str | int):
+                msg_id = None
+            return _error(msg_id, INVALID_REQUEST, "not a JSON-RPC 2.0 request")
+        params = message.get("params") or {}
+        if "id" not in message:
+            self._notify(message["method"], params)
+            return None
+        msg_id = message["id"]
+        task = asyncio.current_task()
+        if task is not None:
+            self.pending.setdefault(msg_id, []).append(task)
+        try:
+            method = self._methods.get(message["method"])
+            if method is None:
+                raise JSONRPCError(METHOD_NOT_FOUND, f"method not found: {message['method']}")
+            if not isinstance(params, dict):
+                raise JSONRPCError(INVALID_PARAMS, "params must be an object")
+            return {"jsonrpc": "2.0", "id": msg_id, "result": await method(params)}
+        except JSONRPCError as exc:
+            return _error(msg_id, exc.code, exc.message)
+        except Exception as exc:
+            logger.warning("mcp.request.failed", method=message["method"], error=str(exc))
+            return _error(msg_id, INTERNAL_ERROR, str(exc))
+        finally:
+            if task is not None:
+                self._unregister(msg_id, task)
+
+    def _unregister(self, msg_id: Any, task: asyncio.Task[Any]) -> None:
+        tasks = self.pending.get(msg_id, [])
+        if task in tasks:
+            tasks.remove(task)
+        if not tasks:
+            self.pending.pop(msg_id, None)
+
+    def _notify(self, method: str, params: Any) -> None:
+        if method == "notifications/cancelled" and isinstance(params, dict):
+            # No response is sent for a cancelled request.
+            for task in self.pending.get(params.get("requestId"), ()):
+                task.cancel()
+
+    async def _initialize(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "protocolVersion": params.get("protocolVersion") or PROTOCOL_VERSION,
+            "capabilities": {"tools": {"listChanged": False}},
+            "serverInfo": SERVER_INFO,
+        }
+
+    async def _ping(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {}
+
+    async def _list_tools(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {"tools": self.server.list_tools()}
+
+    async def _call_tool(self, params: dict[str, Any]) -> dict[str, Any]:
+        name = params.get("name")
+        arguments = params.get("arguments") or {}
+        if not isinstance(name, str) or not isinstance(arguments, dict):
+            raise JSONRPCError(INVALID_PARAMS, "tools/call needs a name and an arguments object")
+        # Clients may continue their trace through ``_meta.traceparent``.
+        meta = params.get("_meta")
+        parent = parse_traceparent(meta.get("traceparent")) if isinstance(meta, dict) else None
+        try:
+            with span("mcp tools/call", {"mcp.tool": name}, "server", parent):
+                result = await self.dispatcher.call(name, None, arguments)
+        except (ToolNotFoundError, ToolArgumentsInvalidError) as exc:
+            raise JSONRPCError(INVALID_PARAMS, exc.detail) from exc
+        except ToolError as exc:
+            # Tool failures are results the model can see, not protocol errors.
+            return {"content": [{"type": "text", "text": exc.detail}], "isError": True}
+        text = _dumps(result).decode()
+        return {"content": [{"type": "text", "text": text}], "isError": False}
+
+
+def build_dispatcher(server: MCPServer) -> ToolDispatcher:
+    """Create a dispatcher for ``server``'s tools configured from settings."""
+    return ToolDispatcher(
+        server.specs,
+        max_workers=settings.mcp_max_workers,
+        default_concurrency=settings.mcp_tool_concurrency,
+        limits=settings.mcp_tool_limits,
+        timeout_s=settings.mcp_tool_timeout_s,
+    )
+
+
+async def start_socket_server(
+    server: MCPServer,
+    dispatcher: ToolDispatcher,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    path: str | None = None,
+) -> asyncio.Server:
+    """Listen on TCP ``host:port`` or, with ``path``, a Unix socket; one session each."""
+
+    async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = MCPSession(server, dispatcher, settings.mcp_max_in_flight)
+        await session.serve(_StreamLines(reader), writer)
+
+    if path:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from a previous run
+        return await asyncio.start_unix_server(on_connect, path, limit=_LINE_LIMIT)
+    return await asyncio.start_server(on_connect, host, port, limit=_LINE_LIMIT)
+
+
+class _StreamLines:
+    """Line reader over an :class:`asyncio.StreamReader` that survives overlong lines.
+
+    ``StreamReader.readline`` raises ``ValueError`` for a line over the
+    stream limit, which would end the session and drop every pipelined
+    request; here the line is skipped and answered with one parse error.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader) -> None:
+        self.reader = reader
+
+    async def readline(self) -> bytes:
+        try:
+            return await self.reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial  # last line without a newline, or b"" at EOF
+        except asyncio.LimitOverrunError as exc:
+            await self.reader.readexactly(exc.consumed)
+        while True:
+            try:
+                await self.reader.readuntil(b"\n")
+                return _OVERLONG_LINE
+            except asyncio.IncompleteReadError:
+                return _OVERLONG_LINE
+            except asyncio.LimitOverrunError as exc:
+                await self.reader.readexactly(exc.consumed)
+
+
+class _StdioStreams:
+    """Line reader/writer over blocking stdin/stdout, used from worker threads.
+
+    Unlike asyncio pipe transports this also works when stdin or stdout is a
+    regular file (e.g. requests replayed from disk).
+    """
+
+    def __init__(self, stdin: BinaryIO, stdout: BinaryIO) -> None:
+        self.stdin = stdin
+        self.stdout = stdout
+        self._buffer: list[bytes] = []
+
+    async def readline(self) -> bytes:
+        return await asyncio.to_thread(self._readline)
+
+    def _readline(self) -> bytes:
+        line = self.stdin.readline(_LINE_LIMIT)
+        if len(line) < _LINE_LIMIT or line.endswith(b"\n"):
+            return line
+        # Over the limit: drop the rest of the message so it is answered with
+        # one parse error instead of being parsed piecewise as more messages.
+        while (rest := self.stdin.readline(_LINE_LIMIT)) and not rest.endswith(b"\n"):
+            pass
+        return _OVERLONG_LINE
+
+    def write(self, data: bytes) -> None:
+        self._buffer.append(data)
+
+    async def drain(self) -> None:
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        await asyncio.to_thread(self._flush, data)
+
+    def _flush(self, data: bytes) -> None:
+        self.stdout.write(data)
+        self.stdout.flush()
+
+    def close(self) -> None:
+        self.stdout.close()
+
+
+async def serve_stdio(server: MCPServer, dispatcher: ToolDispatcher) -> None:
+    """Serve one session over stdin/stdout until stdin closes.
+
+    The protocol gets a private copy of stdout and file descriptor 1 is
+    pointed at stderr, so logs and stray prints cannot corrupt the stream.
+    """
+    sys.stdout.flush()
+    protocol_out: BinaryIO = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    streams = _StdioStreams(sys.stdin.buffer, protocol_out)
+    await MCPSession(server, dispatcher, settings.mcp_max_in_flight).serve(streams, streams)
+
+
+async def serve(
+    server: MCPServer,
+    transport: str = "stdio",
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    path: str | None = None,
+) -> None:
+    """Serve ``server`` over ``transport`` (``stdio``, ``tcp`` or ``unix``)."""
+    dispatcher = build_dispatcher(server)
+    try:
+        if transport == "stdio":
+            await serve_stdio(server, dispatcher)
+            return
+        listener = await start_socket_server(
+            server, dispatcher, host, port, path if transport == "unix" else None
+        )
+        logger.info(
+            "mcp.server.listening",
+            transport=transport,
+            address=[str(sock.getsockname()) for sock in listener.sockets],
+            tools=sorted(server.specs),
+        )
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        dispatcher.shutdown()
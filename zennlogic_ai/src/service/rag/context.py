@@ -0,0 +1,116 @@
+"""Context assembly for RAG prompts under a token budget.
+
+Retrieved passages are considered in rank order. A passage whose word
+shingles are mostly contained in an already selected one (overlapping chunks
+of the same document, near-duplicate copies) is dropped. The rest are packed
+greedily: a passage that does not fit the remaining budget is skipped so that
+smaller, lower-ranked ones can still use the space.
+"""
+
+from dataclasses import dataclass, field
+
+from service.rag.tokens import count_tokens, shingles
+
+
+# Tokens spent on the "[n] " marker and blank line around each passage.
+PASSAGE_OVERHEAD_TOKENS = 4
+
+SYSTEM_PROMPT = (
+    "Answer the question using only the numbered context passages. "
+    "Cite passages as [n]. If the context does not contain the answer, say so."
+)
+
+
+@dataclass(frozen=True)
+class Passage:
+    """A retrieved chunk with its relevance score, token count and index id."""
+
+    text: str
+    metadata: dict[str, object]
+    score: float
+    tokens: int
+    id: int = -1
+
+
+@dataclass
+class PackedContext:
+    """Result of packing passages into a budget."""
+
+    passages: list[Passage] = field(default_factory=list)
+    tokens: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+    def render(self) -> str:
+        """Return the passages as numbered context blocks."""
+        return "\n\n".join(f"[{i}] {p.text}" for i, p in enumerate(self.passages, 1))
+
+
+def pack_context(
+    passages: list[Passage], budget_tokens: int, max_overlap: float = 0.8
+) -> PackedContext:
+    """Select the highest-ranked, non-redundant passages that fit the budget.
+
+    Args:
+        passages: Candidates, best first.
+        budget_tokens: Tokens available for the rendered context.
+        max_overlap: Fraction of a passage's shingles that may already be
+            covered by one selected passage before it counts as a duplicate.
+
+    Returns:
+        The selected passages (in rank order) and packing statistics.
+    """
+    packed = PackedContext()
+    selected: list[frozenset[tuple[str, ...]]] = []
+    for passage in passages:
+        # Duplicates are counted as such even when they would not fit either.
+        grams = shingles(passage.text)
+        if grams and any(
+            len(grams & seen) / min(len(grams), len(seen)) >= max_overlap
+            for seen in selected
+            if seen
+        ):
+            packed.duplicates += 1
+            continue
+        cost = passage.tokens + PASSAGE_OVERHEAD_TOKENS
+        if packed.tokens + cost > budget_tokens:
+            packed.over_budget += 1
+            continue
+        selected.append(grams)
+        packed.passages.append(passage)
+        packed.tokens += cost
+    return packed
+
+
+@dataclass
+class Prompt:
+    """Chat messages for an answer plus their token accounting."""
+
+    messages: list[dict[str, str]]
+    context: PackedContext
+    input_tokens: int
+
+
+def context_budget(question: str, window_tokens: int, max_tokens: int, budget_tokens: int) -> int:
+    """Tokens available for passages.
+
+    The configured ``budget_tokens``, capped by what the model's context
+    window leaves after the prompt scaffolding and the ``max_tokens`` reserved
+    for generation.
+    """
+    available = window_tokens - max_tokens - prompt_overhead_tokens(question)
+    return max(0, min(budget_tokens, available))
+
+
+def build_messages(question: str, context: PackedContext) -> list[dict[str, str]]:
+    """Return chat messages asking ``question`` over the packed context."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{context.render()}\n\nQuestion: {question}"},
+    ]
+
+
+def prompt_overhead_tokens(question: str) -> int:
+    """Tokens used by everything in the prompt except the passages."""
+    # + 8 for the per-message framing tokens of chat formats.
+    return count_tokens(SYSTEM_PROMPT) + count_tokens(f"Context:\n\n\nQuestion: {question}") + 8
@@ -1,21 +1,90 @@
 """Embeddings interface and helpers."""
 
-from typing import Any, cast
+from typing import Any
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from service.config import settings
+from service.telemetry.metrics import STAGE_SECONDS
+from service.telemetry.tracing import span
+
+
+_EMBED_SECONDS = STAGE_SECONDS.labels("embed")
 
 
 class Embeddings:
-    """Text embeddings using sentence transformers."""
+    """Text embeddings from the provider selected by ``EMBED_PROVIDER``.
+
+    ``local`` runs a sentence-transformers model in process, on PyTorch or,
+    with ``EMBED_RUNTIME=onnx``, on ONNX Runtime (see
+    ``service.rag.onnx_embeddings``); ``openai`` and ``bedrock`` call the
+    remote API in concurrent batches (see ``service.llm.embedders``) and
+    return the model's native size unless ``EMBED_DIM`` asks for a shorter
+    one the model supports.
+    """
+
+    def __init__(
+        self, provider: str | None = None, model: str | None = None, runtime: str | None = None
+    ) -> None:
+        """Initialize the embeddings backend (defaults from settings)."""
+        self.provider = provider or settings.embed_provider
+        self.runtime = runtime or settings.embed_runtime
+        model = model or settings.embed_model
+        self.model: Any = model
+        self.embedder: Any = None
+        if self.provider == "openai":
+            from service.llm.embedders import OpenAIEmbedder
+
+            self.embedder = OpenAIEmbedder(
+                settings.openai_api_key,
+                model=model,
+                base_url=settings.openai_base_url,
+                dimensions=settings.embed_dim,
+                timeout_s=settings.llm_timeout_s,
+                batch_size=settings.embed_batch_size,
+                concurrency=settings.embed_concurrency,
+                max_retries=settings.embed_max_retries,
+            )
+            self.dim = self._remote_dim()
+        elif self.provider == "bedrock":
+            from service.llm.embedders import BedrockEmbedder
+
+            self.embedder = BedrockEmbedder(
+                model=model,
+                region=settings.bedrock_region or settings.aws_region,
+                dimensions=settings.embed_dim,
+                concurrency=settings.embed_concurrency,
+                max_retries=settings.embed_max_retries,
+            )
+            self.dim = self._remote_dim()
+        elif self.runtime == "onnx":
+            from service.rag.onnx_embeddings import OnnxEmbedder
+
+            self.embedder = OnnxEmbedder(
+                model,
+                cache_dir=settings.embed_onnx_dir,
+                quantize=settings.embed_quantize,
+                threads=settings.embed_threads,
+            )
+            self.dim = self.embedder.dim
+        else:
+            from sentence_transformers import SentenceTransformer
+
+            self.model = SentenceTransformer(model)
+            self.dim = int(self.model.get_sentence_embedding_dimension())
 
-    def __init__(self) -> None:
-        """Initialize embeddings model."""
-        self.model: Any = SentenceTransformer(settings.embed_model)
+    def _remote_dim(self) -> int:
+        if self.embedder.dim is None:
+            # Unknown model without EMBED_DIM: the first response tells.
+            self.embedder.embed(["dimension probe"])
+        return int(self.embedder.dim)
 
-    def embed(self, texts: list[str]) -> list[list[float]]:
-        """Generate embeddings for texts."""
-        raw = self.model.encode(texts, convert_to_numpy=True).tolist()
-        # The third-party model returns a nested list shape; cast for mypy.
-        return cast(list[list[float]], raw)
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` as a float32 array of shape ``(len(texts), dim)``."""
+        attributes = {"embed.provider": self.provider, "embed.texts": len(texts)}
+        with span("embed", attributes), _EMBED_SECONDS.time():
+            if self.embedder is not None:
+                vectors: np.ndarray = self.embedder.embed(texts)
+            else:
+                vectors = self.model.encode(texts, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
@@ -0,0 +1,240 @@
+"""Background ingest jobs.
+
+``POST /rag/ingest`` (and the streaming ``/rag/ingest/stream``) enqueue an
+:class:`IngestJob` and return at once; a single worker thread pulls the
+job's documents batch by batch, embeds and indexes them, and
+persists the index when the job is done. The worker keeps clear of search
+traffic on the same node in two ways: it runs at a lower OS scheduling
+priority (``INGEST_NICE``, Linux only), and it pauses after each batch so
+that it is busy for at most ``INGEST_CPU_SHARE`` of wall time. Searches keep
+running between batches; only the index update itself excludes them.
+
+At most ``INGEST_MAX_QUEUED`` jobs wait for the worker; further submissions
+raise :class:`IngestQueueFullError` (``503`` from the API) rather than keep
+their documents in memory behind a worker that has fallen behind. A job whose
+documents were only partly indexed ends as ``partial``, with its ``failed``
+count and errors; ``failed`` means nothing was indexed or persisting failed.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+import os
+import queue
+import threading
+import time
+from typing import Any, Literal
+import uuid
+
+from structlog import get_logger
+
+from service.rag.models import Document
+from service.rag.sources import batched
+
+
+logger = get_logger()
+
+JobStatus = Literal["queued", "running", "succeeded", "partial", "failed"]
+
+# Per-job cap on recorded error messages (the failed count is always exact).
+_MAX_ERRORS = 10
+
+
+class IngestQueueFullError(Exception):
+    """Too many ingest jobs are already waiting for the worker."""
+
+
+@dataclass
+class IngestJob:
+    """State and progress of one ingest request."""
+
+    id: str
+    total: int | None
+    batches: Iterator[list[Document]] | None = field(default=None, repr=False)
+    cleanup: Callable[[], None] | None = field(default=None, repr=False)
+    status: JobStatus = "queued"
+    processed: int = 0
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def record_error(self, message: str, count: int = 1) -> None:
+        """Count ``count`` failed documents and keep the first few messages."""
+        self.failed += count
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append(message)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the client-facing progress report."""
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        if self.total:
+            progress: float | None = (self.processed + self.failed) / self.total
+        else:  # empty job, or a stream of unknown length
+            progress = 1.0 if self.finished_at is not None or self.total == 0 else None
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "failed": self.failed,
+            "progress": progress,
+            "docs_per_s": self.processed / elapsed if elapsed else None,
+            "elapsed_s": elapsed,
+            "errors": self.errors,
+        }
+
+
+class IngestQueue:
+    """FIFO of ingest jobs served by one throttled background thread."""
+
+    def __init__(
+        self,
+        ingest_batch: Callable[[list[Document]], int],
+        finalize: Callable[[], None],
+        batch_size: int = 64,
+        cpu_share: float = 0.5,
+        nice: int = 10,
+        max_jobs: int = 100,
+        max_queued: int = 16,
+    ) -> None:
+        """Create an idle queue; the worker starts with the first job.
+
+        Args:
+            ingest_batch: Embeds and indexes one batch (returns docs added).
+            finalize: Called once per job after its last batch (e.g. persist).
+            batch_size: Documents per batch.
+            cpu_share: Upper bound on the worker's busy fraction of wall time.
+            nice: Niceness increment applied to the worker thread.
+            max_jobs: Finished jobs retained for status queries.
+            max_queued: Jobs allowed to wait for the worker (0 = unbounded).
+        """
+        self.ingest_batch = ingest_batch
+        self.finalize = finalize
+        self.batch_size = batch_size
+        self.cpu_share = min(1.0, max(0.01, cpu_share))
+        self.nice = nice
+        self.max_jobs = max_jobs
+        self.jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._queue: queue.Queue[IngestJob] = queue.Queue(maxsize=max(0, max_queued))
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    def submit(self, docs: Sequence[Document]) -> IngestJob:
+        """Enqueue ``docs`` and return the new job."""
+        return self.submit_source(lambda _: batched(docs, self.batch_size), total=len(docs))
+
+    def submit_source(
+        self,
+        open_batches: Callable[[IngestJob], Iterator[list[Document]]],
+        total: int | None = None,
+        cleanup: Callable[[], None] | None = None,
+    ) -> IngestJob:
+        """Enqueue a lazily read document source and return the new job.
+
+        Args:
+            open_batches: Given the job (for ``record_error`` on malformed
+                records), returns an iterator of document batches. It is
+                consumed on the worker thread.
+            total: Number of documents, if known.
+            cleanup: Called once the source has been consumed (e.g. to
+                delete a spooled upload), or at once if the job is rejected.
+
+        Raises:
+            IngestQueueFullError: If ``max_queued`` jobs are already waiting.
+        """
+        job = IngestJob(id=uuid.uuid4().hex, total=total, cleanup=cleanup)
+        job.batches = open_batches(job)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            job.batches = None
+            if cleanup is not None:
+                cleanup()
+            logger.warning("ingest.job.rejected", queued=self._queue.qsize())
+            raise IngestQueueFullError("Too many ingest jobs queued") from None
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ingest", daemon=True)
+                self._worker.start()
+        logger.info("ingest.job.queued", job_id=job.id, total=job.total)
+        return job
+
+    def full(self) -> bool:
+        """Whether a submission would currently be rejected."""
+        return self._queue.full()
+
+    def get(self, job_id: str) -> IngestJob | None:
+        """Return the job with ``job_id`` if it is still retained."""
+        return self.jobs.get(job_id)
+
+    def _evict(self) -> None:
+        finished = [j.id for j in self.jobs.values() if j.finished_at is not None]
+        for job_id in finished[: max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    def _lower_priority(self) -> None:
+        # On Linux each thread has its own nice value, so this leaves the
+        # request-serving threads untouched.
+        if self.nice <= 0 or not hasattr(os, "setpriority"):
+            return
+        try:
+            tid = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, tid, os.getpriority(os.PRIO_PROCESS, tid) + self.nice)
+        except OSError as exc:
+            logger.warning("ingest.nice_failed", error=str(exc))
+
+    def _run(self) -> None:
+        self._lower_priority()
+        while True:
+            self._process(self._queue.get())
+
+    def _process(self, job: IngestJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        batches, job.batches = job.batches, None
+        try:
+            self._consume(job, batches or iter(()))
+        except Exception as exc:  # the source itself failed (unreadable input)
+            job.record_error(f"source: {exc}", count=0)
+        finally:
+            if job.cleanup is not None:
+                job.cleanup()
+        persisted = True
+        try:
+            if job.processed:
+                self.finalize()
+        except Exception as exc:
+            persisted = False
+            job.record_error(f"persist: {exc}", count=0)
+        if not job.errors and not job.failed:
+            job.status = "succeeded"
+        elif job.processed and persisted:
+            job.status = "partial"
+        else:
+            job.status = "failed"
+        job.finished_at = time.time()
+        logger.info("ingest.job.finished", **job.to_dict())
+
+    def _consume(self, job: IngestJob, batches: Iterator[list[Document]]) -> None:
+        offset = 0
+        while True:
+            # Reading/parsing the next batch counts towards the busy time too.
+            start = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                return
+            try:
+                job.processed += self.ingest_batch(batch)
+            except Exception as exc:
+                job.record_error(f"docs {offset}-{offset + len(batch) - 1}: {exc}", len(batch))
+                logger.warning("ingest.batch.failed", job_id=job.id, error=str(exc))
+            offset += len(batch)
+            busy = time.perf_counter() - start
+            # Duty cycle: idle long enough that busy / (busy + idle) <= cpu_share.
+            time.sleep(busy * (1 - self.cpu_share) / self.cpu_share)
@@ -0,0 +1,53 @@
+"""Reader-writer lock guarding the vector index.
+
+FAISS and Annoy indexes are not safe to mutate while being searched. Many
+searches may hold the lock at once; an index update waits for them to drain
+and, while it waits, holds off new searches so a steady query stream cannot
+starve ingestion.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import threading
+
+
+class RWLock:
+    """Writer-preferring reader-writer lock."""
+
+    def __init__(self) -> None:
+        """Create an unlocked lock."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock shared."""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock exclusively."""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
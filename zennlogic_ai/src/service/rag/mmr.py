@@ -0,0 +1,51 @@
+"""Maximal marginal relevance (MMR) selection over retrieved candidates.
+
+Each step picks the candidate maximising
+``lambda * sim(query, c) - (1 - lambda) * max(sim(c, s) for s in selected)``,
+so ``lambda=1`` keeps the plain relevance order and lower values trade
+relevance for diversity. All similarities come from one normalised
+candidate-by-candidate matrix product; each greedy step is then a handful of
+vector operations over the candidates (well under a millisecond for 100
+candidates).
+"""
+
+import numpy as np
+
+
+def mmr_select(
+    query_vec: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5
+) -> list[int]:
+    """Return the row indices of ``candidates`` chosen by MMR, in pick order.
+
+    Args:
+        query_vec: Query embedding, shape ``(dim,)``.
+        candidates: Candidate embeddings, shape ``(n, dim)``.
+        k: Number of rows to select (at most ``n``).
+        lambda_mult: Relevance weight in ``[0, 1]``.
+    """
+    n = candidates.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+    cand = np.asarray(candidates, dtype=np.float32)
+    cand = cand / np.maximum(np.linalg.norm(cand, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = lambda_mult * (cand @ query)
+    similarity = cand @ cand.T
+    # Highest similarity of each candidate to anything selected so far.
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    available[first] = False
+    for _ in range(k - 1):
+        redundancy = np.maximum(redundancy, similarity[selected[-1]])
+        scores = relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+    return selected
@@ -10,3 +10,44 @@ class Document(BaseModel):
 
     text: str
     metadata: dict[str, Any] = Field(default_factory=dict)
+
+
+class SearchHit(BaseModel):
+    """One search result; ``id`` is the document's position in the index."""
+
+    id: int
+    score: float
+    text: str | None = None
+    metadata: dict[str, Any] | None = None
+
+
+class SearchResponse(BaseModel):
+    """Results of a vector search, best first."""
+
+    results: list[SearchHit]
+
+
+class AnswerSource(BaseModel):
+    """A passage the answer was grounded on."""
+
+    id: int
+    score: float
+    metadata: dict[str, Any] | None = None
+
+
+class AnswerUsage(BaseModel):
+    """Token accounting of the prompt behind an answer."""
+
+    input_tokens: int
+    context_tokens: int
+    passages: int
+    duplicates_dropped: int
+    over_budget_dropped: int
+
+
+class AnswerResponse(BaseModel):
+    """A RAG answer with its sources and prompt usage."""
+
+    answer: str
+    sources: list[AnswerSource]
+    usage: AnswerUsage
@@ -0,0 +1,221 @@
+"""ONNX Runtime embedding backend for sentence-transformers models.
+
+The first start exports the model's transformer to ONNX (and, optionally, a
+dynamically int8-quantized copy) under ``EMBED_ONNX_DIR``; this step needs
+PyTorch and sentence-transformers. Later starts load only onnxruntime and the
+fast tokenizer, which is much quicker than importing PyTorch. Pooling and
+normalisation are re-implemented in NumPy from the model's own configuration.
+
+Accuracy against the PyTorch model (checked by the ``embed_runtime`` benchmark
+suite): fp32 ONNX output matches within :data:`FP32_TOLERANCE` absolute
+difference per component; int8 output keeps a cosine similarity of at least
+:data:`INT8_MIN_COSINE` to the PyTorch vector.
+"""
+
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Any
+
+import numpy as np
+from structlog import get_logger
+
+
+logger = get_logger()
+
+FP32_TOLERANCE = 1e-4
+INT8_MIN_COSINE = 0.98
+
+_META = "embedder.json"
+_FP32 = "model.onnx"
+_INT8 = "model.int8.onnx"
+# sentence-transformers < 6 stores the pooling mode as one flag per mode.
+_POOLING_FLAGS = {
+    "pooling_mode_cls_token": "cls",
+    "pooling_mode_mean_tokens": "mean",
+    "pooling_mode_max_tokens": "max",
+}
+
+
+def model_dir(cache_dir: str, model_name: str) -> Path:
+    """Directory holding the exported files for ``model_name``."""
+    return Path(cache_dir) / model_name.replace("/", "--")
+
+
+def _pooling_mode(config: dict[str, Any]) -> str:
+    mode = config.get("pooling_mode") or next(
+        (mode for flag, mode in _POOLING_FLAGS.items() if config.get(flag)), None
+    )
+    if mode not in ("cls", "mean", "max"):
+        raise ValueError(f"Unsupported pooling for ONNX export: {config}")
+    return str(mode)
+
+
+def export_onnx(model_name: str, out_dir: Path) -> None:
+    """Export ``model_name`` (fp32 ONNX, tokenizer and pooling metadata) to ``out_dir``.
+
+    The export is written to a temporary directory and renamed into place, so
+    concurrent workers never load a half-written model.
+    """
+    from sentence_transformers import SentenceTransformer
+    import torch
+
+    st: Any = SentenceTransformer(model_name, device="cpu")
+    modules: dict[str, Any] = {type(module).__name__: module for module in st}
+    tokenizer = st.tokenizer
+    hf_model = modules["Transformer"].auto_model.eval()
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in tokenizer.model_input_names
+    ]
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.model = hf_model
+
+        def forward(self, *inputs: Any) -> Any:
+            return self.model(**dict(zip(input_names, inputs, strict=True))).last_hidden_state
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in [*input_names, "hidden"]}
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=out_dir.parent, prefix=".export-"))
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                _Encoder(),
+                tuple(sample[name] for name in input_names),
+                str(tmp / _FP32),
+                input_names=input_names,
+                output_names=["hidden"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        tokenizer.backend_tokenizer.save(str(tmp / "tokenizer.json"))
+        meta = {
+            "model": model_name,
+            "dim": st.get_sentence_embedding_dimension(),
+            "max_seq_length": st.get_max_seq_length(),
+            "pooling": _pooling_mode(modules["Pooling"].get_config_dict()),
+            "normalize": "Normalize" in modules,
+            "input_names": input_names,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }
+        (tmp / _META).write_text(json.dumps(meta, indent=2))
+        os.replace(tmp, out_dir)
+    except OSError:
+        if not (out_dir / _META).exists():
+            raise
+        # Another worker finished the export first.
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    logger.info("embed.onnx.exported", model=model_name, path=str(out_dir))
+
+
+def quantize_int8(out_dir: Path) -> None:
+    """Write a dynamically int8-quantized copy of the fp32 model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".onnx")
+    os.close(fd)
+    try:
+        quantize_dynamic(str(out_dir / _FP32), tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, out_dir / _INT8)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    logger.info("embed.onnx.quantized", path=str(out_dir / _INT8))
+
+
+class OnnxEmbedder:
+    """Sentence embeddings computed with ONNX Runtime on the CPU."""
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str = ".data/onnx",
+        quantize: bool = False,
+        threads: int = 0,
+        batch_size: int = 32,
+    ) -> None:
+        """Load the exported model, exporting (and quantizing) it first if needed.
+
+        Args:
+            model_name: sentence-transformers model name or path.
+            cache_dir: Where exported models are kept.
+            quantize: Run the dynamically int8-quantized model.
+            threads: Intra-op threads (0 lets onnxruntime use the physical cores).
+            batch_size: Texts per inference call.
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = model_dir(cache_dir, model_name)
+        if not (path / _META).exists():
+            export_onnx(model_name, path)
+        if quantize and not (path / _INT8).exists():
+            quantize_int8(path)
+        self.meta: dict[str, Any] = json.loads((path / _META).read_text())
+        self.dim = int(self.meta["dim"])
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(str(path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=int(self.meta["max_seq_length"]))
+        self.tokenizer.enable_padding(
+            pad_id=int(self.meta["pad_token_id"] or 0), pad_token=self.meta["pad_token"] or "[PAD]"
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(path / (_INT8 if quantize else _FP32)),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` as float32 vectors in input order."""
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        # Batch texts of similar length together so little compute goes to padding.
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        for lo in range(0, len(texts), self.batch_size):
+            idx = order[lo : lo + self.batch_size]
+            out[idx] = self._embed_batch([texts[i] for i in idx])
+        return out
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        columns = {
+            "input_ids": [e.ids for e in encodings],
+            "attention_mask": mask,
+            "token_type_ids": [e.type_ids for e in encodings],
+        }
+        feeds = {
+            name: np.asarray(columns[name], dtype=np.int64) for name in self.meta["input_names"]
+        }
+        hidden: np.ndarray = self.session.run(["hidden"], feeds)[0]
+        pooled = self._pool(hidden, mask)
+        if self.meta["normalize"]:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        mode = self.meta["pooling"]
+        if mode == "cls":
+            return hidden[:, 0].astype(np.float32)
+        weights = mask[:, :, None].astype(np.float32)
+        if mode == "max":
+            pooled: np.ndarray = np.where(weights > 0, hidden, -1e9).max(axis=1)
+        else:  # mean over real (unpadded) tokens
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return pooled.astype(np.float32)
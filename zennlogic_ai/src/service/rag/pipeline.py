@@ -1,43 +1,283 @@
 """RAG pipeline: ingest, search, answer."""
 
+import argparse
 import os
-from typing import Any
 
 import numpy as np
+from structlog import get_logger
 
 from service.config import settings
+from service.rag.context import (
+    Passage,
+    Prompt,
+    build_messages,
+    context_budget,
+    pack_context,
+    prompt_overhead_tokens,
+)
 from service.rag.embeddings import Embeddings
-from service.rag.models import Document
+from service.rag.locks import RWLock
+from service.rag.mmr import mmr_select
+from service.rag.models import (
+    AnswerResponse,
+    AnswerSource,
+    AnswerUsage,
+    Document,
+    SearchHit,
+)
+from service.rag.sources import batched, iter_source
+from service.rag.tokens import count_tokens_batch
 from service.rag.vector_backends.factory import get_vector_backend
+from service.singleflight import SingleFlight
+from service.telemetry.metrics import PROMPT_TOKENS, STAGE_SECONDS
+from service.telemetry.tracing import span
+
+
+logger = get_logger()
+
+_SEARCH_SECONDS = STAGE_SECONDS.labels("search")
+_DOC_FETCH_SECONDS = STAGE_SECONDS.labels("doc_fetch")
+_RERANK_SECONDS = STAGE_SECONDS.labels("rerank")
+_CONTEXT_SECONDS = STAGE_SECONDS.labels("context")
+_INPUT_TOKENS = PROMPT_TOKENS.labels("input")
+_CONTEXT_TOKENS = PROMPT_TOKENS.labels("context")
 
 
 class RAGPipeline:
     """RAG pipeline for document ingestion and querying."""
 
-    def __init__(self, dim: int = 384) -> None:
-        """Initialize RAG pipeline."""
+    def __init__(self, dim: int | None = None) -> None:
+        """Initialize RAG pipeline; ``dim`` defaults to the embedding size."""
         self.embeddings = Embeddings()
-        self.vector_store = get_vector_backend(dim)
+        self.vector_store = get_vector_backend(dim or self.embeddings.dim)
+        # Searches share the index; adds (e.g. from background ingest) are exclusive.
+        self.index_lock = RWLock()
+        # Identical concurrent queries share one embed/search/answer run.
+        self._search_flight = SingleFlight("rag.search")
+        self._answer_flight = SingleFlight("rag.answer")
 
     def ingest_documents(self, docs: list[Document]) -> dict[str, int]:
         """Ingest documents into vector store."""
+        count = self.ingest_batch(docs)
+        self.persist()
+        # Optionally push to S3
+        return {"count": count}
+
+    def ingest_batch(self, docs: list[Document]) -> int:
+        """Embed and index ``docs`` without persisting; returns the number added.
+
+        Embedding runs outside the index lock, so searches are only held off
+        for the index update itself.
+        """
         texts = [doc.text for doc in docs]
         metadatas = [doc.metadata for doc in docs]
-        self.embeddings.embed(texts)  # Compute embeddings (for consistency, though not stored)
-        self.vector_store.add(texts, metadatas)
-        os.makedirs(os.path.dirname(".data/vector/index"), exist_ok=True)
-        self.vector_store.persist(".data/vector/index")
-        # Optionally push to S3
-        return {"count": len(texts)}
-
-    def search(self, query: str, k: int = 5) -> list[tuple[str, dict[str, object], float]]:
-        """Search for relevant documents using FAISS only."""
-        query_vec = self.embeddings.embed([query])[0]
-        vec = np.array(query_vec)
-        return self.vector_store.search(vec, k)
-
-    def answer(self, query: str) -> Any:
-        """Answer query using retrieved documents."""
-        results = self.search(query, settings.top_k)
-        # Minimal answer stub
-        return {"answer": results[0][0] if results else "", "sources": [r[1] for r in results]}
+        vectors = self.embeddings.embed(texts)
+        token_counts = count_tokens_batch(texts)
+        with self.index_lock.write():
+            self.vector_store.add(texts, metadatas, vectors, token_counts)
+        return len(texts)
+
+    def refresh_index(self) -> None:
+        """Make documents added since the last refresh searchable.
+
+        Backends with immutable indexes (Annoy) build a new index here,
+        outside the lock, while searches keep using the current one; only
+        the swap takes the write lock. Flat FAISS indexes need no refresh.
+        """
+        index = self.vector_store.build_index()
+        if index is not None:
+            with self.index_lock.write():
+                self.vector_store.swap_index(index)
+
+    def persist(self, path: str = ".data/vector/index") -> None:
+        """Refresh the index (see :meth:`refresh_index`) and write it to ``path``."""
+        self.refresh_index()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.index_lock.read():
+            self.vector_store.persist(path)
+
+    def search(self, query: str, k: int = 5, mmr_lambda: float | None = None) -> list[SearchHit]:
+        """Search for relevant documents using FAISS only.
+
+        With ``mmr_lambda`` (default ``MMR_LAMBDA``) the top ``MMR_FETCH_K``
+        candidates are diversified with maximal marginal relevance, so
+        near-duplicate chunks do not crowd out the rest of the top k.
+        Concurrent identical searches are coalesced and share one (read-only)
+        result list.
+        """
+        lam = settings.mmr_lambda if mmr_lambda is None else mmr_lambda
+        with span("rag.search", {"rag.k": k, "rag.mmr_lambda": str(lam)}):
+            return self._search_flight.do((query, k, lam), lambda: self._search(query, k, lam))
+
+    def _retrieve(
+        self, query: str, k: int, mmr_lambda: float | None = None
+    ) -> list[tuple[int, float]]:
+        return self.retrieve_batch([query], k, mmr_lambda)[0]
+
+    def retrieve_batch(
+        self, queries: list[str], k: int, mmr_lambda: float | None = None
+    ) -> list[list[tuple[int, float]]]:
+        """Return ``(doc_id, score)`` hits for each query.
+
+        All queries are embedded in one call and searched together under a
+        single read lock (FAISS scores the whole batch in one matrix product).
+        """
+        if not queries:
+            return []
+        vecs = self.embeddings.embed(queries)
+        fetch_k = k if mmr_lambda is None else max(k, settings.mmr_fetch_k)
+        attributes = {
+            "vector.backend": type(self.vector_store).__name__,
+            "vector.queries": len(queries),
+            "vector.k": fetch_k,
+        }
+        with self.index_lock.read():
+            with span("vector.search", attributes), _SEARCH_SECONDS.time():
+                batch = self.vector_store.search_ids_batch(vecs, fetch_k)
+            if mmr_lambda is None:
+                return [hits[:k] for hits in batch]
+            with span("rag.mmr", {"rag.mmr_lambda": mmr_lambda}), _RERANK_SECONDS.time():
+                return [
+                    self._mmr(vec, hits, k, mmr_lambda)
+                    for vec, hits in zip(vecs, batch, strict=True)
+                ]
+
+    def _mmr(
+        self, vec: np.ndarray, hits: list[tuple[int, float]], k: int, mmr_lambda: float
+    ) -> list[tuple[int, float]]:
+        if len(hits) <= 1:
+            return hits[:k]
+        candidates = self.vector_store.get_vectors([i for i, _ in hits])
+        return [hits[p] for p in mmr_select(vec, candidates, k, mmr_lambda)]
+
+    def search_batch(
+        self, queries: list[str], k: int = 5, mmr_lambda: float | None = None
+    ) -> list[list[SearchHit]]:
+        """Search several queries at once (see :meth:`retrieve_batch`); not coalesced."""
+        lam = settings.mmr_lambda if mmr_lambda is None else mmr_lambda
+        return [self._hits(hits) for hits in self.retrieve_batch(queries, k, lam)]
+
+    def _search(self, query: str, k: int, mmr_lambda: float | None) -> list[SearchHit]:
+        return self._hits(self._retrieve(query, k, mmr_lambda))
+
+    def _hits(self, hits: list[tuple[int, float]]) -> list[SearchHit]:
+        with _DOC_FETCH_SECONDS.time():
+            docs = self.vector_store.fetch(hits)
+        return [
+            SearchHit(id=i, score=score, text=text, metadata=meta)
+            for (i, _), (text, meta, score) in zip(hits, docs, strict=True)
+        ]
+
+    def _token_counts(self, ids: list[int]) -> list[int]:
+        """Token counts for stored docs, counting (once) any not yet known.
+
+        The counts list is read and updated under the index read lock, so an
+        ingest or load cannot resize or replace it meanwhile; the counting
+        itself runs outside the lock. Concurrent readers may store the same
+        count twice, which is harmless.
+        """
+        with self.index_lock.read():
+            counts = self.vector_store.token_counts
+            known = [counts[i] for i in ids]
+            missing = [i for i, n in zip(ids, known, strict=True) if n < 0]
+            texts = [self.vector_store.texts[i] for i in missing]
+        if not missing:
+            return known
+        computed = dict(zip(missing, count_tokens_batch(texts), strict=True))
+        with self.index_lock.read():
+            if self.vector_store.token_counts is counts:  # not replaced by a load
+                for i, n in computed.items():
+                    counts[i] = n
+        return [computed.get(i, n) for i, n in zip(ids, known, strict=True)]
+
+    def build_prompt(self, query: str, hits: list[tuple[int, float]]) -> Prompt:
+        """Pack retrieved hits into chat messages within the token budget.
+
+        The passage budget is ``CONTEXT_BUDGET_TOKENS``, capped so that the
+        prompt plus ``MAX_TOKENS`` of output fits ``CONTEXT_WINDOW_TOKENS``.
+        """
+        with _DOC_FETCH_SECONDS.time():
+            docs = self.vector_store.fetch(hits)
+        counts = self._token_counts([i for i, _ in hits])
+        passages = [
+            Passage(text, meta, score, n, i)
+            for (i, _), (text, meta, score), n in zip(hits, docs, counts, strict=True)
+        ]
+        budget = context_budget(
+            query,
+            settings.context_window_tokens,
+            settings.max_tokens,
+            settings.context_budget_tokens,
+        )
+        context = pack_context(passages, budget)
+        input_tokens = prompt_overhead_tokens(query) + context.tokens
+        return Prompt(build_messages(query, context), context, input_tokens)
+
+    def answer(self, query: str) -> AnswerResponse:
+        """Answer query using retrieved documents (coalesced like :meth:`search`)."""
+        with span("rag.answer"):
+            return self._answer_flight.do(query, lambda: self._answer(query))
+
+    def _answer(self, query: str) -> AnswerResponse:
+        hits = self._retrieve(query, settings.top_k, settings.mmr_lambda)
+        with _CONTEXT_SECONDS.time():
+            prompt = self.build_prompt(query, hits)
+        # Minimal answer stub until generation is wired to LLMChain.chat(prompt.messages)
+        passages = prompt.context.passages
+        return self.answer_response(prompt, passages[0].text if passages else "")
+
+    def answer_response(self, prompt: Prompt, answer: str) -> AnswerResponse:
+        """Build the response for ``answer`` generated from ``prompt``, recording its usage."""
+        context = prompt.context
+        _INPUT_TOKENS.observe(prompt.input_tokens)
+        _CONTEXT_TOKENS.observe(context.tokens)
+        usage = AnswerUsage(
+            input_tokens=prompt.input_tokens,
+            context_tokens=context.tokens,
+            passages=len(context.passages),
+            duplicates_dropped=context.duplicates,
+            over_budget_dropped=context.over_budget,
+        )
+        logger.info("rag.answer.prompt", **usage.model_dump())
+        return AnswerResponse(
+            answer=answer,
+            sources=[
+                AnswerSource(id=p.id, score=p.score, metadata=p.metadata) for p in context.passages
+            ],
+            usage=usage,
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Build an index offline from local files or an S3 prefix.
+
+    Documents are streamed from the source and embedded batch by batch, so
+    memory use follows ``--batch-size`` rather than the corpus size.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--build-local", action="store_true", help="build and persist an index")
+    parser.add_argument(
+        "--source",
+        default=".data/corpus",
+        help="file, directory or s3://bucket/prefix of .ndjson/.jsonl/.arrow/.txt/.md files",
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.ingest_batch_size)
+    parser.add_argument("--output", default=".data/vector/index")
+    args = parser.parse_args(argv)
+    if not args.build_local:
+        parser.error("nothing to do (pass --build-local)")
+
+    def on_error(message: str) -> None:
+        logger.warning("ingest.record.skipped", error=message)
+
+    pipeline = RAGPipeline()
+    total = 0
+    for batch in batched(iter_source(args.source, on_error), args.batch_size):
+        total += pipeline.ingest_batch(batch)
+        logger.info("ingest.build.progress", source=args.source, processed=total)
+    pipeline.persist(args.output)
+    logger.info("ingest.build.done", source=args.source, output=args.output, count=total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Incremental document sources for bulk ingest.
+
+Every source yields :class:`Document` objects one at a time and
+:func:`batched` groups them for the embedding stage, so memory use follows
+the batch size rather than the corpus size. Supported inputs:
+
+* NDJSON / JSON Lines: one ``{"text": ..., "metadata": {...}}`` object per line;
+* Arrow IPC streams: a ``text`` column plus either a ``metadata`` column
+  (struct or JSON string) or other columns, which become metadata;
+* plain ``.txt`` / ``.md`` files, one document each.
+
+Local files and directories are read from disk; ``s3://bucket/prefix``
+sources stream every object under the prefix. Malformed records are reported
+through ``on_error`` and skipped instead of aborting the whole ingest.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+import itertools
+import json
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from pydantic import ValidationError
+
+from service.rag.models import Document
+
+
+OnError = Callable[[str], None]
+
+NDJSON_MEDIA_TYPES = frozenset(
+    {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+)
+ARROW_MEDIA_TYPES = frozenset({"application/vnd.apache.arrow.stream"})
+_NDJSON_SUFFIXES = frozenset({".ndjson", ".jsonl"})
+_ARROW_SUFFIXES = frozenset({".arrow", ".arrows"})
+_TEXT_SUFFIXES = frozenset({".txt", ".md"})
+
+
+def batched(docs: Iterable[Document], size: int) -> Iterator[list[Document]]:
+    """Group ``docs`` into lists of at most ``size``."""
+    it = iter(docs)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+
+def parse_ndjson(
+    lines: Iterable[bytes | str], on_error: OnError, origin: str = "body"
+) -> Iterator[Document]:
+    """Yield one document per non-blank line."""
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield Document.model_validate_json(line)
+        except ValidationError as exc:
+            on_error(f"{origin}:{lineno}: {exc.errors(include_url=False)[0]['msg']}")
+
+
+def parse_arrow(stream: BinaryIO, on_error: OnError, origin: str = "body") -> Iterator[Document]:
+    """Yield documents from an Arrow IPC stream, one record batch at a time.
+
+    Raises:
+        RuntimeError: If ``pyarrow`` is not installed.
+    """
+    try:
+        import pyarrow.ipc
+    except ImportError as exc:
+        raise RuntimeError("Arrow ingest requires pyarrow (install .[arrow])") from exc
+    row = 0
+    for record_batch in pyarrow.ipc.open_stream(stream):
+        for record in record_batch.to_pylist():
+            row += 1
+            try:
+                doc = _arrow_document(record)
+            except ValueError as exc:  # bad metadata JSON/type or failed validation
+                on_error(f"{origin}:row {row}: {exc}")
+                continue
+            if doc is None:
+                on_error(f"{origin}:row {row}: missing or non-string 'text'")
+            else:
+                yield doc
+
+
+def _arrow_document(record: dict[str, Any]) -> Document | None:
+    text = record.pop("text", None)
+    if not isinstance(text, str):
+        return None
+    metadata = record.pop("metadata", None)
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    if metadata is not None and not isinstance(metadata, dict):
+        raise ValueError(f"'metadata' must be an object, got {type(metadata).__name__}")
+    return Document(text=text, metadata={**record, **(metadata or {})})
+
+
+def _iter_object(
+    name: str, open_binary: Callable[[], BinaryIO], on_error: OnError
+) -> Iterator[Document]:
+    suffix = Path(name).suffix.lower()
+    if suffix in _NDJSON_SUFFIXES:
+        with open_binary() as fh:
+            # S3 bodies iterate in fixed-size chunks; ask them for lines instead.
+            lines = fh.iter_lines() if hasattr(fh, "iter_lines") else fh
+            yield from parse_ndjson(lines, on_error, name)
+    elif suffix in _ARROW_SUFFIXES:
+        with open_binary() as fh:
+            yield from parse_arrow(fh, on_error, name)
+    elif suffix in _TEXT_SUFFIXES:
+        with open_binary() as fh:
+            yield Document(text=fh.read().decode("utf-8"), metadata={"source": name})
+
+
+def iter_local(root: str, on_error: OnError) -> Iterator[Document]:
+    """Yield documents from a file or, recursively, a directory."""
+    path = Path(root)
+    files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+    for file in files:
+
+        def open_file(file: Path = file) -> BinaryIO:
+            return file.open("rb")
+
+        yield from _iter_object(str(file), open_file, on_error)
+
+
+def iter_s3(uri: str, on_error: OnError) -> Iterator[Document]:
+    """Yield documents from every object under ``s3://bucket/prefix``."""
+    from service.aws.s3 import get_s3_client, iter_objects
+
+    bucket, _, prefix = uri.removeprefix("s3://").partition("/")
+    client = get_s3_client()
+    for obj in iter_objects(prefix, bucket=bucket):
+        key = obj["Key"]
+
+        def open_body(key: str = key) -> BinaryIO:
+            body: BinaryIO = client.get_object(Bucket=bucket, Key=key)["Body"]
+            return body
+
+        yield from _iter_object(f"s3://{bucket}/{key}", open_body, on_error)
+
+
+def iter_source(source: str, on_error: OnError) -> Iterator[Document]:
+    """Yield documents from a local path or an ``s3://`` prefix."""
+    if source.startswith("s3://"):
+        return iter_s3(source, on_error)
+    return iter_local(source, on_error)
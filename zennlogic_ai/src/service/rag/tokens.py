@@ -0,0 +1,42 @@
+"""Token counting for prompt budgeting.
+
+Uses ``tiktoken`` (``cl100k_base``) when it is installed. Otherwise a
+regex-based estimate stands in, which errs on the high side: one token per
+punctuation mark and one per started four characters of a word.
+"""
+
+import math
+import re
+
+
+_WORD_OR_PUNCT = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"\w+")
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # not installed, or encoding files unavailable offline
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens in ``text``."""
+    if _encoding is not None:
+        return len(_encoding.encode_ordinary(text))
+    return sum(math.ceil(len(piece) / 4) for piece in _WORD_OR_PUNCT.findall(text))
+
+
+def count_tokens_batch(texts: list[str]) -> list[int]:
+    """Return token counts for several texts (batched when tiktoken is available)."""
+    if _encoding is not None:
+        return [len(ids) for ids in _encoding.encode_ordinary_batch(texts)]
+    return [count_tokens(text) for text in texts]
+
+
+def shingles(text: str, size: int = 3) -> frozenset[tuple[str, ...]]:
+    """Return the set of lowercased word ``size``-grams in ``text``."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i : i + size]) for i in range(len(words) - size + 1))
@@ -1,35 +1,121 @@
 """Annoy vector backend (cosine metric, snapshot, S3 sync)."""
 
+import threading
+
 from annoy import AnnoyIndex
+import numpy as np
 
 
 class AnnoyBackend:
-    """Annoy vector backend for similarity search."""
+    """Annoy vector backend for similarity search.
+
+    Annoy forests are immutable once built, so searches always use the last
+    built forest while :meth:`add` only buffers new vectors. A fresh forest
+    over every vector is built by :meth:`build_index` (slow; run it off the
+    search path, e.g. on the ingest worker) and published with
+    :meth:`swap_index`. Vectors added since the last swap are not searchable
+    yet.
+    """
 
-    def __init__(self, dim: int = 384) -> None:
+    def __init__(self, dim: int = 384, n_trees: int = 10) -> None:
         """Initialize Annoy backend with given dimension."""
         self.index = AnnoyIndex(dim, "angular")
         self.dim = dim
+        self.n_trees = n_trees
         self.texts: list[str] = []
         self.metadatas: list[dict[str, object]] = []
+        self.token_counts: list[int] = []
+        # Every vector added so far, in id order, for rebuilding the forest.
+        self._vectors: list[np.ndarray] = []
+        self._n_indexed = 0
+        self._built = False
+        self._build_lock = threading.Lock()
 
-    def add(self, texts: list[str], metadatas: list[dict[str, object]]) -> None:
-        """Add texts and metadata to the index."""
+    def add(
+        self,
+        texts: list[str],
+        metadatas: list[dict[str, object]],
+        vectors: np.ndarray | None = None,
+        token_counts: list[int] | None = None,
+    ) -> None:
+        """Add texts and metadata; vectors become searchable at the next :meth:`swap_index`."""
+        if vectors is not None:
+            rows = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+            self._vectors.append(rows)
         self.texts.extend(texts)
         self.metadatas.extend(metadatas)
+        # -1 marks "not counted yet"; the pipeline fills it in on first retrieval.
+        self.token_counts.extend(token_counts or [-1] * len(texts))
+
+    def build_index(self) -> AnnoyIndex | None:
+        """Build a forest over every vector added so far; None if nothing is new.
+
+        The live index is not touched, so searches continue meanwhile.
+        """
+        with self._build_lock:
+            chunks = list(self._vectors)
+            n_items = sum(len(chunk) for chunk in chunks)
+            if n_items == self._n_indexed:
+                return None
+            index = AnnoyIndex(self.dim, "angular")
+            for i, vec in enumerate(np.concatenate(chunks)):
+                index.add_item(i, vec.tolist())
+            index.build(self.n_trees)
+            return index
+
+    def swap_index(self, index: AnnoyIndex | None) -> None:
+        """Serve searches from ``index`` (from :meth:`build_index`) from now on.
+
+        Call it under the pipeline's index write lock. An index older than
+        the live one is ignored.
+        """
+        if index is None or index.get_n_items() < self._n_indexed:
+            return
+        self.index = index
+        self._n_indexed = index.get_n_items()
+        self._built = True
+
+    def search_ids(self, query_vec: list[float], k: int) -> list[tuple[int, float]]:
+        """Search the index only, returning ``(doc_id, distance)`` pairs."""
+        if not self._built:
+            return []  # nothing published yet
+        ids, dists = self.index.get_nns_by_vector(list(query_vec), k, include_distances=True)
+        n_docs = len(self.texts)
+        return [(i, float(d)) for i, d in zip(ids, dists, strict=True) if i < n_docs]
+
+    def search_ids_batch(self, query_vecs: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        """Search several queries; one ``search_ids`` result per row."""
+        return [self.search_ids(vec, k) for vec in np.asarray(query_vecs).tolist()]
+
+    def fetch(self, hits: list[tuple[int, float]]) -> list[tuple[str, dict[str, object], float]]:
+        """Resolve ``(doc_id, distance)`` pairs to ``(text, metadata, distance)``."""
+        return [(self.texts[i], self.metadatas[i], score) for i, score in hits]
+
+    def get_vectors(self, ids: list[int]) -> np.ndarray:
+        """Return the stored vectors for ``ids`` as a ``(len(ids), dim)`` array."""
+        if not ids:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if len(self._vectors) > 1:
+            self._vectors = [np.concatenate(self._vectors)]
+        return self._vectors[0][ids]
 
     def search(self, query_vec: list[float], k: int) -> list[tuple[str, dict[str, object], float]]:
         """Search for k nearest neighbors."""
-        idxs = self.index.get_nns_by_vector(query_vec, k, include_distances=True)
-        return [(self.texts[i], self.metadatas[i], float(d)) for i, d in zip(*idxs, strict=False)]
+        return self.fetch(self.search_ids(query_vec, k))
 
     def persist(self, path: str) -> None:
-        """Persist the index to disk."""
+        """Persist the index to disk, first building in any vectors not yet indexed."""
+        self.swap_index(self.build_index())
         self.index.save(path)
 
     def load(self, path: str) -> None:
         """Load the index from disk."""
         self.index.load(path)
+        n_items = self.index.get_n_items()
+        vectors = [self.index.get_item_vector(i) for i in range(n_items)]
+        self._vectors = [np.asarray(vectors, dtype=np.float32).reshape(n_items, self.dim)]
+        self._n_indexed = n_items
+        self._built = True
 
     def push_s3(self) -> None:
         """Push index to S3 (stub)."""
@@ -13,21 +13,77 @@ class FaissBackend:
         self.dim = dim
         self.texts: list[str] = []
         self.metadatas: list[dict[str, object]] = []
+        self.token_counts: list[int] = []
 
-    def add(self, texts: list[str], metadatas: list[dict[str, object]]) -> None:
-        """Add texts and metadata to the index."""
-        # Embed texts externally, add vectors here
+    def add(
+        self,
+        texts: list[str],
+        metadatas: list[dict[str, object]],
+        vectors: np.ndarray | None = None,
+        token_counts: list[int] | None = None,
+    ) -> None:
+        """Add texts and metadata to the index.
+
+        Args:
+            texts: Document texts.
+            metadatas: Metadata mappings aligned with ``texts``.
+            vectors: Optional ``(len(texts), dim)`` embedding matrix. When
+                omitted only the documents are stored (vectors embedded
+                externally can be added later).
+            token_counts: Optional token count per text, cached for prompt
+                budgeting.
+        """
+        if vectors is not None:
+            self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
         self.texts.extend(texts)
         self.metadatas.extend(metadatas)
+        # -1 marks "not counted yet"; the pipeline fills it in on first retrieval.
+        self.token_counts.extend(token_counts or [-1] * len(texts))
 
-    def search(self, query_vec: np.ndarray, k: int) -> list[tuple[str, dict[str, object], float]]:
-        """Search for k nearest neighbors."""
-        distances, indices = self.index.search(np.array([query_vec]), k)
+    def build_index(self) -> faiss.Index | None:
+        """Nothing to build: the flat index is updated in place by :meth:`add`."""
+        return None
+
+    def swap_index(self, index: faiss.Index | None) -> None:
+        """No-op counterpart of :meth:`build_index`."""
+
+    def search_ids(self, query_vec: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Search the index only, returning ``(doc_id, score)`` pairs."""
+        query = np.ascontiguousarray(query_vec, dtype=np.float32).reshape(1, -1)
+        distances, indices = self.index.search(query, k)
+        # FAISS pads with -1 when the index holds fewer than k vectors.
+        n_docs = len(self.texts)
         return [
-            (self.texts[i], self.metadatas[i], float(distances[0][idx]))
-            for idx, i in enumerate(indices[0])
+            (int(i), float(d))
+            for i, d in zip(indices[0], distances[0], strict=True)
+            if 0 <= i < n_docs
         ]
 
+    def search_ids_batch(self, query_vecs: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        """Search several queries in one call; one ``search_ids`` result per row."""
+        queries = np.ascontiguousarray(query_vecs, dtype=np.float32).reshape(-1, self.dim)
+        distances, indices = self.index.search(queries, k)
+        n_docs = len(self.texts)
+        return [
+            [(int(i), float(d)) for i, d in zip(row_ids, row_d, strict=True) if 0 <= i < n_docs]
+            for row_ids, row_d in zip(indices, distances, strict=True)
+        ]
+
+    def fetch(self, hits: list[tuple[int, float]]) -> list[tuple[str, dict[str, object], float]]:
+        """Resolve ``(doc_id, score)`` pairs to ``(text, metadata, score)``."""
+        return [(self.texts[i], self.metadatas[i], score) for i, score in hits]
+
+    def get_vectors(self, ids: list[int]) -> np.ndarray:
+        """Reconstruct the stored vectors for ``ids`` as a ``(len(ids), dim)`` array."""
+        if not ids:
+            return np.empty((0, self.dim), dtype=np.float32)
+        vectors: np.ndarray = self.index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+        return vectors
+
+    def search(self, query_vec: np.ndarray, k: int) -> list[tuple[str, dict[str, object], float]]:
+        """Search for k nearest neighbors."""
+        return self.fetch(self.search_ids(query_vec, k))
+
     def persist(self, path: str) -> None:
         """Persist the index to disk."""
         faiss.write_index(self.index, path)
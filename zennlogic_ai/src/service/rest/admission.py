@@ -0,0 +1,203 @@
+"""Per-key rate limiting and admission control for the REST API.
+
+Two guards run as a router dependency before any work starts:
+
+* a token bucket per API key (``RATE_LIMIT_RPS`` sustained, ``RATE_LIMIT_BURST``
+  burst) answers 429 once a key has spent its budget;
+* an in-flight limit per route class (``INFLIGHT_LIMITS``, e.g. ``chat=32,rag=64``)
+  answers 503 once that many requests of the class are already running.
+
+Both responses carry ``Retry-After`` and are counted in
+``zennlogic_requests_shed_total``, so a burst is turned away at the door
+instead of queueing behind the embed model and the LLM. Buckets live in process
+memory unless ``RATE_LIMIT_BACKEND=redis``, which shares them between instances
+through any Redis-protocol server at ``REDIS_URL``.
+"""
+
+from collections.abc import AsyncIterator, Callable
+import hashlib
+import math
+import time
+from typing import Any, Protocol
+
+from fastapi import Depends, HTTPException, status
+from structlog import get_logger
+
+from service.auth.api_key import api_key_auth
+from service.config import settings
+from service.telemetry.metrics import REQUESTS_IN_FLIGHT, REQUESTS_SHED
+
+
+logger = get_logger()
+
+# Refill, spend one token and report the wait in a single atomic step. Time
+# comes from the server so instances with skewed clocks share one timeline.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RateLimiter(Protocol):
+    """Token-bucket store keyed by client."""
+
+    async def acquire(self, key: str) -> float:
+        """Spend one token for ``key``; return 0 if allowed, else seconds to wait."""
+        ...
+
+
+class MemoryRateLimiter:
+    """Token buckets in process memory.
+
+    ``acquire`` never awaits, so on a single event loop each update is atomic
+    without a lock.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """Allow ``rate`` requests per second per key with bursts up to ``burst``."""
+        self.rate = rate
+        self.burst = float(burst)
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def acquire(self, key: str) -> float:
+        """Spend one token for ``key``; return 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+
+class RedisRateLimiter:
+    """Token buckets in Redis (or a compatible server), shared by all instances."""
+
+    def __init__(
+        self, url: str, rate: float, burst: int, prefix: str = "zennlogic:ratelimit:"
+    ) -> None:
+        """Connect lazily to ``url``; requires the optional ``redis`` package."""
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the 'redis' package (install .[redis])"
+            ) from exc
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self._script: Any = self._redis.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self, key: str) -> float:
+        """Spend one token for ``key``; fails open if Redis is unreachable."""
+        try:
+            wait = await self._script(keys=[self.prefix + key], args=[self.rate, self.burst])
+        except Exception as exc:
+            logger.warning("ratelimit.backend_error", error=str(exc))
+            return 0.0
+        return float(wait)
+
+
+class InFlightLimiter:
+    """Caps concurrently running requests of one route class."""
+
+    def __init__(self, route_class: str, limit: int) -> None:
+        """Admit at most ``limit`` concurrent requests (``limit <= 0`` disables)."""
+        self.route_class = route_class
+        self.limit = limit
+        self.in_flight = 0
+        self._gauge = REQUESTS_IN_FLIGHT.labels(route_class)
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free."""
+        if 0 < self.limit <= self.in_flight:
+            return False
+        self.in_flight += 1
+        self._gauge.inc()
+        return True
+
+    def release(self) -> None:
+        """Give a slot back."""
+        self.in_flight -= 1
+        self._gauge.dec()
+
+
+def _build_rate_limiter() -> RateLimiter | None:
+    if settings.rate_limit_rps <= 0:
+        return None
+    if settings.rate_limit_backend == "redis":
+        return RedisRateLimiter(
+            settings.redis_url, settings.rate_limit_rps, settings.rate_limit_burst
+        )
+    return MemoryRateLimiter(settings.rate_limit_rps, settings.rate_limit_burst)
+
+
+rate_limiter = _build_rate_limiter()
+
+
+def _bucket_id(api_key: str) -> str:
+    # Never use the raw key as a bucket name (it may end up in Redis).
+    return hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+
+def admission(
+    route_class: str, limit: int | None = None, limiter: RateLimiter | None = None
+) -> Callable[..., AsyncIterator[None]]:
+    """Build the admission dependency for a route class.
+
+    Args:
+        route_class: Label for metrics and the ``INFLIGHT_LIMITS`` lookup.
+        limit: In-flight limit override; defaults to ``INFLIGHT_LIMITS``
+            (classes not listed there are not capped).
+        limiter: Rate limiter override; defaults to the configured one.
+
+    Returns:
+        An async generator dependency to use with ``Depends``.
+    """
+    in_flight = InFlightLimiter(
+        route_class, settings.inflight_limits.get(route_class, 0) if limit is None else limit
+    )
+    rate_limited = REQUESTS_SHED.labels(route_class, "rate_limited")
+    overloaded = REQUESTS_SHED.labels(route_class, "overloaded")
+
+    async def admit(api_key: str = Depends(api_key_auth)) -> AsyncIterator[None]:
+        bucket = limiter or rate_limiter
+        if bucket is not None:
+            wait = await bucket.acquire(_bucket_id(api_key))
+            if wait > 0:
+                rate_limited.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Rate limit exceeded",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+        if not in_flight.try_acquire():
+            overloaded.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy",
+                headers={"Retry-After": str(settings.inflight_retry_after_s)},
+            )
+        try:
+            yield
+        finally:
+            in_flight.release()
+
+    return admit
@@ -1,13 +1,48 @@
 """FastAPI app factory for zennlogic_ai_service REST API."""
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import Depends, FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+
+from service.auth.api_key import api_key_auth, key_cache
+from service.config import settings
+from service.rest.admission import admission
+from service.rest.responses import FastJSONResponse
+from service.rest.routers import chat, health, metrics, rag
+from service.telemetry.profiling import install_profiler
+from service.telemetry.tracing import install_tracing
+
 
-from service.auth.api_key import api_key_auth
-from service.rest.routers import chat, health, rag
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Load API keys before the first request instead of on it.
+    await asyncio.to_thread(key_cache.refresh)
+    yield
 
 
-app = FastAPI(title="zennlogic_ai_service", version="0.1.0")
+app = FastAPI(
+    title="zennlogic_ai_service",
+    version="0.1.0",
+    lifespan=_lifespan,
+    default_response_class=FastJSONResponse,
+)
+install_profiler(app)
+install_tracing(app)
+if settings.gzip_min_bytes > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_bytes)
 
 app.include_router(health.router)
-app.include_router(chat.router, prefix="/chat", dependencies=[Depends(api_key_auth)])
-app.include_router(rag.router, prefix="/rag", dependencies=[Depends(api_key_auth)])
+app.include_router(metrics.router)
+app.include_router(
+    chat.router,
+    prefix="/chat",
+    dependencies=[Depends(api_key_auth), Depends(admission("chat"))],
+)
+app.include_router(
+    rag.router,
+    prefix="/rag",
+    dependencies=[Depends(api_key_auth), Depends(admission("rag"))],
+)
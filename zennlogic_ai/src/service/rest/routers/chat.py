@@ -2,9 +2,11 @@
 
 from typing import Any
 
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Header
+from fastapi.responses import StreamingResponse
 
 from service.config import settings
+from service.llm.cache import parse_cache_control
 from service.llm.chains import LLMChain
 
 
@@ -16,10 +18,22 @@ DEFAULT_BODY = Body(...)
 
 
 @router.post("/", summary="Chat", description="Chat with LLM.")
-def chat(
+async def chat(
     messages: list[dict[str, Any]] = DEFAULT_BODY,
     model: str | None = None,
     max_tokens: int = settings.max_tokens,
+    stream: bool = False,
+    cache_control: str | None = Header(None),
 ) -> Any:
-    """Chat with LLM."""
-    return chain.chat(messages, model, max_tokens)
+    """Chat with LLM.
+
+    Identical requests are answered from the response cache; send
+    ``Cache-Control: no-cache`` for a fresh response or ``no-store`` to bypass
+    the cache. With ``stream=true`` the response is streamed as plain text.
+    """
+    mode = parse_cache_control(cache_control)
+    if stream:
+        return StreamingResponse(
+            chain.chat_stream(messages, model, max_tokens, mode), media_type="text/plain"
+        )
+    return await chain.chat(messages, model, max_tokens, mode)
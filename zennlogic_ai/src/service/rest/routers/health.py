@@ -2,8 +2,10 @@
 
 from fastapi import APIRouter
 
+from service.telemetry.profiling import ProfiledRoute
 
-router = APIRouter()
+
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/healthz", summary="Health check", description="Returns service health status.")
@@ -0,0 +1,21 @@
+"""Prometheus metrics endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from service.telemetry.metrics import CONTENT_TYPE, render_metrics
+from service.telemetry.profiling import ProfiledRoute
+
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get(
+    "/metrics",
+    summary="Metrics",
+    description="Prometheus text exposition of service metrics.",
+    response_class=PlainTextResponse,
+)
+def metrics() -> PlainTextResponse:
+    """Return all registered metrics in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,33 +1,170 @@
 """RAG endpoints: ingest, search, answer."""
 
+from collections.abc import Iterator
+import contextlib
+import os
+import tempfile
 from typing import Any
 
-from fastapi import APIRouter, Body, Query
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status
 
 from service.config import settings
-from service.rag.models import Document
+from service.rag.jobs import IngestJob, IngestQueue, IngestQueueFullError
+from service.rag.models import AnswerResponse, AnswerSource, Document, SearchHit, SearchResponse
 from service.rag.pipeline import RAGPipeline
+from service.rag.sources import (
+    ARROW_MEDIA_TYPES,
+    NDJSON_MEDIA_TYPES,
+    batched,
+    parse_arrow,
+    parse_ndjson,
+)
+from service.rest.responses import model_response, parse_fields
+from service.telemetry.metrics import REQUESTS_SHED
+from service.telemetry.profiling import ProfiledRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+INGEST_SHED = REQUESTS_SHED.labels("rag", "ingest_queue_full")
 pipeline = RAGPipeline()
+ingest_queue = IngestQueue(
+    pipeline.ingest_batch,
+    pipeline.persist,
+    batch_size=settings.ingest_batch_size,
+    cpu_share=settings.ingest_cpu_share,
+    nice=settings.ingest_nice,
+    max_jobs=settings.ingest_max_jobs,
+    max_queued=settings.ingest_max_queued,
+)
 
 # Module-level singleton for Body default
 DEFAULT_BODY = Body(...)
+FIELDS_QUERY = Query(
+    None,
+    description="Comma-separated fields to return per result/source, e.g. `id,score`.",
+    examples=["id,score"],
+)
+
+
+def _queue_full(exc: IngestQueueFullError) -> HTTPException:
+    INGEST_SHED.inc()
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": str(settings.inflight_retry_after_s)},
+    )
 
 
 @router.post(
-    "/ingest", summary="Ingest documents", description="Add docs to vector store and persist."
+    "/ingest",
+    summary="Ingest documents",
+    description="Queue docs to be embedded, indexed and persisted in the background.",
+    status_code=status.HTTP_202_ACCEPTED,
 )
 def ingest_docs(docs: list[Document] = DEFAULT_BODY) -> Any:
-    """Ingest documents into vector store."""
+    """Queue documents for background ingestion and return the job id."""
+    try:
+        job = ingest_queue.submit(docs)
+    except IngestQueueFullError as exc:
+        raise _queue_full(exc) from exc
+    return {"job_id": job.id, "status": job.status, "total": job.total}
+
+
+@router.post(
+    "/ingest/stream",
+    summary="Stream-ingest documents",
+    description="Queue an NDJSON or Arrow IPC stream body for background ingestion.",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def ingest_stream(request: Request) -> Any:
+    """Spool a streamed body to disk and ingest it incrementally.
 
+    The body is written to a temporary file as it arrives and parsed by the
+    ingest worker one batch at a time, so neither the upload nor the job
+    holds the whole corpus in memory. Malformed records are counted as
+    failures on the job instead of rejecting the upload.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in NDJSON_MEDIA_TYPES | ARROW_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected application/x-ndjson or application/vnd.apache.arrow.stream",
+        )
+    if ingest_queue.full():  # don't spool an upload that would be rejected
+        raise _queue_full(IngestQueueFullError("Too many ingest jobs queued"))
+    with tempfile.NamedTemporaryFile(prefix="ingest-", delete=False) as spool:
+        try:
+            async for chunk in request.stream():
+                spool.write(chunk)
+        except BaseException:
+            os.unlink(spool.name)
+            raise
+    arrow = media_type in ARROW_MEDIA_TYPES
 
-@router.get("/search", summary="Vector search", description="Search vector store.")
-def search(q: str = Query(...), k: int = Query(settings.top_k)) -> Any:
-    """Search vector store for query."""
+    def open_batches(job: IngestJob) -> Iterator[list[Document]]:
+        with open(spool.name, "rb") as fh:
+            docs = (
+                parse_arrow(fh, job.record_error) if arrow else parse_ndjson(fh, job.record_error)
+            )
+            yield from batched(docs, ingest_queue.batch_size)
 
+    def cleanup() -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(spool.name)
 
-@router.post("/answer", summary="RAG answer", description="Answer via retriever + LLM.")
-def answer(q: str = DEFAULT_BODY) -> Any:
-    """Answer query using RAG pipeline."""
+    try:
+        job = ingest_queue.submit_source(open_batches, cleanup=cleanup)
+    except IngestQueueFullError as exc:
+        raise _queue_full(exc) from exc
+    return {"job_id": job.id, "status": job.status, "total": job.total}
+
+
+@router.get("/ingest/{job_id}", summary="Ingest job status", description="Progress of a job.")
+def ingest_status(job_id: str) -> Any:
+    """Return progress, throughput and errors of an ingest job."""
+    job = ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown ingest job")
+    return job.to_dict()
+
+
+@router.get(
+    "/search",
+    summary="Vector search",
+    description="Search vector store.",
+    response_model=SearchResponse,
+    response_model_exclude_none=True,
+)
+def search(
+    q: str = Query(...),
+    k: int = Query(settings.top_k),
+    fields: str | None = FIELDS_QUERY,
+    mmr_lambda: float | None = Query(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Diversify results with MMR: 1 = pure relevance, lower = more diverse.",
+    ),
+) -> Response:
+    """Search vector store for query; ``fields`` trims each result."""
+    include = parse_fields(fields, SearchHit)
+    response = SearchResponse(results=pipeline.search(q, k, mmr_lambda))
+    return model_response(response, include and {"results": {"__all__": include}})
+
+
+@router.post(
+    "/answer",
+    summary="RAG answer",
+    description="Answer via retriever + LLM.",
+    response_model=AnswerResponse,
+    response_model_exclude_none=True,
+)
+def answer(q: str = DEFAULT_BODY, fields: str | None = FIELDS_QUERY) -> Response:
+    """Answer query using RAG pipeline; ``fields`` trims each source."""
+    include = parse_fields(fields, AnswerSource)
+    response = pipeline.answer(q)
+    if include is None:
+        return model_response(response)
+    return model_response(
+        response, {"answer": True, "usage": True, "sources": {"__all__": include}}
+    )
@@ -0,0 +1,108 @@
+"""Single-flight request coalescing.
+
+Concurrent calls with the same key share one in-progress computation: the
+first caller (the leader) runs it and every caller that arrives before it
+finishes waits for and receives the same result or exception. Nothing is
+kept once the call completes, so this is not a cache. It only collapses
+duplicates that overlap in time, which is exactly when a cold cache does not
+help. Results are shared between callers and must be treated as read-only.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+import functools
+import threading
+from typing import Any, TypeVar
+
+from service.telemetry.metrics import COALESCED_REQUESTS
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls made from threads."""
+
+    def __init__(self, name: str) -> None:
+        """Create a group; ``name`` labels the coalesced-requests counter."""
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._coalesced = COALESCED_REQUESTS.labels(name)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Return ``fn()``, sharing the call with concurrent callers of ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self._coalesced.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            result: T = call.result
+            return result
+        try:
+            call.result = fn()
+            return call.result  # type: ignore[no-any-return]
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+@dataclass
+class _Flight:
+    task: "asyncio.Future[Any]"
+    waiters: int = 0
+
+
+class AsyncSingleFlight:
+    """Coalesces identical concurrent awaits on one event loop.
+
+    The shared computation runs as its own task, so a cancelled caller never
+    cancels it for the others; it is cancelled only once every caller has
+    gone away.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Create a group; ``name`` labels the coalesced-requests counter."""
+        self._flights: dict[Hashable, _Flight] = {}
+        self._coalesced = COALESCED_REQUESTS.labels(name)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return ``await fn()``, sharing the call with concurrent callers of ``key``."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(functools.partial(self._done, key, flight))
+        else:
+            self._coalesced.inc()
+        flight.waiters += 1
+        try:
+            result: T = await asyncio.shield(flight.task)
+            return result
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _done(self, key: Hashable, flight: _Flight, _: "asyncio.Future[Any]") -> None:
+        self._forget(key, flight)
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
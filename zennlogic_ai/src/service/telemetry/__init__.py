@@ -0,0 +1 @@
+"""Telemetry: metrics and request instrumentation."""
@@ -0,0 +1,400 @@
+"""In-process metrics with Prometheus text exposition.
+
+A deliberately small, dependency-free subset of the Prometheus client model
+(counters, gauges and histograms with fixed label names). A histogram
+observation is a thread-local lookup, a ``bisect`` and two additions with no
+lock, which keeps a timer around a hot path in the sub-microsecond range on
+typical server CPUs.
+Bind label values once at import time and reuse the child, e.g.::
+
+    EMBED_TIMER = STAGE_SECONDS.labels("embed")
+
+    with EMBED_TIMER.time():
+        ...
+"""
+
+from bisect import bisect_left
+from collections.abc import Iterator
+import math
+import threading
+import time
+from types import TracebackType
+
+
+_perf_counter = time.perf_counter
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Shared label handling for all metric types."""
+
+    kind = "untyped"
+    suffix = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: "Registry | None" = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _child(self, values: tuple[str, ...]) -> object:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self) -> object:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:  # pragma: no cover - overridden
+        """Yield exposition lines for every labelled child."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric family in Prometheus text format."""
+        name = self.name + self.suffix
+        header = f"# HELP {name} {self.documentation}\n# TYPE {name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class CounterChild:
+    """A single labelled counter series."""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        """Initialize the series at zero."""
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the counter by ``amount`` (must be non-negative)."""
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+    suffix = "_total"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def labels(self, *values: str) -> CounterChild:
+        """Return the series for the given label values."""
+        return self._child(values)  # type: ignore[return-value]
+
+    def samples(self) -> Iterator[str]:
+        """Yield one line per labelled series."""
+        for values, child in list(self._children.items()):
+            assert isinstance(child, CounterChild)
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{self.suffix}{labels} {_format_value(child.value)}"
+
+
+class GaugeChild(CounterChild):
+    """A single labelled gauge series."""
+
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the gauge by ``amount``."""
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        """Set the gauge to ``value``."""
+        self.value = value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (e.g. in-flight requests)."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def labels(self, *values: str) -> GaugeChild:
+        """Return the series for the given label values."""
+        return self._child(values)  # type: ignore[return-value]
+
+    def samples(self) -> Iterator[str]:
+        """Yield one line per labelled series."""
+        for values, child in list(self._children.items()):
+            assert isinstance(child, GaugeChild)
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class Timer:
+    """Context manager that observes elapsed seconds into a histogram series.
+
+    Each thread reuses one timer per series (see :meth:`HistogramChild.time`)
+    bound directly to that thread's shard, so timing a block allocates
+    nothing and takes no lock.
+    """
+
+    __slots__ = ("_bounds", "_shard", "_start")
+
+    def __init__(self, bounds: tuple[float, ...], shard: list[float]) -> None:
+        """Bind the timer to one thread's shard of a histogram series."""
+        self._bounds = bounds
+        self._shard = shard
+        self._start = 0.0
+
+    def __enter__(self) -> "Timer":
+        """Start timing."""
+        self._start = _perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Stop timing and record the observation (also on error)."""
+        elapsed = _perf_counter() - self._start
+        self._start = 0.0
+        shard = self._shard
+        shard[bisect_left(self._bounds, elapsed)] += 1
+        shard[-1] += elapsed
+
+
+class HistogramChild:
+    """A single labelled histogram series.
+
+    Observations go to a per-thread shard (``[bucket counts..., sum]``) so the
+    hot path takes no lock; shards are summed at scrape time.
+    """
+
+    __slots__ = ("_local", "_lock", "_shards", "bounds")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """Initialize empty buckets for ``bounds`` (plus the implicit +Inf)."""
+        self.bounds = bounds
+        self._local = threading.local()
+        self._shards: list[list[float]] = []
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> list[float]:
+        shard = [0.0] * (len(self.bounds) + 2)
+        self._local.shard = shard
+        self._local.timer = Timer(self.bounds, shard)
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Return merged per-bucket counts (non-cumulative) and the sum."""
+        with self._lock:
+            shards = list(self._shards)
+        merged = [0.0] * (len(self.bounds) + 2)
+        for shard in shards:
+            for i, v in enumerate(shard):
+                merged[i] += v
+        return [int(n) for n in merged[:-1]], merged[-1]
+
+    def time(self) -> Timer:
+        """Return a context manager timing its block into this series."""
+        try:
+            timer: Timer = self._local.timer
+        except AttributeError:
+            self._new_shard()
+            timer = self._local.timer
+        if timer._start:
+            # Nested block on the same series and thread: needs its own timer.
+            return Timer(self.bounds, self._local.shard)
+        return timer
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (seconds by convention)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: "Registry | None" = None,
+    ) -> None:
+        """Create the histogram with sorted finite bucket bounds."""
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def labels(self, *values: str) -> HistogramChild:
+        """Return the series for the given label values."""
+        return self._child(values)  # type: ignore[return-value]
+
+    def samples(self) -> Iterator[str]:
+        """Yield bucket, sum and count lines per labelled series."""
+        for values, child in list(self._children.items()):
+            assert isinstance(child, HistogramChild)
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                labels = _format_labels(self.labelnames, values, le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Collection of metric families rendered together on ``/metrics``."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        """Add a metric family; names must be unique."""
+        if metric.name in self._metrics:
+            raise ValueError(f"duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render all registered families in Prometheus text format."""
+        return "".join(m.render() for m in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+
+def render_metrics() -> str:
+    """Render the default registry."""
+    return REGISTRY.render()
+
+
+# -- Service metrics -----------------------------------------------------------------------------
+
+STAGE_SECONDS = Histogram(
+    "zennlogic_stage_duration_seconds",
+    "Latency of request pipeline stages (embed, search, doc_fetch, rerank, ...).",
+    ("stage",),
+)
+LLM_SECONDS = Histogram(
+    "zennlogic_llm_duration_seconds",
+    "LLM provider latency; phase=ttft is time to first response byte.",
+    ("provider", "phase"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_TOKENS = Counter(
+    "zennlogic_llm_tokens",
+    "Tokens reported by LLM providers, by kind (input/output).",
+    ("provider", "kind"),
+)
+MCP_TOOL_SECONDS = Histogram(
+    "zennlogic_mcp_tool_duration_seconds",
+    "MCP tool dispatch latency by tool and outcome.",
+    ("tool", "status"),
+)
+CACHE_LOOKUPS = Counter(
+    "zennlogic_cache_lookups",
+    "Cache lookups by cache name and result (hit/miss); ratio = hit / (hit + miss).",
+    ("cache", "result"),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "zennlogic_requests_in_flight",
+    "Requests currently admitted, by route class.",
+    ("route_class",),
+)
+REQUESTS_SHED = Counter(
+    "zennlogic_requests_shed",
+    "Requests rejected before running, by route class and reason "
+    "(rate_limited/overloaded/ingest_queue_full).",
+    ("route_class", "reason"),
+)
+COALESCED_REQUESTS = Counter(
+    "zennlogic_coalesced_requests",
+    "Calls that joined an identical in-flight computation instead of running their own.",
+    ("operation",),
+)
+LLM_ATTEMPTS = Counter(
+    "zennlogic_llm_attempts",
+    "Routed LLM attempts by provider, role (primary/hedge/failover) and outcome.",
+    ("provider", "role", "outcome"),
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "zennlogic_llm_circuit_open",
+    "1 while a provider's circuit breaker is open.",
+    ("provider",),
+)
+PROMPT_TOKENS = Histogram(
+    "zennlogic_prompt_tokens",
+    "Tokens per assembled RAG prompt; kind=input is the whole prompt, context the passages.",
+    ("kind",),
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+GRAPH_NODE_SECONDS = Histogram(
+    "zennlogic_graph_node_duration_seconds",
+    "Run time of LLM graph nodes by graph, node and outcome (ok/timeout/error).",
+    ("graph", "node", "status"),
+)
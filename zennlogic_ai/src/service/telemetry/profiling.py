@@ -0,0 +1,305 @@
+"""Opt-in sampling profiler for production requests.
+
+``install_profiler`` adds :class:`ProfilingMiddleware` to an app only when
+``PROFILE_SAMPLE_RATE`` or ``PROFILE_SLOW_MS`` is set, so a disabled profiler
+adds nothing to the request path. When enabled, a request is profiled if it is
+randomly sampled (from its start) or once it has been running longer than the
+slow threshold (from that point on). One sampler thread shared by all
+requests samples only the threads serving a profiled request: the event loop
+while the request's task runs on it and, through :class:`ProfiledRoute`, the
+threadpool worker running a sync endpoint. Profiles are written as collapsed stacks
+(``frame;frame;frame count``), the input format of ``flamegraph.pl``,
+speedscope and similar tools, and the directory is pruned to the newest
+``PROFILE_MAX_FILES`` files.
+"""
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import inspect
+import os
+from pathlib import Path
+import random
+import re
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+from structlog import get_logger
+
+from service.config import settings
+
+
+logger = get_logger()
+
+# Leaf frames of threads that are parked rather than doing work; sampling
+# them only adds noise (idle threadpool workers, the event loop's selector).
+_IDLE_LEAVES = frozenset(
+    {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+)
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _frame_label(frame: FrameType) -> tuple[str, str]:
+    code = frame.f_code
+    return os.path.basename(code.co_filename), code.co_name
+
+
+def collapse_stack(frame: FrameType | None, root: str) -> str | None:
+    """Return a ``root;outer;...;leaf`` line for ``frame`` or None if idle."""
+    labels: list[str] = []
+    leaf = True
+    while frame is not None:
+        filename, func = _frame_label(frame)
+        if leaf and (filename, func) in _IDLE_LEAVES:
+            return None
+        leaf = False
+        labels.append(f"{func} ({filename})")
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+class Profile:
+    """Stacks sampled from the threads serving one request.
+
+    The event-loop thread is sampled only while the request's own task is the
+    one running on it, so concurrent async requests do not mix their stacks.
+    Worker threads are added with :meth:`thread` while they run the request's
+    blocking work (see :class:`ProfiledRoute`).
+    """
+
+    __slots__ = ("loop", "loop_ident", "path", "stacks", "start_at", "task", "threads")
+
+    def __init__(self, start_at: float) -> None:
+        """Watch the calling event-loop task from monotonic time ``start_at`` on."""
+        current = threading.current_thread()
+        assert current.ident is not None
+        self.start_at = start_at
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_ident = current.ident
+        # Thread ident -> name (the root frame of its collapsed stacks).
+        self.threads: dict[int, str] = {current.ident: current.name}
+        self.path: Path | None = None
+        self.stacks: Counter[str] = Counter()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """Attribute the calling thread's stacks to this profile within the block."""
+        current = threading.current_thread()
+        assert current.ident is not None
+        self.threads[current.ident] = current.name
+        try:
+            yield
+        finally:
+            self.threads.pop(current.ident, None)
+
+    def serving(self, ident: int) -> bool:
+        """Whether thread ``ident`` is currently doing this request's work."""
+        if ident != self.loop_ident:
+            return ident in self.threads
+        return asyncio.current_task(self.loop) is self.task
+
+
+# The profile of the request being served, carried into threadpool calls.
+_PROFILE: ContextVar[Profile | None] = ContextVar("profile", default=None)
+
+
+class StackSampler:
+    """Samples the serving threads of profiled requests on one shared thread.
+
+    Only the threads registered with a :class:`Profile` are walked, so a busy
+    process with many threads costs no more per tick than the requests being
+    profiled. The sampler thread also writes finished profiles and prunes old
+    files, so requests never block on disk IO. It starts with the first
+    profiled request and parks while nothing is due for sampling.
+    """
+
+    def __init__(self, interval_s: float, out_dir: Path, max_files: int) -> None:
+        """Create an idle sampler; the thread starts on the first :meth:`watch`."""
+        self.interval_s = interval_s
+        self.out_dir = out_dir
+        self.max_files = max_files
+        self._profiles: list[Profile] = []
+        self._finished: list[Profile] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, delay_s: float = 0.0) -> Profile:
+        """Sample the calling request once ``delay_s`` seconds have passed."""
+        profile = Profile(time.monotonic() + delay_s)
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return profile
+
+    def finish(self, profile: Profile, filename: str | None) -> None:
+        """Stop sampling ``profile``; write it as ``filename`` unless it is None."""
+        with self._lock:
+            self._profiles.remove(profile)
+            if filename:
+                profile.path = self.out_dir / filename
+                self._finished.append(profile)
+        if filename:
+            self._wake.set()
+
+    def _sample(self, profiles: list[Profile]) -> None:
+        frames = sys._current_frames()
+        lines: dict[int, str | None] = {}
+        for profile in profiles:
+            for ident, root in list(profile.threads.items()):
+                if not profile.serving(ident):
+                    continue
+                if ident not in lines:
+                    frame = frames.get(ident)
+                    lines[ident] = collapse_stack(frame, root) if frame else None
+                line = lines[ident]
+                if line is not None:
+                    profile.stacks[line] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                finished, self._finished = self._finished, []
+            for profile in finished:
+                if profile.path is not None and profile.stacks:
+                    self._write(profile.path, profile.stacks)
+            now = time.monotonic()
+            due = [p for p in profiles if p.start_at <= now]
+            if due:
+                self._sample(due)
+                time.sleep(self.interval_s)
+                continue
+            # Park until a request becomes slow enough or a new one arrives.
+            timeout = min((p.start_at - now for p in profiles), default=None)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _write(self, path: Path, stacks: Counter[str]) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("".join(f"{s} {n}\n" for s, n in stacks.most_common()))
+            profiles = sorted(path.parent.glob("*.folded"))
+            for old in profiles[: max(0, len(profiles) - self.max_files)]:
+                old.unlink(missing_ok=True)
+            logger.info("profiler.written", path=str(path), samples=stacks.total())
+        except OSError as exc:
+            logger.warning("profiler.write_failed", path=str(path), error=str(exc))
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles sampled or slow HTTP requests."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 0.0,
+        slow_ms: int = 0,
+        interval_ms: float = 5.0,
+        out_dir: str = ".data/profiles",
+        max_files: int = 200,
+    ) -> None:
+        """Wrap ``app``; see module docstring for the sampling policy."""
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_s = slow_ms / 1000 if slow_ms > 0 else None
+        self.sampler = StackSampler(interval_ms / 1000, Path(out_dir), max_files)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the request, sampling stacks if it is selected for profiling."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = random.random() < self.sample_rate
+        if sampled:
+            profile = self.sampler.watch()
+        elif self.slow_s is not None:
+            profile = self.sampler.watch(self.slow_s)
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = _PROFILE.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _PROFILE.reset(token)
+            elapsed = time.perf_counter() - start
+            filename = None
+            if sampled or (self.slow_s is not None and elapsed >= self.slow_s):
+                slug = _SLUG.sub("_", scope.get("path", "")).strip("_") or "root"
+                reason = "sampled" if sampled else "slow"
+                filename = (
+                    f"{time.time_ns()}-{scope.get('method', 'GET')}-{slug}-"
+                    f"{int(elapsed * 1000)}ms-{reason}.folded"
+                )
+            self.sampler.finish(profile, filename)
+
+
+def _in_request_profile(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(endpoint)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        profile = _PROFILE.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        with profile.thread():
+            return endpoint(*args, **kwargs)
+
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """Route that attributes a sync endpoint's worker thread to the request profile.
+
+    Starlette runs ``def`` endpoints in its threadpool, away from the event
+    loop the middleware runs on; the request's context (and so its profile)
+    is carried into that thread and the endpoint registers it while it runs.
+    Use it as ``APIRouter(route_class=ProfiledRoute)``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        """Wrap ``endpoint`` unless it is a coroutine function."""
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _in_request_profile(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def install_profiler(app: FastAPI) -> None:
+    """Add :class:`ProfilingMiddleware` to ``app`` when profiling is configured.
+
+    Routes declared on ``app`` afterwards use :class:`ProfiledRoute`; included
+    routers declare it themselves.
+    """
+    if settings.profile_sample_rate <= 0 and settings.profile_slow_ms <= 0:
+        return
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=settings.profile_sample_rate,
+        slow_ms=settings.profile_slow_ms,
+        interval_ms=settings.profile_interval_ms,
+        out_dir=settings.profile_dir,
+        max_files=settings.profile_max_files,
+    )
+    logger.info(
+        "profiler.enabled",
+        sample_rate=settings.profile_sample_rate,
+        slow_ms=settings.profile_slow_ms,
+        out_dir=settings.profile_dir,
+    )
@@ -0,0 +1,519 @@
+"""Dependency-free distributed tracing with OpenTelemetry-compatible export.
+
+Spans are opened with :func:`span` as context managers. The active span lives
+in a :class:`~contextvars.ContextVar`, so child spans find their parent
+across ``await``, ``asyncio`` tasks and ``asyncio.to_thread``. Work handed
+to a plain thread pool keeps its parent when it is submitted through
+``contextvars.copy_context().run``. Outbound ``httpx`` calls carry the W3C
+``traceparent`` header when a client is built with :data:`HTTPX_HOOKS` or
+:data:`ASYNC_HTTPX_HOOKS`. :class:`TracingMiddleware` continues an inbound
+``traceparent`` and echoes the trace back in the response header.
+
+Sampling is decided once per trace, at its local root:
+
+* head: a trace is kept with probability ``TRACE_SAMPLE_RATE``. An inbound
+  ``traceparent`` overrides this with its own sampled flag.
+* tail: with ``TRACE_SLOW_MS`` or ``TRACE_KEEP_ERRORS`` set, traces that
+  head sampling drops are still recorded in memory and exported if the
+  root ran for at least ``TRACE_SLOW_MS`` or any span failed.
+
+A trace that head sampling drops, with tail sampling off, records nothing.
+Each of its spans costs one context-variable lookup and returns a shared
+no-op span. Finished traces are queued to a background thread. That thread
+writes OTLP/JSON, either as lines in ``TRACE_FILE`` (readable by the
+OpenTelemetry collector's ``otlpjsonfile`` receiver) or as a POST to a
+collector's ``TRACE_OTLP_ENDPOINT``. If the queue is full, traces are
+dropped rather than blocking requests.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import queue
+import random
+import threading
+import time
+from types import TracebackType
+from typing import Any, Literal
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from structlog import get_logger
+
+from service.config import settings
+
+
+logger = get_logger()
+
+SpanKind = Literal["internal", "server", "client"]
+
+TRACEPARENT = "traceparent"
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+@dataclass(frozen=True, slots=True)
+class SpanContext:
+    """Identity of a span as carried in ``traceparent``."""
+
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse_traceparent(header: str | None) -> SpanContext | None:
+    """Parse a W3C ``traceparent`` header; None if absent or malformed."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        if not int(parts[1], 16) or not int(parts[2], 16):
+            return None  # all-zero ids are invalid
+    except ValueError:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower(), bool(flags & 1))
+
+
+def format_traceparent(context: SpanContext) -> str:
+    """Render ``context`` as a version-00 ``traceparent`` header."""
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+class _NoopSpan:
+    """Span stand-in that records nothing."""
+
+    recording = False
+    context: SpanContext | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Ignore the attribute."""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+_CURRENT: ContextVar["Span | _DroppedSpan | None"] = ContextVar("zennlogic_span", default=None)
+
+
+class _DroppedSpan(_NoopSpan):
+    """Root of an unsampled trace.
+
+    It records nothing but marks the context, so descendants are no-ops too
+    and ``traceparent`` still propagates (with the sampled flag off).
+    """
+
+    def __init__(self, context: SpanContext) -> None:
+        self.context = context
+        self._token: Token[Span | _DroppedSpan | None] | None = None
+
+    def __enter__(self) -> "_DroppedSpan":
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._token is not None:
+            _CURRENT.reset(self._token)
+
+
+class _Trace:
+    """Spans recorded so far for one trace in this process."""
+
+    __slots__ = ("error", "sampled", "spans", "tracer")
+
+    def __init__(self, tracer: "Tracer", sampled: bool) -> None:
+        self.tracer = tracer
+        self.sampled = sampled
+        self.error = False
+        self.spans: list[Span] = []
+
+
+class Span:
+    """A timed, attributed operation within a trace."""
+
+    __slots__ = (
+        "_root",
+        "_token",
+        "_trace",
+        "attributes",
+        "context",
+        "end_ns",
+        "error",
+        "kind",
+        "name",
+        "parent_id",
+        "start_ns",
+    )
+    recording = True
+
+    def __init__(
+        self,
+        name: str,
+        trace: _Trace,
+        context: SpanContext,
+        parent_id: str | None,
+        attributes: Mapping[str, Any] | None,
+        kind: SpanKind,
+        root: bool,
+    ) -> None:
+        """Create an unstarted span; use it as a context manager."""
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: str | None = None
+        self._trace = trace
+        self._root = root
+        self._token: Token[Span | _DroppedSpan | None] | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach ``key=value`` to the span."""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        """Start the span and make it current."""
+        self.start_ns = time.time_ns()
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """End the span, recording an exception as its error status."""
+        self.end_ns = time.time_ns()
+        if isinstance(exc, Exception):
+            self.error = f"{type(exc).__name__}: {exc}"
+            self._trace.error = True
+        if self._token is not None:
+            _CURRENT.reset(self._token)
+        trace = self._trace
+        trace.spans.append(self)
+        if self._root:
+            trace.tracer.finish(trace, self)
+
+
+class Tracer:
+    """Creates spans and applies the head/tail sampling policy."""
+
+    def __init__(
+        self,
+        exporter: "SpanExporter | None" = None,
+        sample_rate: float = 0.0,
+        slow_ms: int = 0,
+        keep_errors: bool = False,
+    ) -> None:
+        """Tracing is off (every span a no-op) without an exporter or any sampling."""
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ns = slow_ms * 1_000_000 if slow_ms > 0 else None
+        self.keep_errors = keep_errors
+        self.tail = self.slow_ns is not None or keep_errors
+        self.enabled = exporter is not None and (sample_rate > 0 or self.tail)
+
+    def span(
+        self,
+        name: str,
+        attributes: Mapping[str, Any] | None = None,
+        kind: SpanKind = "internal",
+        parent: SpanContext | None = None,
+    ) -> "Span | _NoopSpan":
+        """Return a span (a context manager) under the current or given ``parent``."""
+        current = _CURRENT.get()
+        if parent is None and current is not None:
+            if isinstance(current, Span):
+                # Children inherit the head decision, so outbound calls carry
+                # the same sampled flag as the trace this process may drop.
+                context = SpanContext(
+                    current.context.trace_id, _new_id(64), current.context.sampled
+                )
+                return Span(
+                    name, current._trace, context, current.context.span_id, attributes, kind, False
+                )
+            return _NOOP  # inside a dropped trace
+        if not self.enabled:
+            return _NOOP
+        sampled = parent.sampled if parent is not None else random.random() < self.sample_rate
+        trace_id = parent.trace_id if parent is not None else _new_id(128)
+        context = SpanContext(trace_id, _new_id(64), sampled)
+        if not sampled and not self.tail:
+            return _DroppedSpan(context)
+        parent_id = parent.span_id if parent is not None else None
+        return Span(name, _Trace(self, sampled), context, parent_id, attributes, kind, True)
+
+    def finish(self, trace: _Trace, root: Span) -> None:
+        """Export ``trace`` when its local root ends, if the sampling policy keeps it."""
+        keep = (
+            trace.sampled
+            or (self.keep_errors and trace.error)
+            or (self.slow_ns is not None and root.end_ns - root.start_ns >= self.slow_ns)
+        )
+        if keep and self.exporter is not None:
+            self.exporter.export(trace.spans)
+
+
+def _attribute_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_span(span: Span) -> dict[str, Any]:
+    """Encode ``span`` as an OTLP/JSON ``Span`` object."""
+    encoded: dict[str, Any] = {
+        "traceId": span.context.trace_id,
+        "spanId": span.context.span_id,
+        "name": span.name,
+        "kind": _KINDS[span.kind],
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            {"key": key, "value": _attribute_value(value)} for key, value in span.attributes.items()
+        ],
+        "status": {"code": 2, "message": span.error} if span.error else {},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+class SpanExporter:
+    """Queues finished traces and writes them in batches on a background thread."""
+
+    def __init__(
+        self,
+        service_name: str = "zennlogic_ai",
+        max_queue: int = 1024,
+        batch_size: int = 512,
+        flush_interval_s: float = 1.0,
+    ) -> None:
+        """Create an idle exporter; the worker starts with the first trace."""
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.dropped = 0
+        self._queue: queue.Queue[list[Span]] = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    def export(self, spans: list[Span]) -> None:
+        """Queue one trace's spans without blocking (dropped if the queue is full)."""
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="tracing", daemon=True)
+                    self._worker.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Block until every queued trace has been written (tests and shutdown)."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            traces = 1
+            spans = list(batch)
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(spans) < self.batch_size:
+                try:
+                    spans.extend(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    traces += 1
+                except queue.Empty:
+                    break
+            try:
+                self.write(self.request_body(spans))
+            except Exception as exc:  # never let export failures kill the worker
+                logger.warning("tracing.export_failed", spans=len(spans), error=str(exc))
+            finally:
+                for _ in range(traces):
+                    self._queue.task_done()
+
+    def request_body(self, spans: list[Span]) -> dict[str, Any]:
+        """Wrap ``spans`` in an OTLP/JSON ``ExportTraceServiceRequest``."""
+        resource = {"key": "service.name", "value": {"stringValue": self.service_name}}
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [resource]},
+                    "scopeSpans": [
+                        {"scope": {"name": "service"}, "spans": [otlp_span(s) for s in spans]}
+                    ],
+                }
+            ]
+        }
+
+    def write(self, body: dict[str, Any]) -> None:
+        """Deliver one encoded batch."""
+        raise NotImplementedError()
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends one OTLP/JSON request per line to a file."""
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        """Write to ``path`` (parent directories are created)."""
+        super().__init__(**kwargs)
+        self.path = Path(path)
+
+    def write(self, body: dict[str, Any]) -> None:
+        """Append ``body`` as a JSON line."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(body, separators=(",", ":")) + "\n")
+
+
+class OTLPSpanExporter(SpanExporter):
+    """POSTs OTLP/JSON to a collector's ``/v1/traces`` endpoint."""
+
+    def __init__(self, endpoint: str, timeout_s: float = 5.0, **kwargs: Any) -> None:
+        """Send batches to ``endpoint`` (e.g. ``http://localhost:4318/v1/traces``)."""
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.client = httpx.Client(timeout=timeout_s)
+
+    def write(self, body: dict[str, Any]) -> None:
+        """POST ``body``; HTTP errors are logged by the worker."""
+        self.client.post(self.endpoint, json=body).raise_for_status()
+
+
+def _exporter_from_settings() -> SpanExporter | None:
+    if settings.trace_exporter == "file":
+        return FileSpanExporter(settings.trace_file, service_name=settings.trace_service_name)
+    if settings.trace_exporter == "otlp":
+        return OTLPSpanExporter(
+            settings.trace_otlp_endpoint, service_name=settings.trace_service_name
+        )
+    return None
+
+
+tracer = Tracer(
+    _exporter_from_settings(),
+    sample_rate=settings.trace_sample_rate,
+    slow_ms=settings.trace_slow_ms,
+    keep_errors=settings.trace_keep_errors,
+)
+
+
+def span(
+    name: str,
+    attributes: Mapping[str, Any] | None = None,
+    kind: SpanKind = "internal",
+    parent: SpanContext | None = None,
+) -> Span | _NoopSpan:
+    """Open a span on the process tracer.
+
+    Use it as a context manager, e.g. ``with span("embed", {"texts": n}):``.
+    """
+    return tracer.span(name, attributes, kind, parent)
+
+
+def current_context() -> SpanContext | None:
+    """Context of the active span, sampled or not."""
+    current = _CURRENT.get()
+    return None if current is None else current.context
+
+
+def inject(headers: MutableMapping[str, str]) -> None:
+    """Add ``traceparent`` for the active span to outgoing ``headers``."""
+    context = current_context()
+    if context is not None:
+        headers[TRACEPARENT] = format_traceparent(context)
+
+
+def _inject_request(request: httpx.Request) -> None:
+    inject(request.headers)
+
+
+async def _ainject_request(request: httpx.Request) -> None:
+    inject(request.headers)
+
+
+# ``event_hooks`` for httpx clients whose requests should carry the trace.
+HTTPX_HOOKS: dict[str, list[Any]] = {"request": [_inject_request]}
+ASYNC_HTTPX_HOOKS: dict[str, list[Any]] = {"request": [_ainject_request]}
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap ``app``."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the request inside a span continuing any inbound ``traceparent``."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        method = scope.get("method", "GET")
+        attributes = {"http.request.method": method, "url.path": scope.get("path", "")}
+        with span(f"{method} {scope.get('path', '')}", attributes, "server", parent) as current:
+            context = current.context
+            if context is None:  # tracing is off
+                await self.app(scope, receive, send)
+                return
+
+            async def send_traced(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    current.set_attribute("http.response.status_code", message["status"])
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"traceparent", format_traceparent(context).encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_traced)
+            route = getattr(scope.get("route"), "path", None)
+            if route and isinstance(current, Span):
+                current.name = f"{method} {route}"
+                current.set_attribute("http.route", route)
+
+
+def install_tracing(app: Any) -> None:
+    """Add :class:`TracingMiddleware` to ``app`` when tracing is configured."""
+    if not tracer.enabled:
+        return
+    app.add_middleware(TracingMiddleware)
+    logger.info(
+        "tracing.enabled",
+        exporter=settings.trace_exporter,
+        sample_rate=settings.trace_sample_rate,
+        slow_ms=settings.trace_slow_ms,
+        keep_errors=settings.trace_keep_errors,
+    )
@@ -22,8 +22,13 @@ os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
 @pytest.fixture(autouse=True)
 def aws_mocks():
     """Automatically mock AWS for every test."""
+    from service.aws.s3 import reset_s3_client
+
+    # The shared S3 client must be created inside each test's mock context.
+    reset_s3_client()
     with mock_aws():
         yield
+    reset_s3_client()
 
 
 @pytest.fixture
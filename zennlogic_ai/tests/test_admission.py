@@ -0,0 +1,66 @@
+import asyncio
+
+from fastapi import Depends, FastAPI
+import httpx
+
+from service.rest.admission import MemoryRateLimiter, admission
+
+
+HEADERS = {"X-API-Key": "test-api-key"}
+
+
+def test_token_bucket_allows_burst_then_waits():
+    limiter = MemoryRateLimiter(rate=1.0, burst=2)
+
+    async def run() -> list[float]:
+        return [await limiter.acquire("k") for _ in range(3)] + [await limiter.acquire("other")]
+
+    first, second, third, other = asyncio.run(run())
+    assert first == second == 0.0
+    assert 0 < third <= 1.0
+    assert other == 0.0  # buckets are per key
+
+
+def test_rate_limited_request_gets_429():
+    app = FastAPI()
+
+    @app.get("/x", dependencies=[Depends(admission("t429", limiter=MemoryRateLimiter(1.0, 1)))])
+    async def x() -> dict[str, bool]:
+        return {"ok": True}
+
+    async def run() -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            return [await client.get("/x", headers=HEADERS) for _ in range(2)]
+
+    ok, limited = asyncio.run(run())
+    assert ok.status_code == 200
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1"
+
+
+def test_saturated_route_class_sheds_with_503():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/slow", dependencies=[Depends(admission("t503", limit=1))])
+    async def slow() -> dict[str, bool]:
+        await release.wait()
+        return {"ok": True}
+
+    async def run() -> tuple[httpx.Response, httpx.Response, httpx.Response]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            first = asyncio.create_task(client.get("/slow", headers=HEADERS))
+            await asyncio.sleep(0.05)
+            shed = await client.get("/slow", headers=HEADERS)
+            release.set()
+            done = await first
+            again = await client.get("/slow", headers=HEADERS)
+            return done, shed, again
+
+    done, shed, again = asyncio.run(run())
+    assert shed.status_code == 503
+    assert "Retry-After" in shed.headers
+    assert done.status_code == 200
+    assert again.status_code == 200  # slot released after the first request
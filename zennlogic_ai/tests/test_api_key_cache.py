@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import boto3
+
+from service.auth.api_key import APIKeyCache
+from service.aws.ssm import get_api_keys
+from service.config import settings
+
+
+def test_serves_stale_keys_while_refreshing():
+    calls = []
+
+    def loader() -> list[str]:
+        calls.append(1)
+        return ["old"] if len(calls) == 1 else ["old", "new"]
+
+    cache = APIKeyCache(loader, ttl_s=0.05)
+    assert asyncio.run(cache.verify("old"))
+    assert not asyncio.run(cache.verify("new"))
+    assert len(calls) == 1  # cached within TTL
+
+    time.sleep(0.06)
+    assert not asyncio.run(cache.verify("new"))  # stale keys served, refresh started
+    for _ in range(100):
+        if len(calls) == 2:
+            break
+        time.sleep(0.01)
+    time.sleep(0.01)
+    assert asyncio.run(cache.verify("new"))
+    assert asyncio.run(cache.verify("old"))  # both keys valid during rotation
+
+
+def test_failed_refresh_keeps_last_good_keys():
+    keys = ["k1"]
+
+    def loader() -> list[str]:
+        if not keys:
+            raise RuntimeError("ssm unavailable")
+        return list(keys)
+
+    cache = APIKeyCache(loader, ttl_s=0)
+    assert asyncio.run(cache.verify("k1"))
+    keys.clear()
+    assert not cache.refresh()
+    assert asyncio.run(cache.verify("k1"))
+
+
+def test_cold_load_is_shared_and_failures_back_off():
+    calls = []
+
+    def loader() -> list[str]:
+        calls.append(1)
+        time.sleep(0.05)
+        raise RuntimeError("ssm unavailable")
+
+    cache = APIKeyCache(loader, retry_s=0.2)
+
+    async def burst() -> list[bool]:
+        return await asyncio.gather(*(cache.verify("k") for _ in range(20)))
+
+    assert not any(asyncio.run(burst()))
+    assert len(calls) == 1  # one parameter store call for the whole burst
+    assert not asyncio.run(cache.verify("k"))
+    assert len(calls) == 1  # failed recently: fail fast
+    time.sleep(0.2)
+    asyncio.run(cache.verify("k"))
+    assert len(calls) == 2
+
+
+def test_get_api_keys_reads_rotation_list():
+    ssm = boto3.client("ssm", region_name=settings.aws_region)
+    ssm.put_parameter(Name=settings.ssm_api_key_param, Value="a, b", Type="SecureString")
+    assert get_api_keys() == ["a", "b"]
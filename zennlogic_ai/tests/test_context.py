@@ -0,0 +1,67 @@
+from service.rag.context import (
+    PASSAGE_OVERHEAD_TOKENS,
+    Passage,
+    build_messages,
+    context_budget,
+    pack_context,
+)
+from service.rag.tokens import count_tokens, count_tokens_batch
+from service.rag.vector_backends.faiss_backend import FaissBackend
+
+
+def _passage(text: str, score: float) -> Passage:
+    return Passage(text, {"text": text[:10]}, score, count_tokens(text))
+
+
+def test_token_counts_are_positive_and_batched():
+    texts = ["hello world", "tokenization of a longer sentence, with punctuation."]
+    counts = count_tokens_batch(texts)
+    assert counts == [count_tokens(t) for t in texts]
+    assert 0 < counts[0] < counts[1]
+
+
+def test_overlapping_chunks_are_deduplicated():
+    base = "the quick brown fox jumps over the lazy dog near the river bank"
+    passages = [
+        _passage(base, 0.9),
+        _passage(base + " today", 0.8),  # overlapping chunk of the same text
+        _passage("completely different passage about vector search", 0.7),
+    ]
+    packed = pack_context(passages, budget_tokens=1000)
+    assert [p.score for p in packed.passages] == [0.9, 0.7]
+    assert packed.duplicates == 1
+
+
+def test_duplicates_are_not_counted_as_over_budget():
+    base = "the quick brown fox jumps over the lazy dog near the river bank"
+    first = _passage(base, 0.9)
+    repeat = _passage(base + " " + "again " * 50, 0.8)  # overlaps, and would not fit
+    packed = pack_context([first, repeat], budget_tokens=first.tokens + PASSAGE_OVERHEAD_TOKENS)
+    assert packed.passages == [first]
+    assert packed.duplicates == 1
+    assert packed.over_budget == 0
+
+
+def test_packing_respects_budget_and_backfills():
+    big = _passage("word " * 200, 0.9)
+    small = _passage("short relevant fact", 0.5)
+    budget = small.tokens + PASSAGE_OVERHEAD_TOKENS
+    packed = pack_context([big, small], budget_tokens=budget)
+    assert packed.passages == [small]
+    assert packed.over_budget == 1
+    assert packed.tokens <= budget
+
+    messages = build_messages("what?", packed)
+    assert "[1] short relevant fact" in messages[-1]["content"]
+
+
+def test_budget_reserves_output_tokens():
+    assert context_budget("q", window_tokens=1000, max_tokens=256, budget_tokens=5000) < 744
+    assert context_budget("q", window_tokens=100, max_tokens=256, budget_tokens=5000) == 0
+
+
+def test_backend_stores_token_counts():
+    backend = FaissBackend(dim=4)
+    backend.add(["a", "b"], [{}, {}], token_counts=[3, 5])
+    backend.add(["c"], [{}])
+    assert backend.token_counts == [3, 5, -1]
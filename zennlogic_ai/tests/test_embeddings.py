@@ -0,0 +1,152 @@
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import Any
+
+import httpx
+import numpy as np
+import pytest
+
+from service.llm.embedders import OpenAIEmbedder, resolve_dimensions
+
+
+class StubEmbeddings:
+    """Local stand-in for ``POST /embeddings`` that embeds "n" as [n, 1] (other text as [0, 1])."""
+
+    def __init__(self) -> None:
+        self.batches: list[int] = []
+        self.requests = 0
+        self.throttle = 0  # number of upcoming requests answered with 429
+        self.status = 200
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    throttled = stub.throttle > 0
+                    stub.throttle -= throttled
+                time.sleep(0.02)
+                if throttled or stub.status != 200:
+                    self._send(429 if throttled else stub.status, {"error": "slow down"})
+                else:
+                    stub.batches.append(len(payload["input"]))
+                    data = [
+                        {"index": i, "embedding": [float(text) if text.isdigit() else 0.0, 1.0]}
+                        for i, text in enumerate(payload["input"])
+                    ]
+                    self._send(200, {"data": data[::-1]})  # out of order on purpose
+                with stub.lock:
+                    stub.in_flight -= 1
+
+            def _send(self, status: int, body: dict[str, Any]) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stub() -> Iterator[StubEmbeddings]:
+    stub = StubEmbeddings()
+    yield stub
+    stub.server.shutdown()
+
+
+def _embedder(stub: StubEmbeddings, **kwargs: Any) -> OpenAIEmbedder:
+    return OpenAIEmbedder("key", model="stub", base_url=stub.url, backoff_s=0.0, **kwargs)
+
+
+def test_batches_are_concurrent_and_in_input_order(stub: StubEmbeddings):
+    embedder = _embedder(stub, batch_size=3, concurrency=2)
+    vectors = embedder.embed([str(i) for i in range(10)])
+
+    assert vectors.dtype == np.float32
+    assert vectors.shape == (10, 2)
+    assert vectors[:, 0].tolist() == list(range(10))
+    assert sorted(stub.batches) == [1, 3, 3, 3]
+    assert stub.max_in_flight == 2
+    embedder.close()
+
+
+def test_throttled_batches_are_retried(stub: StubEmbeddings):
+    stub.throttle = 2
+    embedder = _embedder(stub, batch_size=2, max_retries=2)
+    assert embedder.embed(["1", "2"])[:, 0].tolist() == [1.0, 2.0]
+    assert stub.batches == [2]
+    assert stub.requests == 3
+
+    stub.throttle = 3
+    with pytest.raises(httpx.HTTPStatusError):
+        embedder.embed(["1"])
+    embedder.close()
+
+
+def test_client_errors_are_not_retried(stub: StubEmbeddings):
+    stub.status = 400
+    embedder = _embedder(stub, max_retries=3)
+    with pytest.raises(httpx.HTTPStatusError):
+        embedder.embed(["1"])
+    assert stub.requests == 1
+    embedder.close()
+
+
+def test_embeddings_uses_configured_provider(stub: StubEmbeddings, monkeypatch: pytest.MonkeyPatch):
+    from service.config import settings
+    from service.rag.embeddings import Embeddings
+
+    monkeypatch.setattr(settings, "openai_base_url", stub.url)
+    monkeypatch.setattr(settings, "embed_dim", 2)
+    embeddings = Embeddings(provider="openai")
+    assert embeddings.dim == 2
+    vectors = embeddings.embed(["4", "5"])
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[4.0, 1.0], [5.0, 1.0]]
+
+
+def test_dimensions_are_checked_against_the_model():
+    assert resolve_dimensions("amazon.titan-embed-text-v2:0", None) == (None, 1024)
+    assert resolve_dimensions("amazon.titan-embed-text-v2:0", 512) == (512, 512)
+    assert resolve_dimensions("text-embedding-3-small", 384) == (384, 384)
+    assert resolve_dimensions("cohere.embed-english-v3", 1024) == (None, 1024)
+    assert resolve_dimensions("my-local-model", None) == (None, None)
+    for model, dim in [
+        ("amazon.titan-embed-text-v2:0", 384),
+        ("text-embedding-3-small", 4096),
+        ("cohere.embed-english-v3", 384),
+    ]:
+        with pytest.raises(ValueError, match=model):
+            resolve_dimensions(model, dim)
+
+
+def test_unknown_model_dim_comes_from_first_response(
+    stub: StubEmbeddings, monkeypatch: pytest.MonkeyPatch
+):
+    from service.config import settings
+    from service.rag.embeddings import Embeddings
+
+    monkeypatch.setattr(settings, "openai_base_url", stub.url)
+    monkeypatch.setattr(settings, "embed_dim", None)
+    embeddings = Embeddings(provider="openai", model="my-local-model")
+    assert embeddings.dim == 2
+    assert embeddings.embed(["3"]).shape == (1, 2)
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from service.rag.jobs import IngestQueue, IngestQueueFullError
+from service.rag.locks import RWLock
+from service.rag.models import Document
+
+
+def _wait(queue: IngestQueue, job_id: str) -> dict[str, object]:
+    for _ in range(200):
+        report = queue.get(job_id).to_dict()  # type: ignore[union-attr]
+        if report["status"] in ("succeeded", "partial", "failed"):
+            return report
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_in_background_and_reports_progress():
+    batches: list[int] = []
+    persisted = threading.Event()
+
+    def ingest(docs: list[Document]) -> int:
+        batches.append(len(docs))
+        return len(docs)
+
+    queue = IngestQueue(ingest, persisted.set, batch_size=2, cpu_share=1.0, nice=0)
+    job = queue.submit([Document(text=str(i)) for i in range(5)])
+    assert job.status in ("queued", "running")
+
+    report = _wait(queue, job.id)
+    assert report["status"] == "succeeded"
+    assert report["processed"] == 5
+    assert report["progress"] == 1.0
+    assert report["docs_per_s"]
+    assert batches == [2, 2, 1]
+    assert persisted.is_set()
+
+
+def test_failed_batches_are_reported_and_others_continue():
+    def ingest(docs: list[Document]) -> int:
+        if docs[0].text == "bad":
+            raise ValueError("cannot embed")
+        return len(docs)
+
+    queue = IngestQueue(ingest, lambda: None, batch_size=1, cpu_share=1.0, nice=0)
+    job = queue.submit([Document(text="ok"), Document(text="bad"), Document(text="ok")])
+    report = _wait(queue, job.id)
+    assert report["status"] == "partial"
+    assert (report["processed"], report["failed"]) == (2, 1)
+    assert report["errors"] == ["docs 1-1: cannot embed"]
+
+    job = queue.submit([Document(text="bad")])
+    assert _wait(queue, job.id)["status"] == "failed"
+
+
+def test_full_queue_rejects_jobs_and_cleans_up():
+    release = threading.Event()
+    cleaned: list[bool] = []
+
+    def ingest(docs: list[Document]) -> int:
+        release.wait(2)
+        return len(docs)
+
+    queue = IngestQueue(ingest, lambda: None, cpu_share=1.0, nice=0, max_queued=1)
+    running = queue.submit([Document(text="a")])
+    while running.status == "queued":
+        time.sleep(0.01)
+    waiting = queue.submit([Document(text="b")])
+    assert queue.full()
+    with pytest.raises(IngestQueueFullError):
+        queue.submit_source(lambda _: iter(()), cleanup=lambda: cleaned.append(True))
+    assert cleaned == [True]
+
+    release.set()
+    assert _wait(queue, waiting.id)["status"] == "succeeded"
+    assert not queue.full()
+
+
+def test_cpu_share_throttles_worker():
+    def ingest(docs: list[Document]) -> int:
+        time.sleep(0.05)
+        return len(docs)
+
+    queue = IngestQueue(ingest, lambda: None, batch_size=1, cpu_share=0.5, nice=0)
+    job = queue.submit([Document(text="a"), Document(text="b")])
+    report = _wait(queue, job.id)
+    assert report["elapsed_s"] >= 0.19  # 2 x (50ms busy + 50ms idle)
+
+
+def test_rwlock_writer_excludes_readers():
+    lock = RWLock()
+    events: list[str] = []
+
+    def writer() -> None:
+        with lock.write():
+            events.append("write")
+
+    with lock.read(), lock.read():
+        thread = threading.Thread(target=writer)
+        thread.start()
+        time.sleep(0.05)
+        events.append("readers done")
+    thread.join(1)
+    assert events == ["readers done", "write"]
@@ -0,0 +1,113 @@
+import io
+import json
+from pathlib import Path
+import time
+
+import pytest
+
+from service.aws import s3 as s3_helpers
+from service.config import settings
+from service.rag.jobs import IngestQueue
+from service.rag.models import Document
+from service.rag.sources import batched, iter_source, parse_arrow, parse_ndjson
+
+
+def test_ndjson_skips_malformed_lines():
+    body = io.BytesIO(
+        b'{"text": "a", "metadata": {"n": 1}}\n\nnot json\n{"metadata": {}}\n{"text": "b"}\n'
+    )
+    errors: list[str] = []
+
+    docs = list(parse_ndjson(body, errors.append))
+    assert [d.text for d in docs] == ["a", "b"]
+    assert docs[0].metadata == {"n": 1}
+    assert [e.split(":")[1] for e in errors] == ["3", "4"]
+
+
+def test_batched_is_lazy():
+    consumed: list[int] = []
+
+    def docs():
+        for i in range(5):
+            consumed.append(i)
+            yield Document(text=str(i))
+
+    batches = batched(docs(), 2)
+    assert [d.text for d in next(batches)] == ["0", "1"]
+    assert consumed == [0, 1]
+    assert [len(b) for b in batches] == [2, 1]
+
+
+def test_local_directory_source(tmp_path: Path):
+    (tmp_path / "a.jsonl").write_text(json.dumps({"text": "one"}) + "\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.md").write_text("two")
+    (tmp_path / "ignored.bin").write_bytes(b"\x00")
+
+    docs = list(iter_source(str(tmp_path), pytest.fail))
+    assert [d.text for d in docs] == ["one", "two"]
+    assert docs[1].metadata == {"source": str(tmp_path / "sub" / "b.md")}
+
+
+def test_s3_prefix_source():
+    client = s3_helpers.get_s3_client()
+    client.create_bucket(Bucket=settings.s3_bucket)
+    lines = "".join(json.dumps({"text": f"doc {i}"}) + "\n" for i in range(3))
+    client.put_object(Bucket=settings.s3_bucket, Key="corpus/docs.ndjson", Body=lines.encode())
+    client.put_object(Bucket=settings.s3_bucket, Key="other/skip.txt", Body=b"skip")
+
+    docs = list(iter_source(f"s3://{settings.s3_bucket}/corpus/", pytest.fail))
+    assert [d.text for d in docs] == ["doc 0", "doc 1", "doc 2"]
+
+
+def test_arrow_stream():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"text": ["x", None, "y"], "lang": ["en", "en", "de"]})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.seek(0)
+    errors: list[str] = []
+
+    docs = list(parse_arrow(sink, errors.append))
+    assert [(d.text, d.metadata) for d in docs] == [("x", {"lang": "en"}), ("y", {"lang": "de"})]
+    assert len(errors) == 1
+
+
+def test_arrow_metadata_must_be_an_object():
+    pa = pytest.importorskip("pyarrow")
+    metadata = ['{"lang": "en"}', "[1, 2]", '"note"', "3", None]
+    table = pa.table({"text": ["a", "b", "c", "d", "e"], "metadata": metadata})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.seek(0)
+    errors: list[str] = []
+
+    docs = list(parse_arrow(sink, errors.append))
+    assert [(d.text, d.metadata) for d in docs] == [("a", {"lang": "en"}), ("e", {})]
+    assert errors == [
+        "body:row 2: 'metadata' must be an object, got list",
+        "body:row 3: 'metadata' must be an object, got str",
+        "body:row 4: 'metadata' must be an object, got int",
+    ]
+
+
+def test_streamed_job_counts_bad_records_and_cleans_up():
+    cleaned: list[bool] = []
+    body = b'{"text": "a"}\n{"text": 1}\n{"text": "b"}\n'
+
+    def open_batches(job):
+        return batched(parse_ndjson(io.BytesIO(body), job.record_error), 10)
+
+    queue = IngestQueue(len, lambda: None, cpu_share=1.0, nice=0)
+    job = queue.submit_source(open_batches, cleanup=lambda: cleaned.append(True))
+    for _ in range(200):
+        if job.finished_at is not None:
+            break
+        time.sleep(0.01)
+    report = job.to_dict()
+    assert report["status"] == "partial"
+    assert (report["processed"], report["failed"], report["total"]) == (2, 1, None)
+    assert report["progress"] == 1.0
+    assert cleaned == [True]
@@ -0,0 +1,126 @@
+import asyncio
+from collections.abc import AsyncIterator
+import time
+
+from service.llm.cache import ResponseCache, SQLiteStore, cache_key, parse_cache_control
+
+
+def test_key_is_canonical():
+    a = cache_key("openai", "m", [{"role": "user", "content": "hi"}], 64, temperature=0)
+    b = cache_key("openai", "m", [{"content": "hi", "role": "user"}], 64, temperature=0)
+    assert a == b
+    assert a != cache_key("openai", "m", [{"role": "user", "content": "hi"}], 65, temperature=0)
+    assert a != cache_key("anthropic", "m", [{"role": "user", "content": "hi"}], 64, temperature=0)
+
+
+def test_cache_control_modes():
+    assert parse_cache_control(None) == "default"
+    assert parse_cache_control("no-cache") == "no-cache"
+    assert parse_cache_control("max-age=0") == "no-cache"
+    assert parse_cache_control("no-cache, no-store") == "no-store"
+
+
+def test_fetch_hits_memory_then_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    calls = []
+
+    async def compute() -> str:
+        calls.append(1)
+        return "answer"
+
+    async def run() -> list[str]:
+        cache = ResponseCache(ttl_s=60, path=path)
+        first = await cache.fetch("k", compute)
+        second = await cache.fetch("k", compute)
+        fresh = await cache.fetch("k", compute, "no-cache")
+        restarted = ResponseCache(ttl_s=60, path=path)  # empty memory tier
+        from_disk = await restarted.fetch("k", compute)
+        return [first, second, fresh, from_disk]
+
+    assert asyncio.run(run()) == ["answer"] * 4
+    assert len(calls) == 2  # initial miss + no-cache refresh
+
+
+def test_expired_entries_and_no_store_are_not_served():
+    calls = []
+
+    async def compute() -> str:
+        calls.append(1)
+        return f"v{len(calls)}"
+
+    async def run() -> list[str]:
+        cache = ResponseCache(ttl_s=0.01)
+        a = await cache.fetch("k", compute, "no-store")
+        b = await cache.fetch("k", compute)
+        await asyncio.sleep(0.02)
+        c = await cache.fetch("k", compute)
+        return [a, b, c]
+
+    assert asyncio.run(run()) == ["v1", "v2", "v3"]
+
+
+def test_stream_recorded_once_and_replayed():
+    produced = []
+
+    async def produce() -> AsyncIterator[str]:
+        produced.append(1)
+        for chunk in ("a", "b", "c"):
+            yield chunk
+
+    async def run() -> tuple[list[str], list[str], list[str]]:
+        cache = ResponseCache(ttl_s=60)
+        partial = []
+        async for chunk in cache.stream("s", produce):
+            partial.append(chunk)
+            break  # abandoned stream must not be stored
+        full = [c async for c in cache.stream("s", produce)]
+        replay = [c async for c in cache.stream("s", produce)]
+        return partial, full, replay
+
+    partial, full, replay = asyncio.run(run())
+    assert partial == ["a"]
+    assert full == replay == ["a", "b", "c"]
+    assert len(produced) == 2
+
+
+def test_sqlite_purges_expired_rows_periodically(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"), purge_every=3)
+    plan = store._conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM llm_cache WHERE expires_at <= 0"
+    ).fetchall()
+    assert "llm_cache_expires_at" in str(plan)
+
+    def rows() -> int:
+        return store._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    store.set("old", "v", time.time() - 1)
+    store.set("live", "v", time.time() + 60)
+    assert rows() == 2 and store.get("old") is None
+    store.set("other", "v", time.time() + 60)  # third write sweeps
+    assert rows() == 2
+
+
+def test_chain_caches_under_the_provider_that_answered(monkeypatch):
+    from service.config import settings
+    from service.llm import chains, providers
+
+    monkeypatch.setattr(providers, "LocalHFProvider", lambda: None)  # skip loading transformers
+    monkeypatch.setattr(settings, "llm_cache_path", "")
+    chain = chains.LLMChain()
+    answers = [("anthropic", "from-anthropic"), ("openai", "from-openai")]
+
+    class Router:
+        async def route(self, messages, preferred, model=None, max_tokens=None):
+            return answers.pop(0)
+
+    chain.router = Router()  # type: ignore[assignment]
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def run() -> list[str]:
+        # The first call fails over; its answer must not be replayed for openai.
+        return [await chain.chat(messages, model="gpt-4o") for _ in range(3)]
+
+    assert asyncio.run(run()) == ["from-anthropic", "from-openai", "from-openai"]
+    assert chain.cache is not None
+    stored = asyncio.run(chain.cache.get(cache_key("anthropic", None, messages, None)))
+    assert stored == "from-anthropic"
@@ -0,0 +1,137 @@
+import asyncio
+from collections.abc import Mapping
+import time
+from typing import Any
+
+import pytest
+
+from service.llm.graph import Graph, Node, RetrievalGraph, fuse_hits, parse_subqueries
+from service.rag.context import PackedContext, Prompt
+from service.rag.models import AnswerResponse, AnswerUsage
+
+
+def _sleeper(delay_s: float, value: Any = None):
+    async def run(values: Mapping[str, Any]) -> Any:
+        await asyncio.sleep(delay_s)
+        return value
+
+    return run
+
+
+def test_independent_nodes_run_concurrently():
+    async def join(values: Mapping[str, Any]) -> Any:
+        return values["a"] + values["b"]
+
+    graph = Graph(
+        "test",
+        [
+            Node("join", join, deps=("a", "b")),
+            Node("a", _sleeper(0.1, 1)),
+            Node("b", _sleeper(0.2, 2)),
+        ],
+    )
+    run = asyncio.run(graph.run())
+
+    assert run.values["join"] == 3
+    assert run.elapsed_s < 0.28  # max of the branches, not their 0.3 s sum
+    assert run.timings["a"].start_s == pytest.approx(run.timings["b"].start_s, abs=0.02)
+    assert run.critical_path == ["b", "join"]
+
+
+def test_timeouts_use_fallback_or_fail_the_run():
+    graph = Graph("test", [Node("slow", _sleeper(1.0), timeout_s=0.05, fallback=list)])
+    run = asyncio.run(graph.run())
+    assert run.values["slow"] == []
+    assert run.timings["slow"].status == "timeout"
+    assert run.timings["slow"].duration_s < 0.5
+
+    strict = Graph(
+        "test", [Node("slow", _sleeper(1.0), timeout_s=0.05), Node("other", _sleeper(1.0))]
+    )
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        asyncio.run(strict.run())
+    assert time.perf_counter() - start < 0.5  # the sibling was cancelled
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        Graph("test", [Node("a", _sleeper(0), deps=("missing",))])
+    with pytest.raises(ValueError, match="cycle"):
+        Graph("test", [Node("a", _sleeper(0), deps=("b",)), Node("b", _sleeper(0), deps=("a",))])
+
+
+def test_parse_and_fuse():
+    reply = '1. "What is FAISS?"\n- faiss index types\n\nwhat is faiss\n* what is FAISS?'
+    assert parse_subqueries(reply, "What is FAISS", 5) == ["What is FAISS?", "faiss index types"]
+    # Only list markers are stripped, not digits or dots that start the query.
+    reply = "3D printing tolerances\n2) 2024 tax brackets\n- .NET GC tuning\n10. 5G bands"
+    assert parse_subqueries(reply, "q", 5) == [
+        "3D printing tolerances",
+        "2024 tax brackets",
+        ".NET GC tuning",
+        "5G bands",
+    ]
+    # Doc 2 is ranked well by both lists, so it overtakes doc 1.
+    fused = fuse_hits([[(1, 0.9), (2, 0.8)], [(3, 0.7), (2, 0.6)], [(2, 0.5)]], k=2)
+    assert fused == [(2, 0.5), (1, 0.9)]
+
+
+class FakePipeline:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def retrieve_batch(self, queries: list[str], k: int, mmr_lambda: float | None = None):
+        time.sleep(0.05)
+        self.batches.append(queries)
+        return [[(len(q), 1.0)] for q in queries]
+
+    def build_prompt(self, query: str, hits: list[tuple[int, float]]) -> Prompt:
+        context = PackedContext()
+        return Prompt([{"role": "user", "content": repr(sorted(hits))}], context, 0)
+
+    def answer_response(self, prompt: Prompt, answer: str) -> AnswerResponse:
+        usage = AnswerUsage(
+            input_tokens=0,
+            context_tokens=0,
+            passages=0,
+            duplicates_dropped=0,
+            over_budget_dropped=0,
+        )
+        return AnswerResponse(answer=answer, sources=[], usage=usage)
+
+
+class FakeChain:
+    def __init__(self, rewrite_delay_s: float) -> None:
+        self.rewrite_delay_s = rewrite_delay_s
+
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> str:
+        if "search queries" in messages[0]["content"]:
+            await asyncio.sleep(self.rewrite_delay_s)
+            return "first sub\nsecond sub query"
+        return "answer from " + messages[0]["content"]
+
+
+def test_retrieval_graph_overlaps_rewrite_and_retrieval():
+    pipeline = FakePipeline()
+    graph = RetrievalGraph(pipeline, FakeChain(0.1), subqueries=2)  # type: ignore[arg-type]
+    run = asyncio.run(graph.run("q"))
+
+    assert pipeline.batches[0] == ["q"]  # finished while the rewrite was still running
+    assert pipeline.batches[1] == ["first sub", "second sub query"]  # one batch search
+    assert run.values["generate"].answer == "answer from [(1, 1.0), (9, 1.0), (16, 1.0)]"
+    assert run.critical_path == ["rewrite", "retrieve_subqueries", "merge", "context", "generate"]
+
+
+def test_retrieval_graph_answers_without_a_slow_rewrite():
+    pipeline = FakePipeline()
+    chain = FakeChain(5.0)
+    graph = RetrievalGraph(pipeline, chain, rewrite_timeout_s=0.05)  # type: ignore[arg-type]
+    response = asyncio.run(graph.answer("q"))
+
+    assert response.answer == "answer from [(1, 1.0)]"
+    assert pipeline.batches == [["q"]]
+
+    # An explicit zero budget is kept, not replaced by the setting.
+    graph = RetrievalGraph(pipeline, chain, rewrite_timeout_s=0)  # type: ignore[arg-type]
+    assert {n.name: n.timeout_s for n in graph.graph.nodes}["rewrite"] == 0
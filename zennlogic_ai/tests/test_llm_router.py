@@ -0,0 +1,104 @@
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from service.llm.providers import AnthropicProvider, OpenAIProvider
+from service.llm.router import AllProvidersFailedError, ProviderRouter
+
+
+class StubAPI:
+    """Local HTTP stand-in for an LLM API with adjustable delay and status."""
+
+    def __init__(self, reply: str) -> None:
+        self.reply = reply
+        self.delay_s = 0.0
+        self.status = 200
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                stub.hits += 1
+                self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stub.delay_s)
+                body: dict[str, Any] = {
+                    "choices": [{"message": {"content": stub.reply}}],
+                    "content": stub.reply,
+                    "usage": {},
+                }
+                data = json.dumps(body).encode()
+                try:
+                    self.send_response(stub.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client cancelled (hedge loser)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stubs() -> Iterator[tuple[StubAPI, StubAPI]]:
+    primary, alternate = StubAPI("from-openai"), StubAPI("from-anthropic")
+    yield primary, alternate
+    primary.server.shutdown()
+    alternate.server.shutdown()
+
+
+def _router(primary: StubAPI, alternate: StubAPI, **kwargs: Any) -> ProviderRouter:
+    providers = {
+        "openai": OpenAIProvider("k", base_url=primary.url),
+        "anthropic": AnthropicProvider("k", base_url=alternate.url),
+    }
+    return ProviderRouter(providers, fallbacks=["openai", "anthropic"], **kwargs)
+
+
+def _chat(router: ProviderRouter) -> Any:
+    import asyncio
+
+    return asyncio.run(router.chat([{"role": "user", "content": "hi"}], preferred="openai"))
+
+
+def test_primary_answers_without_hedge(stubs):
+    primary, alternate = stubs
+    assert _chat(_router(primary, alternate, hedge_after_s=1.0)) == "from-openai"
+    assert alternate.hits == 0
+
+
+def test_slow_primary_is_hedged(stubs):
+    primary, alternate = stubs
+    primary.delay_s = 2.0
+    start = time.monotonic()
+    assert _chat(_router(primary, alternate, hedge_after_s=0.1)) == "from-anthropic"
+    assert time.monotonic() - start < 1.5
+
+
+def test_error_fails_over_and_opens_breaker(stubs):
+    primary, alternate = stubs
+    primary.status = 500
+    router = _router(primary, alternate, failure_threshold=2, cooldown_s=60)
+    for _ in range(3):
+        assert _chat(router) == "from-anthropic"
+    assert primary.hits == 2  # third call skipped the open circuit
+
+
+def test_timeout_without_alternates_raises(stubs):
+    primary, alternate = stubs
+    primary.delay_s = 1.0
+    router = _router(primary, alternate, timeout_s=0.2)
+    router.fallbacks = ()
+    with pytest.raises(AllProvidersFailedError, match="openai"):
+        _chat(router)
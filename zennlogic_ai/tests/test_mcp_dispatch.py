@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+
+from service.mcp_server.api import app
+from service.mcp_server.dispatch import (
+    ToolArgumentsInvalidError,
+    ToolDispatcher,
+    ToolNotFoundError,
+    ToolTimeoutError,
+)
+from service.mcp_server.server import ToolSpec
+
+
+def _slow_sync(delay: float) -> str:
+    time.sleep(delay)
+    return threading.current_thread().name
+
+
+async def _async_tool(value: int) -> int:
+    await asyncio.sleep(0)
+    return value * 2
+
+
+def _specs(**funcs) -> dict[str, ToolSpec]:
+    return {name: ToolSpec.from_function(name, func) for name, func in funcs.items()}
+
+
+def test_async_and_sync_tools():
+    dispatcher = ToolDispatcher(_specs(slow=_slow_sync, double=_async_tool))
+
+    async def run():
+        return await asyncio.gather(
+            dispatcher.call("double", [21]), dispatcher.call("slow", kwargs={"delay": 0})
+        )
+
+    doubled, thread_name = asyncio.run(run())
+    assert doubled == 42
+    assert thread_name.startswith("mcp-tool")
+    dispatcher.shutdown()
+
+
+def test_per_tool_concurrency_limit():
+    tools = _specs(a=_slow_sync, b=_slow_sync)
+    dispatcher = ToolDispatcher(tools, limits={"a": 1}, default_concurrency=4)
+
+    async def elapsed(calls):
+        start = time.perf_counter()
+        await asyncio.gather(*(dispatcher.call(name, [0.1]) for name in calls))
+        return time.perf_counter() - start
+
+    assert asyncio.run(elapsed(["a", "a"])) >= 0.19  # serialized by the limit
+    assert asyncio.run(elapsed(["b", "b"])) < 0.19  # concurrent
+    dispatcher.shutdown()
+
+
+def test_timeout_and_missing_tool():
+    dispatcher = ToolDispatcher(_specs(slow=_slow_sync), timeout_s=0.05)
+    with pytest.raises(ToolTimeoutError):
+        asyncio.run(dispatcher.call("slow", [0.3]))
+    with pytest.raises(ToolNotFoundError):
+        asyncio.run(dispatcher.call("nope"))
+    dispatcher.shutdown()
+
+
+def test_arguments_are_validated_before_dispatch():
+    calls = []
+
+    def tool(query: str, k: int = 5) -> int:
+        calls.append(query)
+        return k
+
+    dispatcher = ToolDispatcher(_specs(tool=tool))
+    assert asyncio.run(dispatcher.call("tool", ["q"], {"k": "3"})) == 3
+    for args, kwargs in (([], {}), (["q"], {"k": "many"}), (["q", 1, 2], {}), (["q"], {"x": 1})):
+        with pytest.raises(ToolArgumentsInvalidError):
+            asyncio.run(dispatcher.call("tool", args, kwargs))
+    assert calls == ["q"]
+    dispatcher.shutdown()
+
+
+def test_tool_schemas_are_listed():
+    client = TestClient(app)
+    tools = {t["name"]: t for t in client.get("/mcp/tools").json()["tools"]}
+    search = tools["rag.search"]["inputSchema"]
+    assert search["required"] == ["query"]
+    assert search["properties"]["k"]["type"] == "integer"
+    assert client.post("/mcp/tools/rag/search", json={"kwargs": {"k": 1}}).status_code == 422
+
+
+def test_batch_endpoint_returns_results_in_order():
+    client = TestClient(app)
+    resp = client.post(
+        "/mcp/batch",
+        json={
+            "calls": [
+                {"tool": "health", "fn": "check"},
+                {"tool": "health", "fn": "missing"},
+                {"tool": "health", "fn": "check", "args": []},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert results[0] == {"result": {"status": "ok"}}
+    assert results[1]["error"]["status"] == 404
+    assert results[2] == {"result": {"status": "ok"}}
@@ -0,0 +1,219 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+from typing import Any
+
+from service.mcp_server import transport
+from service.mcp_server.dispatch import ToolDispatcher
+from service.mcp_server.server import MCPServer
+from service.mcp_server.transport import MCPSession, _StdioStreams, start_socket_server
+
+
+async def slow(delay: float = 0.3) -> str:
+    """Sleep, then answer."""
+    await asyncio.sleep(delay)
+    return "slow"
+
+
+def fast(n: int = 1) -> dict[str, int]:
+    """Answer at once."""
+    return {"n": n}
+
+
+def broken() -> None:
+    """Always fail."""
+    raise RuntimeError("boom")
+
+
+def _server() -> MCPServer:
+    tools = types.ModuleType("tools")
+    tools.__all__ = ["slow", "fast", "broken"]  # type: ignore[attr-defined]
+    tools.slow, tools.fast, tools.broken = slow, fast, broken  # type: ignore[attr-defined]
+    server = MCPServer()
+    server.register_tool(tools, namespace="t")
+    return server
+
+
+def _call(msg_id: Any, name: str, **arguments: Any) -> dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": msg_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    }
+
+
+async def _session(messages: list[Any], replies: int) -> list[tuple[float, Any]]:
+    """Pipeline ``messages`` over one TCP connection; return (arrival, reply) pairs."""
+    server = _server()
+    dispatcher = ToolDispatcher(server.specs)
+    listener = await start_socket_server(server, dispatcher, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        start = time.perf_counter()
+        writer.write(b"".join(json.dumps(m).encode() + b"\n" for m in messages))
+        await writer.drain()
+        out = []
+        for _ in range(replies):
+            line = await asyncio.wait_for(reader.readline(), 5)
+            out.append((time.perf_counter() - start, json.loads(line)))
+        writer.close()
+        return out
+    finally:
+        listener.close()
+        dispatcher.shutdown()
+
+
+def test_pipelined_requests_run_concurrently_and_answer_out_of_order():
+    messages = [_call(1, "t.slow", delay=0.3), _call(2, "t.slow", delay=0.3), _call(3, "t.fast")]
+    replies = asyncio.run(_session(messages, 3))
+
+    assert replies[0][1]["id"] == 3
+    assert {reply["id"] for _, reply in replies} == {1, 2, 3}
+    assert replies[0][0] < 0.2  # the fast call did not wait behind the slow ones
+    assert replies[-1][0] < 0.55  # both slow calls overlapped
+    by_id = {reply["id"]: reply["result"] for _, reply in replies}
+    assert by_id[3]["content"][0]["text"] == '{"n":1}'
+    assert by_id[1]["content"][0]["text"] == '"slow"'
+
+
+def test_errors_notifications_and_batches():
+    messages = [
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        _call(1, "t.missing"),
+        _call(2, "t.fast", n="x"),
+        _call(3, "t.broken"),
+        [{"jsonrpc": "2.0", "id": 4, "method": "ping"}, {"jsonrpc": "2.0", "id": 5, "method": "x"}],
+        {"jsonrpc": "2.0", "id": 6, "method": "tools/list"},
+    ]
+    replies = [reply for _, reply in asyncio.run(_session(messages, 5))]
+    by_id = {r["id"]: r for r in replies if isinstance(r, dict)}
+    (batch,) = [r for r in replies if isinstance(r, list)]
+
+    assert by_id[1]["error"]["code"] == -32602
+    assert by_id[2]["error"]["code"] == -32602
+    assert by_id[3]["result"] == {"content": [{"type": "text", "text": "boom"}], "isError": True}
+    assert batch == [
+        {"jsonrpc": "2.0", "id": 4, "result": {}},
+        {"jsonrpc": "2.0", "id": 5, "error": {"code": -32601, "message": "method not found: x"}},
+    ]
+    tools = {tool["name"] for tool in by_id[6]["result"]["tools"]}
+    assert tools == {"t.slow", "t.fast", "t.broken"}
+
+
+def test_cancelled_requests_get_no_reply():
+    messages = [
+        _call(1, "t.slow", delay=5),
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}},
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+        _call(3, "t.slow", delay=0.1),
+    ]
+    replies = asyncio.run(_session(messages, 2))
+    assert [reply["id"] for _, reply in replies] == [2, 3]
+
+
+def test_cancelling_a_batch_member_keeps_the_rest_of_the_batch():
+    server = _server()
+    dispatcher = ToolDispatcher(server.specs)
+    session = MCPSession(server, dispatcher)
+    batch = [_call(1, "t.slow", delay=5), {"jsonrpc": "2.0", "id": 2, "method": "ping"}]
+    cancel = {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}}
+
+    async def main() -> Any:
+        pending = asyncio.create_task(session.handle_line(json.dumps(batch).encode()))
+        await asyncio.sleep(0.05)
+        assert await session.handle_line(json.dumps(cancel).encode()) is None
+        return await asyncio.wait_for(pending, 2)
+
+    try:
+        assert asyncio.run(main()) == [{"jsonrpc": "2.0", "id": 2, "result": {}}]
+    finally:
+        dispatcher.shutdown()
+
+
+def test_socket_line_over_limit_gets_one_parse_error_and_session_continues(monkeypatch):
+    monkeypatch.setattr(transport, "_LINE_LIMIT", 256)
+    overlong = {"jsonrpc": "2.0", "id": 9, "method": "ping", "pad": "x" * 2000}
+    messages = [
+        _call(1, "t.slow", delay=0.2),
+        overlong,
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+    ]
+    replies = [reply for _, reply in asyncio.run(_session(messages, 3))]
+    by_id = {r["id"]: r for r in replies}
+
+    assert by_id[None]["error"] == {"code": -32700, "message": "message exceeds 256 bytes"}
+    assert by_id[2]["result"] == {}
+    assert by_id[1]["result"]["content"][0]["text"] == '"slow"'
+
+
+def test_cancel_reaches_every_pending_request_with_a_reused_id():
+    server = _server()
+    dispatcher = ToolDispatcher(server.specs)
+    session = MCPSession(server, dispatcher)
+    cancel = {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}}
+
+    async def main() -> list[Any]:
+        quick = asyncio.create_task(session.handle(_call(1, "t.slow", delay=0.05)))
+        slow = asyncio.create_task(session.handle(_call(1, "t.slow", delay=5)))
+        assert (await quick)["id"] == 1
+        await session.handle(cancel)
+        return await asyncio.gather(slow, return_exceptions=True)
+
+    try:
+        (result,) = asyncio.run(main())
+    finally:
+        dispatcher.shutdown()
+    assert isinstance(result, asyncio.CancelledError)
+    assert session.pending == {}
+
+
+class _Stdout(io.BytesIO):
+    def close(self) -> None:  # keep the replies readable after the session ends
+        pass
+
+
+def test_stdio_line_over_limit_gets_one_parse_error(monkeypatch):
+    monkeypatch.setattr(transport, "_LINE_LIMIT", 64)
+    server = _server()
+    dispatcher = ToolDispatcher(server.specs)
+    overlong = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "ping", "pad": "x" * 200})
+    ping = json.dumps({"jsonrpc": "2.0", "id": 2, "method": "ping"})
+    stdout = _Stdout()
+    streams = _StdioStreams(io.BytesIO(f"{overlong}\n{ping}\n".encode()), stdout)
+    try:
+        asyncio.run(MCPSession(server, dispatcher).serve(streams, streams))
+    finally:
+        dispatcher.shutdown()
+
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert len(replies) == 2
+    by_id = {r["id"]: r for r in replies}
+    assert by_id[None]["error"] == {"code": -32700, "message": "message exceeds 64 bytes"}
+    assert by_id[2]["result"] == {}
+
+
+def test_stdio_entry_point():
+    lines = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        _call(2, "health.check"),
+    ]
+    env = {**os.environ, "HF_HUB_OFFLINE": "1", "PYTHONPATH": os.pathsep.join(sys.path)}
+    proc = subprocess.run(
+        [sys.executable, "-c", "from service.mcp_server.server import main; main()"],
+        input=b"".join(json.dumps(line).encode() + b"\n" for line in lines),
+        capture_output=True,
+        env=env,
+        timeout=120,
+    )
+    replies = [json.loads(line) for line in proc.stdout.splitlines()]
+
+    assert proc.returncode == 0, proc.stderr.decode()[-2000:]
+    assert replies[0]["result"]["serverInfo"]["name"] == "zennlogic_ai"
+    assert replies[1]["result"]["content"][0]["text"] == '{"status":"ok"}'
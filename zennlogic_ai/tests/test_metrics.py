@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+import pytest
+
+from service.mcp_server.api import app
+from service.telemetry.metrics import Counter, Histogram, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0), registry=registry)
+    child = hist.labels("embed")
+    child.observe(0.05)
+    child.observe(0.5)
+    child.observe(5.0)
+    with child.time():
+        pass
+
+    text = registry.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{stage="embed",le="0.1"} 2' in text
+    assert 't_seconds_bucket{stage="embed",le="1"} 3' in text
+    assert 't_seconds_bucket{stage="embed",le="+Inf"} 4' in text
+    assert 't_seconds_count{stage="embed"} 4' in text
+
+
+def test_timer_handles_nested_and_interleaved_blocks():
+    hist = Histogram("t_seconds", "test", ("stage",), buckets=(0.01, 10.0), registry=Registry())
+    child = hist.labels("embed")
+
+    async def step() -> None:
+        with child.time():
+            await asyncio.sleep(0.02)
+
+    async def main() -> None:
+        with child.time():
+            with child.time():
+                pass
+            await asyncio.gather(step(), step())
+
+    asyncio.run(main())
+    counts, total = child.snapshot()
+    assert counts == [1, 3, 0]
+    assert 0.06 <= total < 10.0
+
+
+def test_counter_uses_total_suffix_and_checks_labels():
+    counter = Counter("t_lookups", "test", ("cache", "result"), registry=Registry())
+    counter.labels("llm", "hit").inc()
+    assert 't_lookups_total{cache="llm",result="hit"} 1' in counter.render()
+    with pytest.raises(ValueError):
+        counter.labels("llm")
+
+
+def test_mcp_metrics_endpoint_reports_tool_dispatch():
+    client = TestClient(app)
+    client.post("/mcp/tools/health/check", json={})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'zennlogic_mcp_tool_duration_seconds_count{tool="health.check",status="ok"}' in resp.text
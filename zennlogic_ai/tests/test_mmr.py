@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+import pytest
+
+from service.rag.mmr import mmr_select
+from service.rag.vector_backends.annoy_backend import AnnoyBackend
+from service.rag.vector_backends.faiss_backend import FaissBackend
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def test_near_duplicates_are_skipped():
+    rng = np.random.default_rng(0)
+    query = _unit(rng.standard_normal(16)).astype(np.float32)
+    para = _unit(query + 0.3 * rng.standard_normal(16))
+    other = _unit(query + 0.9 * rng.standard_normal(16))
+    # Three near-identical copies of the best paragraph, then a different one.
+    candidates = np.stack([para, para + 1e-3, para - 1e-3, other]).astype(np.float32)
+
+    assert mmr_select(query, candidates, 2, lambda_mult=1.0) in ([0, 1], [0, 2], [1, 0], [2, 0])
+    picks = mmr_select(query, candidates, 2, lambda_mult=0.5)
+    assert picks[1] == 3
+    assert sorted(mmr_select(query, candidates, 10)) == [0, 1, 2, 3]  # k capped, no repeats
+    assert mmr_select(query, candidates[:0], 3) == []
+
+
+def test_hundred_candidates_in_a_couple_of_milliseconds():
+    rng = np.random.default_rng(1)
+    candidates = rng.standard_normal((100, 384)).astype(np.float32)
+    query = rng.standard_normal(384).astype(np.float32)
+    mmr_select(query, candidates, 10)  # warm up
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        mmr_select(query, candidates, 10, 0.5)
+        timings.append(time.perf_counter() - start)
+    assert sorted(timings)[len(timings) // 2] < 0.002
+
+
+@pytest.mark.parametrize("backend", [FaissBackend, AnnoyBackend])
+def test_backends_return_stored_vectors(backend: type[FaissBackend | AnnoyBackend]):
+    vectors = np.random.default_rng(2).standard_normal((5, 8)).astype(np.float32)
+    store = backend(8)
+    store.add([str(i) for i in range(5)], [{}] * 5, vectors)
+    np.testing.assert_allclose(store.get_vectors([4, 1]), vectors[[4, 1]], rtol=1e-6)
+    assert store.get_vectors([]).shape == (0, 8)
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from service.rag.onnx_embeddings import (
+    FP32_TOLERANCE,
+    INT8_MIN_COSINE,
+    OnnxEmbedder,
+    _pooling_mode,
+)
+
+
+def test_pooling_mode_from_either_config_style():
+    assert _pooling_mode({"pooling_mode": "mean"}) == "mean"
+    assert _pooling_mode({"pooling_mode_cls_token": True, "pooling_mode_mean_tokens": False}) == (
+        "cls"
+    )
+    with pytest.raises(ValueError):
+        _pooling_mode({"pooling_mode": "weightedmean"})
+
+
+def _tiny_model(root: Path) -> str:
+    """Save a small random BERT sentence-transformer (no downloads)."""
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    base = root / "bert"
+    base.mkdir()
+    words = "hello world the quick brown fox jumps over lazy dog".split()
+    (base / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", *words]))
+    BertTokenizerFast(vocab_file=str(base / "vocab.txt")).save_pretrained(base)
+    config = BertConfig(
+        vocab_size=14,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    BertModel(config).save_pretrained(base)
+    model = SentenceTransformer(
+        modules=[models.Transformer(str(base)), models.Pooling(32), models.Normalize()]
+    )
+    model.save(str(root / "st"))
+    return str(root / "st")
+
+
+def test_onnx_matches_pytorch_within_tolerance(tmp_path: Path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    from sentence_transformers import SentenceTransformer
+
+    name = _tiny_model(tmp_path)
+    texts = ["hello world", "the quick brown fox jumps over the lazy dog", "fox", "dog world"]
+    reference = SentenceTransformer(name, device="cpu").encode(texts, convert_to_numpy=True)
+
+    fp32 = OnnxEmbedder(name, cache_dir=str(tmp_path / "onnx"), threads=1, batch_size=2)
+    vectors = fp32.embed(texts)
+    assert vectors.dtype == np.float32
+    assert np.abs(vectors - reference).max() <= FP32_TOLERANCE
+
+    int8 = OnnxEmbedder(name, cache_dir=str(tmp_path / "onnx"), quantize=True, threads=1)
+    cosines = (int8.embed(texts) * reference).sum(axis=1)  # both are unit-normalised
+    assert cosines.min() >= INT8_MIN_COSINE
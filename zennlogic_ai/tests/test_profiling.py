@@ -0,0 +1,110 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from service.telemetry.profiling import ProfiledRoute, ProfilingMiddleware, install_profiler
+
+
+def _busy_work(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+
+def _app(**kwargs) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+
+    @app.get("/busy")
+    async def busy() -> dict[str, int]:
+        return {"n": _busy_work(0.15)}
+
+    @app.get("/busy-sync")
+    def busy_sync(seconds: float = 0.15) -> dict[str, int]:
+        return {"n": _busy_work(seconds)}
+
+    @app.get("/fast")
+    def fast() -> dict[str, int]:
+        return {"n": 0}
+
+    app.add_middleware(ProfilingMiddleware, interval_ms=1, **kwargs)
+    return app
+
+
+def _wait_for_profiles(path, expected: int, timeout: float = 3.0) -> list:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        files = sorted(path.glob("*.folded"))
+        if len(files) >= expected:
+            return files
+        time.sleep(0.02)
+    return sorted(path.glob("*.folded"))
+
+
+def test_sampled_request_writes_collapsed_stacks(tmp_path):
+    client = TestClient(_app(sample_rate=1.0, out_dir=str(tmp_path)))
+    assert client.get("/busy").status_code == 200
+
+    files = _wait_for_profiles(tmp_path, 1)
+    assert len(files) == 1
+    assert "-GET-busy-" in files[0].name and files[0].name.endswith("-sampled.folded")
+    lines = files[0].read_text().splitlines()
+    assert any("_busy_work" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_sync_endpoint_is_sampled_on_its_worker_thread(tmp_path):
+    client = TestClient(_app(slow_ms=30, out_dir=str(tmp_path)))
+    assert client.get("/busy-sync", params={"seconds": 0.2}).json()["n"] > 0
+
+    files = _wait_for_profiles(tmp_path, 1)
+    assert len(files) == 1 and files[0].name.endswith("-slow.folded")
+    lines = files[0].read_text().splitlines()
+    assert lines and all("busy_sync" in line for line in lines)
+    assert not any("MainThread" in line.split(";", 1)[0] for line in lines)
+
+
+def _other_thread_work(seconds: float) -> int:
+    return _busy_work(seconds)
+
+
+def _profiler_threads() -> int:
+    return sum(t.name == "profiler" for t in threading.enumerate())
+
+
+def test_only_the_serving_thread_is_sampled_by_one_shared_thread(tmp_path):
+    before = _profiler_threads()
+    client = TestClient(_app(sample_rate=1.0, out_dir=str(tmp_path)))
+    background = threading.Thread(target=_other_thread_work, args=(0.5,))
+    background.start()
+    for _ in range(3):
+        assert client.get("/busy").status_code == 200
+    background.join()
+
+    files = _wait_for_profiles(tmp_path, 3)
+    assert len(files) == 3
+    text = "".join(f.read_text() for f in files)
+    assert "_busy_work" in text and "_other_thread_work" not in text
+    assert _profiler_threads() == before + 1
+
+
+def test_slow_threshold_profiles_only_slow_requests_with_retention(tmp_path):
+    client = TestClient(_app(slow_ms=30, out_dir=str(tmp_path), max_files=2))
+    client.get("/fast")
+    for _ in range(3):
+        client.get("/busy")
+
+    time.sleep(0.3)
+    files = _wait_for_profiles(tmp_path, 2)
+    assert len(files) == 2
+    assert all("-busy-" in f.name and f.name.endswith("-slow.folded") for f in files)
+
+
+def test_install_profiler_is_noop_when_disabled():
+    app = FastAPI()
+    install_profiler(app)
+    assert not any(m.cls is ProfilingMiddleware for m in app.user_middleware)
@@ -9,4 +9,5 @@ def test_rag_pipeline():
     results = pipeline.search("hello", 1)
     assert results
     answer = pipeline.answer("hello")
-    assert "answer" in answer
+    assert answer.answer == "hello"
+    assert answer.sources[0].metadata == {"id": 1}
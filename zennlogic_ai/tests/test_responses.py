@@ -0,0 +1,43 @@
+import json
+
+from fastapi import HTTPException
+import numpy as np
+import pytest
+
+from service.rag.models import AnswerSource, SearchHit, SearchResponse
+from service.rest import responses
+from service.rest.responses import FastJSONResponse, model_response, parse_fields
+
+
+def test_fast_json_response_is_compact_and_handles_numpy():
+    body = FastJSONResponse({"a": [1, 2], "b": "é"}).body
+    assert body == '{"a":[1,2],"b":"é"}'.encode()
+
+    if responses.orjson is not None:
+        payload = {"score": np.float32(0.5), "vec": np.arange(2)}
+        assert json.loads(FastJSONResponse(payload).body) == {"score": 0.5, "vec": [0, 1]}
+
+
+def test_parse_fields():
+    assert parse_fields(None, SearchHit) is None
+    assert parse_fields("id, score,", SearchHit) == {"id", "score"}
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("id,text", AnswerSource)
+    assert exc.value.status_code == 422
+    assert "text" in exc.value.detail
+
+
+def test_model_response_projects_results():
+    response = SearchResponse(
+        results=[
+            SearchHit(id=3, score=0.9, text="long text", metadata={"source": "a"}),
+            SearchHit(id=1, score=0.5, text="more text", metadata={}),
+        ]
+    )
+    full = json.loads(model_response(response).body)
+    assert full["results"][1] == {"id": 1, "score": 0.5, "text": "more text", "metadata": {}}
+
+    include = {"results": {"__all__": parse_fields("id,score", SearchHit)}}
+    lean = model_response(response, include)
+    assert lean.media_type == "application/json"
+    assert json.loads(lean.body) == {"results": [{"id": 3, "score": 0.9}, {"id": 1, "score": 0.5}]}
@@ -0,0 +1,41 @@
+from service.aws import s3 as s3_helpers
+from service.config import settings
+from service.mcp_server.tools import s3 as s3_tool
+
+
+def _bucket() -> None:
+    s3_helpers.get_s3_client().create_bucket(Bucket=settings.s3_bucket)
+
+
+def test_client_is_cached():
+    assert s3_helpers.get_s3_client() is s3_helpers.get_s3_client()
+
+
+def test_listing_pages_past_limit():
+    _bucket()
+    s3_helpers.put_objects({f"docs/{i:03d}.txt": b"x" for i in range(25)})
+
+    streamed = [obj["Key"] for obj in s3_helpers.iter_objects("docs/", page_size=10)]
+    assert streamed == [f"docs/{i:03d}.txt" for i in range(25)]
+
+    keys: list[str] = []
+    cursor = None
+    pages = 0
+    while True:
+        page = s3_tool.list_objects("docs/", cursor=cursor, limit=10)
+        keys.extend(page["objects"])  # type: ignore[arg-type]
+        pages += 1
+        cursor = page["next_cursor"]  # type: ignore[assignment]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert keys == streamed
+
+
+def test_bulk_transfer_roundtrip_multipart():
+    _bucket()
+    big = bytes(range(256)) * (12 * 1024 * 1024 // 256)  # > one 8 MiB part
+    items = {"blob/big.bin": big, "blob/small.bin": b"hello"}
+    s3_helpers.put_objects(items)
+
+    assert s3_helpers.get_objects(list(items)) == items
@@ -0,0 +1,92 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from service.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_threads_share_one_call():
+    flight = SingleFlight("test.threads")
+    calls = []
+    gate = threading.Event()
+
+    def work() -> list[int]:
+        calls.append(1)
+        gate.wait(1)
+        return [42]
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flight.do, "q", work) for _ in range(8)]
+        time.sleep(0.05)
+        gate.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.do("q", lambda: [7]) == [7]  # nothing is kept once done
+
+
+def test_threads_share_errors():
+    flight = SingleFlight("test.errors")
+    gate = threading.Event()
+
+    def fail() -> None:
+        gate.wait(1)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, "q", fail) for _ in range(4)]
+        time.sleep(0.05)
+        gate.set()
+        for f in futures:
+            with pytest.raises(RuntimeError, match="boom"):
+                f.result()
+
+
+def test_async_coalesces_and_survives_caller_cancellation():
+    flight = AsyncSingleFlight("test.async")
+    calls = []
+
+    async def work(value: str) -> str:
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def run() -> tuple[list[str], str]:
+        tasks = [asyncio.create_task(flight.do("a", lambda: work("a"))) for _ in range(5)]
+        other = asyncio.create_task(flight.do("b", lambda: work("b")))
+        await asyncio.sleep(0.01)
+        tasks[0].cancel()  # one caller leaving must not cancel the shared call
+        results = await asyncio.gather(*tasks[1:])
+        return results, await other
+
+    results, other = asyncio.run(run())
+    assert results == ["a"] * 4
+    assert other == "b"
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_async_cancels_when_all_callers_leave():
+    flight = AsyncSingleFlight("test.abandon")
+    cancelled = []
+
+    async def work() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run() -> None:
+        task = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True]
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import httpx
+import pytest
+
+from service.telemetry import tracing
+from service.telemetry.tracing import (
+    ASYNC_HTTPX_HOOKS,
+    FileSpanExporter,
+    SpanContext,
+    Tracer,
+    TracingMiddleware,
+    format_traceparent,
+    parse_traceparent,
+    span,
+)
+
+
+@pytest.fixture
+def traces(tmp_path, monkeypatch):
+    """Install a file-exporting tracer; returns (configure, read_spans)."""
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path), flush_interval_s=0.01)
+
+    def configure(**kwargs) -> None:
+        monkeypatch.setattr(tracing, "tracer", Tracer(exporter, **kwargs))
+
+    def read_spans() -> list[dict]:
+        exporter.flush()
+        if not path.exists():
+            return []
+        return [
+            s
+            for line in path.read_text().splitlines()
+            for rs in json.loads(line)["resourceSpans"]
+            for scope in rs["scopeSpans"]
+            for s in scope["spans"]
+        ]
+
+    return configure, read_spans
+
+
+def test_traceparent_round_trip():
+    context = parse_traceparent("00-4BF92F3577B34DA6A3CE929D0E0E4736-00F067AA0BA902B7-01")
+    assert context == SpanContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert format_traceparent(context) == (
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    )
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_spans_nest_across_tasks_and_threads(traces):
+    configure, read_spans = traces
+    configure(sample_rate=1.0)
+
+    def blocking() -> None:
+        with span("thread"):
+            pass
+
+    async def child(name: str) -> None:
+        with span(name):
+            await asyncio.sleep(0.01)
+            await asyncio.to_thread(blocking)
+
+    async def main() -> None:
+        with span("root", {"k": 3}):
+            await asyncio.gather(child("a"), child("b"))
+
+    asyncio.run(main())
+    spans = {s["name"]: s for s in read_spans() if s["name"] != "thread"}
+    threads = [s for s in read_spans() if s["name"] == "thread"]
+
+    root = spans["root"]
+    assert "parentSpanId" not in root
+    assert root["attributes"] == [{"key": "k", "value": {"intValue": "3"}}]
+    assert spans["a"]["parentSpanId"] == spans["b"]["parentSpanId"] == root["spanId"]
+    assert {s["parentSpanId"] for s in threads} == {spans["a"]["spanId"], spans["b"]["spanId"]}
+    assert {s["traceId"] for s in [*spans.values(), *threads]} == {root["traceId"]}
+
+
+def test_dropped_traces_export_nothing_but_still_propagate(traces):
+    configure, read_spans = traces
+    configure(sample_rate=0.0, slow_ms=10_000)  # tail sampling on, but nothing qualifies
+    with span("root"):
+        with span("child"):
+            pass
+    assert read_spans() == []
+
+    configure(sample_rate=1e-12)
+    with span("root") as root:
+        assert not root.recording
+        assert span("child") is tracing._NOOP
+        headers: dict[str, str] = {}
+        tracing.inject(headers)
+    assert headers["traceparent"].endswith("-00")
+    assert tracing.current_context() is None
+    assert read_spans() == []
+
+
+def test_children_keep_the_head_sampling_decision_under_tail_sampling(traces):
+    configure, _ = traces
+    configure(sample_rate=0.0, slow_ms=10_000, keep_errors=True)
+    with span("root") as root:
+        with span("llm.chat", kind="client"):
+            headers: dict[str, str] = {}
+            tracing.inject(headers)
+    assert format_traceparent(root.context).endswith("-00")
+    assert headers["traceparent"].endswith("-00")
+
+
+def test_tail_sampling_keeps_slow_and_failed_traces(traces):
+    configure, read_spans = traces
+    configure(sample_rate=0.0, slow_ms=50, keep_errors=True)
+    with span("fast"):
+        pass
+    with span("slow"):
+        time.sleep(0.06)
+    with pytest.raises(ValueError):
+        with span("failed"):
+            with span("step"):
+                raise ValueError("bad input")
+
+    spans = {s["name"]: s for s in read_spans()}
+    assert set(spans) == {"slow", "failed", "step"}
+    assert spans["step"]["status"] == {"code": 2, "message": "ValueError: bad input"}
+
+
+def test_httpx_hooks_inject_traceparent(traces):
+    configure, _ = traces
+    configure(sample_rate=1.0)
+    seen: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("traceparent"))
+        return httpx.Response(200)
+
+    async def main() -> str:
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport, event_hooks=ASYNC_HTTPX_HOOKS) as client:
+            await client.get("http://llm/")
+            with span("llm.chat", kind="client") as current:
+                await client.get("http://llm/")
+                return format_traceparent(current.context)
+
+    expected = asyncio.run(main())
+    assert seen == [None, expected]
+
+
+def test_middleware_continues_inbound_trace(traces):
+    configure, read_spans = traces
+    configure(sample_rate=0.0, keep_errors=True)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int) -> dict[str, int]:
+        with span("lookup"):
+            return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware)
+    client = TestClient(app)
+    inbound = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    response = client.get("/items/7", headers={"traceparent": inbound})
+
+    assert response.status_code == 200
+    returned = parse_traceparent(response.headers["traceparent"])
+    assert returned is not None and returned.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    spans = {s["name"]: s for s in read_spans()}
+    server = spans["GET /items/{item_id}"]
+    assert server["kind"] == 2
+    assert server["parentSpanId"] == "00f067aa0ba902b7"
+    assert server["spanId"] == returned.span_id
+    assert spans["lookup"]["parentSpanId"] == server["spanId"]
+    assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in (
+        server["attributes"]
+    )
+
+    # An unsampled inbound trace is dropped, but its id is still returned.
+    response = client.get("/items/8", headers={"traceparent": inbound[:-2] + "00"})
+    assert response.headers["traceparent"].startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+    assert len(read_spans()) == 2
+
+
+def test_disabled_tracing_is_a_shared_noop(monkeypatch):
+    monkeypatch.setattr(tracing, "tracer", Tracer(None, sample_rate=1.0))
+    with span("root") as root:
+        assert root is tracing._NOOP
+        assert tracing.current_context() is None
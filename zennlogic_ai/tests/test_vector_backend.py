@@ -10,3 +10,21 @@ def test_vector_backend_add_search(backend):
     vec.add(["hello"], [{"id": 1}])
     results = vec.search(np.array([0.0] * 384), 1)
     assert isinstance(results, list)
+
+
+def test_annoy_serves_last_built_index_until_swap():
+    from service.rag.vector_backends.annoy_backend import AnnoyBackend
+
+    vec = AnnoyBackend(4)
+    vec.add(["a", "b"], [{}, {}], np.eye(4, dtype=np.float32)[:2])
+    assert vec.search_ids([1.0, 0.0, 0.0, 0.0], 2) == []  # nothing published yet
+    vec.swap_index(vec.build_index())
+    live = vec.index
+
+    vec.add(["c"], [{}], np.eye(4, dtype=np.float32)[2:3])
+    assert vec.index is live  # adding never touches the live forest
+    assert [i for i, _ in vec.search_ids([0.0, 0.0, 1.0, 0.0], 3)] == [0, 1]
+
+    vec.swap_index(vec.build_index())
+    assert vec.search_ids([0.0, 0.0, 1.0, 0.0], 1)[0][0] == 2
+    assert vec.build_index() is None  # nothing new to build